@@ -1,59 +1,88 @@
+import argparse
+import csv
+import json
 import os
 import re
+import sqlite3
+import sys
 import time
-from tqdm import tqdm
-
-def get_size(start_path='.', size_threshold=5 * 1024 ** 3):
-    total_size = 0
-    folder_sizes = {}
-    file_sizes = {}
-    file_count = 0
-    folder_count = 0
-    large_folders = []
-    large_files = []
-    error_paths = []
-
-    # Count files and folders first to initialize progress bar
-    print("Counting files and folders for progress estimation...")
-    try:
-        for dirpath, dirnames, filenames in os.walk(start_path):
-            folder_count += 1
-            file_count += len(filenames)
-    except PermissionError:
-        print(f"Permission denied when accessing some directories. Results may be incomplete.")
-    
-    print(f"Found {folder_count} folders and {file_count} files to scan.")
-    
-    # Now scan with progress bar
-    with tqdm(total=folder_count + file_count, desc="Scanning", unit="item") as pbar:
-        for dirpath, dirnames, filenames in os.walk(start_path):
-            folder_size = 0
+from contextlib import nullcontext, redirect_stdout
+from scanner import (ALLOCATED_SIZES_AVAILABLE, BACKENDS, EXPORT_FORMATS, FileStore, ScanFilter, ScanIndex, ScanProfile,
+                     Snapshot, StreamExport, diff_snapshots, find_duplicates, scan, write_snapshot)
 
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                try:
-                    if os.path.isfile(fp):
-                        file_size = os.path.getsize(fp)
-                        total_size += file_size
-                        folder_size += file_size
+# Files smaller than this are not stored in a scan index
+DEFAULT_FILE_FLOOR = 1024 ** 2
+
+# Report formats; json and csv give sizes in bytes for scripts
+OUTPUT_FORMATS = ("text", "json", "csv")
+
+# Rows per list of a --diff report without --top
+DEFAULT_DIFF_TOP = 20
+
+def get_size(start_path='.', size_threshold=5 * 1024 ** 3, estimated_items=None, workers=None, backend=None,
+             top_n=None, file_store=None):
+    # Pass a scanner.FileStore as file_store to also record every file's size;
+    # by default only the large entries and per-folder sizes are kept
+    result = scan_with_progress(start_path, size_threshold, estimated_items, workers, backend, top_n, file_store)
+    return (result.total_size, result.folder_count, result.file_count, result.folder_sizes,
+            result.large_folders, result.large_files, result.error_paths)
+
+def scan_with_progress(start_path='.', size_threshold=5 * 1024 ** 3, estimated_items=None, workers=None,
+                       backend=None, top_n=None, file_store=None, record_dirs=False, previous_scan=None,
+                       profile=None, inode_limit=None, allocated=False, scan_filter=None, show_progress=True,
+                       export=None):
+    """Run scanner.scan() with a progress bar and return its ScanResult
+
+    previous_scan is an optional (ScanIndex, scan id) pair: folders that have
+    not changed since that scan are not listed again (always sequential).
+    With show_progress=False the scan runs without a bar (and tqdm is never
+    imported). export is an optional scanner.StreamExport.
+    """
+    def run(on_progress=None):
+        return scan(start_path, size_threshold, backend, workers, top_n, file_store, record_dirs,
+                    previous_scan, on_progress=on_progress, profile=profile, inode_limit=inode_limit,
+                    allocated=allocated, scan_filter=scan_filter, export=export)
+
+    if not show_progress:
+        return run()
+
+    # Imported here: tqdm takes a noticeable part of the start-up time of
+    # scripted runs, which do not show a bar
+    from tqdm import tqdm
 
-                        file_sizes[fp] = file_size
+    # Single pass: progress is based on what has been discovered so far. If an
+    # estimate from a previous scan of this path is available it is used as the
+    # bar total, otherwise tqdm just shows a running count and rate.
+    with tqdm(total=estimated_items, desc="Scanning", unit="item") as pbar:
+        # Called once per directory (per partition with processes), which
+        # keeps the bar cheap on huge trees
+        def on_progress(items, scanned_size, current_path):
+            update_progress_bar(pbar, items - pbar.n, scanned_size)
 
-                        if file_size > size_threshold:
-                            large_files.append((fp, file_size))
-                except (PermissionError, OSError) as e:
-                    error_paths.append((fp, str(e)))
-                finally:
-                    pbar.update(1)
+        return run(on_progress)
 
-            folder_sizes[dirpath] = folder_size
+def duplicates_with_progress(file_store, min_size, workers=None, show_progress=True):
+    """Run scanner.find_duplicates() on the files of a scan with a progress bar"""
+    if not show_progress:
+        return find_duplicates(file_store, min_size, workers)
+    from tqdm import tqdm
 
-            if folder_size > size_threshold:
-                large_folders.append((dirpath, folder_size))
+    # Only files sharing their size with another one are hashed, so the
+    # bar counts those as they are done rather than every scanned file
+    with tqdm(desc="Comparing", unit="file") as pbar:
+        def on_progress(files_hashed, bytes_read):
+            pbar.update(files_hashed - pbar.n)
+            pbar.set_postfix(read=format_size(bytes_read), refresh=False)
 
-            pbar.update(1)
+        return find_duplicates(file_store, min_size, workers, on_progress=on_progress)
 
-    return total_size, folder_count, file_count, folder_sizes, large_folders, large_files, error_paths
+def update_progress_bar(pbar, items, scanned_size):
+    pbar.update(items)
+    pbar.set_postfix(scanned=format_size(scanned_size), refresh=False)
+
+    # Grow the estimate if the tree got bigger since the last scan
+    if pbar.total is not None and pbar.n > pbar.total:
+        pbar.total = pbar.n
 
 def format_size(size_bytes):
     """Format the size in bytes to a human-readable format"""
@@ -63,10 +92,339 @@ def format_size(size_bytes):
         size_bytes /= 1024.0
     return f"{size_bytes:.2f} {unit}"
 
-def display_results(start_path='.', size_threshold=5 * 1024 ** 3, export_to_file=False):
+def parse_size(text):
+    """Parse a size such as 5GB, 500MB, 1.5TB or 1024B into bytes"""
+    # Parse the input to extract number and unit
+    match = re.match(r"^(\d+\.?\d*)([KMGT]?B)$", text.strip().upper())
+    if not match:
+        raise ValueError("Invalid input format. Example formats: 5GB, 500MB, 10TB, 1024B")
+
+    value, unit = match.groups()
+
+    # Convert to bytes based on unit
+    unit_multipliers = {
+        "B": 1,
+        "KB": 1024,
+        "MB": 1024 ** 2,
+        "GB": 1024 ** 3,
+        "TB": 1024 ** 4
+    }
+    return float(value) * unit_multipliers[unit]
+
+def display_results(start_path='.', size_threshold=5 * 1024 ** 3, export_to_file=False, estimated_items=None,
+                    workers=None, backend=None, top_n=None, index_path=None, file_floor=DEFAULT_FILE_FLOOR,
+                    incremental=False, profile=None, inode_limit=None, allocated=False, excludes=(), includes=(),
+                    max_depth=None, one_file_system=False, duplicate_min_size=None, show_progress=True,
+                    output_format="text", output_path=None, export_path=None, export_format="ndjson",
+                    snapshot_path=None):
+    # profile is an optional scanner.ScanProfile, printed after the results;
+    # inode_limit bounds the memory used to count hard-linked files once and
+    # allocated adds the space allocated on disk next to apparent sizes. The
+    # next four options skip parts of the tree (see scanner.ScanFilter). With
+    # duplicate_min_size, files of at least that size are also compared to
+    # find identical copies. output_format and output_path are passed on to
+    # report_results(). With export_path, every file and folder is written
+    # there during the scan as export_format ("-" for standard output, in
+    # which case the report goes to standard error). snapshot_path saves the
+    # scan with every file as a snapshot for --open-snapshot.
+    index = None
+    file_store = None
+    previous_scan = None
+    notes = []
+    if index_path:
+        # Saving to an index records the files over file_floor and every
+        # folder's mtime as well, and a previous scan of the same path seeds
+        # the progress estimate. Index paths are absolute so that later
+        # incremental scans find the same folders again.
+        start_path = os.path.abspath(start_path)
+        try:
+            index = ScanIndex(index_path)
+        except (OSError, ValueError, sqlite3.DatabaseError) as e:
+            raise SystemExit(f"Error: cannot open {index_path}: {e}")
+        previous = index.latest_scan(start_path)
+        if estimated_items is None and previous:
+            estimated_items = previous["folder_count"] + previous["file_count"]
+
+        if incremental:
+            # Filtered scans lack what their filter skipped, so only the
+            # latest scan of the whole tree can be the base
+            base = index.latest_scan(start_path, unfiltered=True)
+            if previous and (base is None or base["id"] != previous["id"]):
+                notes.append(f"Scan #{previous['id']} was filtered and is not used as the base")
+            if base:
+                previous_scan = (index, base["id"])
+                # Unchanged folders only know their files down to the old floor
+                if base["file_floor"] is not None:
+                    file_floor = max(file_floor, base["file_floor"])
+                    if size_threshold < base["file_floor"]:
+                        notes.append(f"Files under {format_size(base['file_floor'])} in unchanged folders "
+                                     f"are not listed")
+                notes.append(f"Incremental scan against scan #{base['id']}")
+            else:
+                notes.append("No previous unfiltered scan of this directory in the index, scanning everything")
+        file_store = FileStore(file_floor)
+
+    # Duplicates are looked for among the files the scan records, and a
+    # snapshot keeps all of them
+    if duplicate_min_size is not None and snapshot_path is None:
+        store_floor = duplicate_min_size
+    elif snapshot_path is not None:
+        store_floor = 0
+    else:
+        store_floor = None
+    if store_floor is not None:
+        if file_store is None:
+            file_store = FileStore(store_floor)
+        elif file_store.min_size > store_floor:
+            notes.append(f"Only files of at least {format_size(file_store.min_size)} (the index file floor) "
+                         f"are compared for duplicates or kept in the snapshot")
+
+    scan_filter = ScanFilter(start_path, excludes, includes, max_depth, one_file_system)
+    if excludes:
+        notes.append(f"Excluding: {', '.join(excludes)}")
+    if includes:
+        notes.append(f"Only counting files matching: {', '.join(includes)}")
+    if max_depth is not None:
+        notes.append(f"Not listing folders more than {max_depth} levels deep")
+    if one_file_system:
+        notes.append("Staying on the file system of the scanned directory")
+
+    if snapshot_path is not None:
+        # Fail before the scan rather than after it. Opening for appending
+        # leaves an existing snapshot as it is until the new one replaces it
+        existed = os.path.exists(snapshot_path)
+        try:
+            open(snapshot_path, 'ab').close()
+        except OSError as e:
+            raise SystemExit(f"Error: cannot write the snapshot to {snapshot_path}: {e.strerror or e}")
+        if not existed:
+            os.remove(snapshot_path)
+
+    export = None
+    if export_path == "-":
+        # Paths that are not valid UTF-8 are written out as they are
+        sys.stdout.reconfigure(errors="surrogateescape")
+        export = StreamExport(sys.stdout, export_format)
+    elif export_path is not None:
+        try:
+            stream = open(export_path, 'w', encoding='utf-8', errors='surrogateescape', newline='')
+        except OSError as e:
+            raise SystemExit(f"Error: cannot write the inventory to {export_path}: {e.strerror or e}")
+        export = StreamExport(stream, export_format)
+
     start_time = time.time()
-    total_size, folder_count, file_count, folder_sizes, large_folders, large_files, error_paths = get_size(start_path, size_threshold)
-    scan_time = time.time() - start_time
+    try:
+        result = scan_with_progress(start_path, size_threshold, estimated_items, workers, backend, top_n,
+                                    file_store, record_dirs=index is not None, previous_scan=previous_scan,
+                                    profile=profile, inode_limit=inode_limit, allocated=allocated,
+                                    scan_filter=scan_filter, show_progress=show_progress, export=export)
+
+        if previous_scan is not None and result.unique_size is None:
+            notes.append("Unique size not known: files in unchanged folders have no inode numbers")
+        if index:
+            scan_id = index.save_scan(start_path, result, result.scan_time, started=start_time,
+                                      scan_filter=scan_filter)
+            notes.append(f"Scan saved to {index_path} as scan #{scan_id}")
+        if snapshot_path is not None:
+            # The scan is not lost if the snapshot cannot be written after all
+            try:
+                write_snapshot(snapshot_path, result, started=start_time)
+                notes.append(f"Snapshot saved to {snapshot_path}")
+            except OSError as e:
+                notes.append(f"Error: the snapshot could not be written to {snapshot_path}: {e.strerror or e}")
+    finally:
+        if index:
+            index.close()
+        if export is not None:
+            if export_path == "-":
+                sys.stdout.flush()
+            else:
+                export.stream.close()
+    if export is not None and export_path != "-":
+        notes.append(f"{export.rows} files, folders and errors exported to {export_path}")
+
+    duplicates = None
+    if duplicate_min_size is not None:
+        duplicates = duplicates_with_progress(file_store, duplicate_min_size, workers, show_progress)
+
+    # Keep standard output for the exported rows, and machine-readable
+    # reports free of the profile
+    report_stdout = sys.stderr if export_path == "-" and output_path is None else sys.stdout
+    profile_stdout = sys.stderr if report_stdout is sys.stderr or output_format != "text" else sys.stdout
+
+    report_start = time.perf_counter()
+    with redirect_stdout(report_stdout):
+        report_results(start_path, size_threshold, result.scan_time, result.total_size, result.folder_count,
+                       result.file_count, result.large_folders, result.large_files, result.error_paths,
+                       export_to_file, top_n, notes, result.unique_size, result.allocated_size,
+                       result.allocated, duplicates, output_format, output_path)
+
+    if profile is not None:
+        profile.add_time("report", time.perf_counter() - report_start)
+        with redirect_stdout(profile_stdout):
+            print("\nScan profile:")
+            for line in profile.report_lines(result.folder_count + result.file_count):
+                print(line)
+
+def display_saved_scan(index_path, size_threshold=5 * 1024 ** 3, export_to_file=False, top_n=None, scan_id=None,
+                       output_format="text", output_path=None):
+    """Show the results of a scan saved with --index without scanning again"""
+    try:
+        with ScanIndex(index_path, read_only=True) as index:
+            info = index.latest_scan() if scan_id is None else index.scan_info(scan_id)
+            if info is None:
+                print(f"No scans saved in {index_path}")
+                return
+            total_size, folder_count, file_count, large_folders, large_files, error_paths = index.load_results(
+                info["id"], size_threshold, top_n)
+    except KeyError as e:
+        raise SystemExit(f"Error: {e.args[0]}")
+    except FileNotFoundError as e:
+        raise SystemExit(f"Error: {e}")
+    except (OSError, ValueError, sqlite3.DatabaseError) as e:
+        raise SystemExit(f"Error: cannot open {index_path}: {e}")
+
+    notes = [f"Loaded scan #{info['id']} of {info['root']} from "
+             f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info['started']))}"]
+    if info["file_floor"] is not None and size_threshold < info["file_floor"]:
+        notes.append(f"Only files of at least {format_size(info['file_floor'])} were saved; "
+                     f"smaller files are not listed")
+
+    report_results(info["root"], size_threshold, info["duration"] or 0, total_size, folder_count, file_count,
+                   large_folders, large_files, error_paths, export_to_file, top_n, notes,
+                   output_format=output_format, output_path=output_path)
+
+def open_snapshot(snapshot_path):
+    """Open a snapshot for one of the --open-snapshot/--diff commands, exiting with a message if it cannot be"""
+    try:
+        return Snapshot(snapshot_path)
+    except FileNotFoundError:
+        raise SystemExit(f"Error: {snapshot_path} does not exist")
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Error: cannot open {snapshot_path}: {e}")
+
+def display_snapshot(snapshot_path, size_threshold=5 * 1024 ** 3, export_to_file=False, top_n=None, under=None,
+                     output_format="text", output_path=None):
+    """Show the results of a snapshot saved with --snapshot, optionally only under one folder"""
+    snapshot = open_snapshot(snapshot_path)
+    with snapshot:
+        info = snapshot.info
+        try:
+            total_size, folder_count, file_count, large_folders, large_files, error_paths = snapshot.load_results(
+                size_threshold, top_n, under)
+        except KeyError as e:
+            raise SystemExit(f"Error: {e.args[0]}")
+
+    notes = [f"Loaded snapshot of {info['root']} from "
+             f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info['started']))}"]
+    if under is not None:
+        notes.append(f"Only showing {os.path.abspath(under)}")
+    if info["file_floor"]:
+        notes.append(f"Only files of at least {format_size(info['file_floor'])} were saved; "
+                     f"smaller files are not listed")
+
+    report_results(under or info["root"], size_threshold, info["duration"] or 0, total_size, folder_count,
+                   file_count, large_folders, large_files, error_paths, export_to_file, top_n, notes,
+                   output_format=output_format, output_path=output_path)
+
+def display_diff(old_path, new_path, size_threshold=5 * 1024 ** 3, export_to_file=False, top_n=None,
+                 output_format="text", output_path=None):
+    """Show what changed between two snapshots saved with --snapshot"""
+    top_n = top_n or DEFAULT_DIFF_TOP
+    with open_snapshot(old_path) as old, open_snapshot(new_path) as new:
+        diff = diff_snapshots(old, new, top_n, size_threshold)
+
+    if output_format != "text":
+        report = {
+            "old": {"path": old_path, "root": diff.old_info["root"], "started": diff.old_info["started"],
+                    "total_size": diff.old_info["total_size"]},
+            "new": {"path": new_path, "root": diff.new_info["root"], "started": diff.new_info["started"],
+                    "total_size": diff.new_info["total_size"]},
+            "size_change": diff.size_change,
+            "new_folder_count": diff.new_folder_count,
+            "deleted_folder_count": diff.deleted_folder_count,
+        }
+        for name in ("growers", "shrinkers"):
+            report[name] = [{"path": path, "old_size": old_size, "new_size": new_size}
+                            for path, old_size, new_size in getattr(diff, name)]
+        for name in ("new_files", "deleted_files"):
+            report[name] = [{"path": path, "size": size} for path, size in getattr(diff, name)]
+        write_diff_report(report, output_format, output_path)
+        return
+
+    def when(info):
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info["started"]))
+
+    results = []
+    results.append(f"\nChanges from {old_path} ({diff.old_info['root']}, {when(diff.old_info)})")
+    results.append(f"          to {new_path} ({diff.new_info['root']}, {when(diff.new_info)})")
+    results.append(f"Total size: {format_size(diff.old_info['total_size'])} -> "
+                   f"{format_size(diff.new_info['total_size'])} ({format_change(diff.size_change)})")
+    results.append(f"Folders: {diff.new_folder_count} new, {diff.deleted_folder_count} deleted")
+
+    for title, rows in (("grew the most", diff.growers), ("shrank the most", diff.shrinkers)):
+        results.append(f"\nFolders that {title} (including subfolders):")
+        if rows:
+            for path, old_size, new_size in rows:
+                results.append(f" - {path}: {format_change(new_size - old_size)} "
+                               f"({format_size(old_size)} -> {format_size(new_size)})")
+        else:
+            results.append(" - None")
+
+    for title, rows in (("New", diff.new_files), ("Deleted", diff.deleted_files)):
+        results.append(f"\n{title} files over {format_size(size_threshold)}:")
+        if rows:
+            for path, size in rows:
+                results.append(f" - {path}: {format_size(size)}")
+        else:
+            results.append(" - None")
+
+    if output_path is not None:
+        write_text_report(output_path, diff.new_info["root"], size_threshold, results)
+        return
+    for line in results:
+        print(line)
+
+    if export_to_file:
+        export_path = f"file_size_diff_{time.strftime('%Y%m%d-%H%M%S')}.txt"
+        try:
+            write_text_report(export_path, diff.new_info["root"], size_threshold, results)
+            print(f"\nResults exported to {export_path}")
+        except Exception as e:
+            print(f"\nFailed to export results: {e}")
+
+def format_change(delta):
+    """Format a size difference with its sign, e.g. +1.50 GB"""
+    return f"+{format_size(delta)}" if delta >= 0 else f"-{format_size(-delta)}"
+
+def write_diff_report(report, output_format, output_path=None):
+    """Write a report dict built by display_diff() as JSON or CSV, with sizes in bytes"""
+    with open(output_path, 'w', encoding='utf-8', newline='') if output_path else nullcontext(sys.stdout) as f:
+        if output_format == "json":
+            json.dump(report, f, indent=2)
+            f.write("\n")
+            return
+
+        writer = csv.writer(f)
+        writer.writerow(["type", "path", "old_size", "new_size"])
+        for name, kind in (("growers", "grown"), ("shrinkers", "shrunk")):
+            for row in report[name]:
+                writer.writerow([kind, row["path"], row["old_size"], row["new_size"]])
+        for row in report["new_files"]:
+            writer.writerow(["new_file", row["path"], 0, row["size"]])
+        for row in report["deleted_files"]:
+            writer.writerow(["deleted_file", row["path"], row["size"], 0])
+
+def report_results(start_path, size_threshold, scan_time, total_size, folder_count, file_count,
+                   large_folders, large_files, error_paths, export_to_file=False, top_n=None, notes=(),
+                   unique_size=None, allocated_size=None, allocated=None, duplicates=None, output_format="text",
+                   output_path=None):
+    # allocated maps folders and files to the space allocated for them on
+    # disk (only for scans run with allocated sizes); duplicates is the
+    # scanner.Duplicates found after the scan, if they were looked for.
+    # output_format is one of OUTPUT_FORMATS; the report goes to output_path
+    # if given, otherwise to standard output.
+    allocated = allocated or {}
 
     # Sort large folders by size (largest first)
     large_folders.sort(key=lambda x: x[1], reverse=True)
@@ -74,26 +432,85 @@ def display_results(start_path='.', size_threshold=5 * 1024 ** 3, export_to_file
     # Sort large files by size (largest first)
     large_files.sort(key=lambda x: x[1], reverse=True)
 
+    if output_format != "text":
+        report = {
+            "root": os.path.abspath(start_path),
+            "size_threshold": int(size_threshold),
+            "scan_time": scan_time,
+            "total_size": total_size,
+            "unique_size": unique_size,
+            "allocated_size": allocated_size,
+            "folder_count": folder_count,
+            "file_count": file_count,
+            "notes": list(notes),
+            "large_folders": [{"path": folder, "size": size, "direct_size": direct_size,
+                               "allocated": allocated.get(folder)}
+                              for folder, size, direct_size in large_folders],
+            "large_files": [{"path": file, "size": size, "allocated": allocated.get(file)}
+                            for file, size in large_files],
+            "errors": [{"path": path, "error": error} for path, error in error_paths],
+        }
+        if duplicates is not None:
+            report["duplicates"] = {
+                "wasted_size": duplicates.wasted_size,
+                "bytes_read": duplicates.bytes_read,
+                "groups": [group._asdict() for group in duplicates.groups[:top_n]],
+                "errors": [{"path": path, "error": error} for path, error in duplicates.error_paths],
+            }
+        write_report(report, output_format, output_path)
+        return
+
     # Prepare results
     results = []
     results.append(f"\nScan completed in {scan_time:.2f} seconds")
     results.append(f"Total storage scanned: {format_size(total_size)}")
+    if unique_size is not None and unique_size != total_size:
+        results.append(f"Unique size (hard links counted once): {format_size(unique_size)}")
+    if allocated_size is not None:
+        results.append(f"Allocated on disk: {format_size(allocated_size)}")
     results.append(f"Total Folders: {folder_count}")
     results.append(f"Total Files: {file_count}")
+    if top_n:
+        results.append(f"Showing at most the {top_n} largest folders and files")
+    results.extend(notes)
     
-    results.append(f"\nListing Folders over {format_size(size_threshold)}:")
+    results.append(f"\nListing Folders over {format_size(size_threshold)} (including subfolders):")
     if large_folders:
-        for folder, size in large_folders:
-            results.append(f" - {folder}: {format_size(size)}")
+        for folder, size, direct_size in large_folders:
+            if folder in allocated:
+                results.append(f" - {folder}: {format_size(size)} (directly inside: {format_size(direct_size)}, "
+                               f"allocated: {format_size(allocated[folder])})")
+            else:
+                results.append(f" - {folder}: {format_size(size)} (directly inside: {format_size(direct_size)})")
     else:
         results.append(f" - No folders over {format_size(size_threshold)}")
 
     results.append(f"\nListing Files over {format_size(size_threshold)}:")
     if large_files:
         for file, size in large_files:
-            results.append(f" - {file}: {format_size(size)}")
+            if file in allocated:
+                results.append(f" - {file}: {format_size(size)} (allocated: {format_size(allocated[file])})")
+            else:
+                results.append(f" - {file}: {format_size(size)}")
     else:
         results.append(f" - No files over {format_size(size_threshold)}")
+
+    if duplicates is not None:
+        results.append(f"\nDuplicate files ({len(duplicates.groups)} sets, {format_size(duplicates.wasted_size)} "
+                       f"in extra copies; {format_size(duplicates.bytes_read)} read to compare "
+                       f"{duplicates.candidates} files):")
+        if duplicates.groups:
+            for group in duplicates.groups[:top_n]:
+                results.append(f" - {len(group.paths)} copies of {format_size(group.size)} "
+                               f"({format_size(group.wasted)} in extra copies):")
+                for path in group.paths:
+                    results.append(f"     {path}")
+            if top_n and len(duplicates.groups) > top_n:
+                results.append(f" - ... and {len(duplicates.groups) - top_n} more sets")
+        else:
+            results.append(" - No duplicate files found")
+        for path, error in duplicates.error_paths[:10]:
+            results.append(f" - Could not compare {path}: {error}")
         
     if error_paths:
         results.append("\nErrors encountered during scan:")
@@ -103,6 +520,9 @@ def display_results(start_path='.', size_threshold=5 * 1024 ** 3, export_to_file
             results.append(f" - ... and {len(error_paths) - 10} more errors")
 
     # Display results
+    if output_path is not None:
+        write_text_report(output_path, start_path, size_threshold, results)
+        return
     for line in results:
         print(line)
         
@@ -110,86 +530,243 @@ def display_results(start_path='.', size_threshold=5 * 1024 ** 3, export_to_file
     if export_to_file:
         export_path = f"file_size_results_{time.strftime('%Y%m%d-%H%M%S')}.txt"
         try:
-            with open(export_path, 'w', encoding='utf-8') as f:
-                f.write(f"File Size Check Results - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Directory: {os.path.abspath(start_path)}\n")
-                f.write(f"Size threshold: {format_size(size_threshold)}\n\n")
-                for line in results:
-                    f.write(line + "\n")
+            write_text_report(export_path, start_path, size_threshold, results)
             print(f"\nResults exported to {export_path}")
         except Exception as e:
             print(f"\nFailed to export results: {e}")
 
+def write_text_report(path, start_path, size_threshold, lines):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"File Size Check Results - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Directory: {os.path.abspath(start_path)}\n")
+        f.write(f"Size threshold: {format_size(size_threshold)}\n\n")
+        for line in lines:
+            f.write(line + "\n")
+
+def write_report(report, output_format, output_path=None):
+    """Write a report dict built by report_results() as JSON or CSV, with sizes in bytes"""
+    with open(output_path, 'w', encoding='utf-8', newline='') if output_path else nullcontext(sys.stdout) as f:
+        if output_format == "json":
+            json.dump(report, f, indent=2)
+            f.write("\n")
+            return
+
+        # One row per folder, file, error and duplicate; duplicates of one
+        # set share a group number
+        writer = csv.writer(f)
+        writer.writerow(["type", "path", "size", "direct_size", "allocated", "group", "error"])
+        for row in report["large_folders"]:
+            writer.writerow(["folder", row["path"], row["size"], row["direct_size"], row["allocated"], "", ""])
+        for row in report["large_files"]:
+            writer.writerow(["file", row["path"], row["size"], "", row["allocated"], "", ""])
+        for number, group in enumerate(report.get("duplicates", {}).get("groups", []), 1):
+            for path in group["paths"]:
+                writer.writerow(["duplicate", path, group["size"], "", "", number, ""])
+        for row in report["errors"]:
+            writer.writerow(["error", row["path"], "", "", "", "", row["error"]])
+
 if __name__ == "__main__":
-    print("File Size Checker by Rashik- Find large files and folders")
-    print("================================================")
-    print("Choose the directory to scan:")
-    print("1. Current directory")
-    print("2. Different directory")
+    parser = argparse.ArgumentParser(
+        description="Find large files and folders. Without a path and a threshold, asks for the missing ones.")
+    parser.add_argument("path", nargs="?",
+                        help="directory to scan (default: ask)")
+    parser.add_argument("-t", "--threshold", type=parse_size, metavar="SIZE",
+                        help="list files and folders of at least SIZE, e.g. 5GB, 500MB, 1024B (default: ask)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="text",
+                        help="report format; json and csv give sizes in bytes (default: text)")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="write the report to FILE instead of standard output")
+    parser.add_argument("--export", metavar="FILE",
+                        help="write every scanned file and folder to FILE as the scan goes, with sizes in "
+                             "bytes ('-' for standard output; the report then goes to standard error)")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS,
+                        help="format of --export: one JSON object per line or CSV (default: csv for a .csv "
+                             "file, otherwise ndjson)")
+    parser.add_argument("--no-progress", action="store_true",
+                        help="do not show progress bars (they are only shown on a terminal anyway)")
+    parser.add_argument("--backend", choices=BACKENDS,
+                        help="scan backend (default: threads if --workers is above 1, otherwise sequential)")
+    parser.add_argument("--workers", type=int,
+                        help="number of worker threads or processes (default: number of CPUs)")
+    parser.add_argument("--top", type=int, metavar="N",
+                        help="only keep the N largest folders and files over the threshold")
+    parser.add_argument("--index", metavar="DB",
+                        help="save the scan to this SQLite index (created if missing)")
+    parser.add_argument("--index-file-floor", type=parse_size, default=DEFAULT_FILE_FLOOR, metavar="SIZE",
+                        help="smallest file size stored in the index (default: 1MB)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="with --index, only re-list folders changed since the last saved scan of the "
+                             "directory (files that grow in place are not re-measured)")
+    parser.add_argument("--open-index", metavar="DB",
+                        help="show a scan saved with --index instead of scanning")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="also save the scan with every file to FILE, a compact binary snapshot")
+    parser.add_argument("--open-snapshot", metavar="FILE",
+                        help="show a snapshot saved with --snapshot instead of scanning (memory-mapped, "
+                             "so even huge snapshots open instantly)")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"),
+                        help="instead of scanning, show which folders grew or shrank the most and which "
+                             "files over the threshold are new or deleted between two snapshots")
+    parser.add_argument("--under", metavar="PATH",
+                        help="with --open-snapshot, only show the folders and files under PATH")
+    parser.add_argument("--inode-limit", type=int, metavar="N",
+                        help="track at most N hard-linked files exactly, then switch to a fixed-size filter "
+                             "(bounds memory; unique sizes may come out slightly low)")
+    parser.add_argument("--allocated", action="store_true",
+                        help="also report the space allocated on disk (st_blocks), which is smaller than "
+                             "the apparent size for sparse and compressed files (not on Windows)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                        help="skip files and folders matching this glob, by name (e.g. node_modules, *.tmp) "
+                             "or, if it contains a /, by full path (e.g. /proc); may be repeated")
+    parser.add_argument("--include", action="append", default=[], metavar="PATTERN",
+                        help="only count files matching this glob (folders are still walked); may be repeated")
+    parser.add_argument("--max-depth", type=int, metavar="N",
+                        help="do not list folders more than N levels below the scanned directory")
+    parser.add_argument("-x", "--one-file-system", action="store_true",
+                        help="do not descend into folders on other file systems (mount points)")
+    parser.add_argument("--duplicates", action="store_true",
+                        help="also look for files with identical contents after the scan")
+    parser.add_argument("--duplicate-min-size", type=parse_size, default=DEFAULT_FILE_FLOOR, metavar="SIZE",
+                        help="smallest file compared by --duplicates (default: 1MB)")
+    parser.add_argument("--profile", action="store_true",
+                        help="print per-phase timings, filesystem call counts and the slowest directories")
+    parser.add_argument("--profile-dump", metavar="FILE",
+                        help="with --profile, write cProfile stats of the scanning thread to FILE")
+    parser.add_argument("--scan-id", type=int,
+                        help="with --open-index, the saved scan to show (default: the latest)")
+    args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.inode_limit is not None and args.inode_limit < 1:
+        parser.error("--inode-limit must be at least 1")
+    if args.allocated and not ALLOCATED_SIZES_AVAILABLE:
+        parser.error("--allocated is not available on this platform")
+    if args.top is not None and args.top < 1:
+        parser.error("--top must be at least 1")
+    if args.incremental and not args.index:
+        parser.error("--incremental needs --index")
+    if args.profile_dump and not args.profile:
+        parser.error("--profile-dump needs --profile")
+    if args.profile and args.open_index:
+        parser.error("--profile cannot be combined with --open-index")
+    if args.max_depth is not None and args.max_depth < 0:
+        parser.error("--max-depth cannot be negative")
+    if args.incremental and (args.exclude or args.include or args.max_depth is not None or args.one_file_system):
+        parser.error("--incremental cannot be combined with --exclude, --include, --max-depth or -x")
+    if args.incremental and args.export:
+        parser.error("--incremental cannot be combined with --export")
+    if args.export_format and not args.export:
+        parser.error("--export-format needs --export")
+    if args.export and args.open_index:
+        parser.error("--export cannot be combined with --open-index")
+    if args.incremental and args.backend == "processes":
+        parser.error("--incremental cannot be combined with --backend processes")
+    if sum(1 for option in (args.open_index, args.open_snapshot, args.diff) if option) > 1:
+        parser.error("only one of --open-index, --open-snapshot and --diff can be given")
+    if args.path is not None and (args.open_index or args.open_snapshot or args.diff):
+        parser.error("a path to scan cannot be combined with --open-index, --open-snapshot or --diff")
+    if (args.open_snapshot or args.diff) and (args.index or args.snapshot or args.export or args.profile):
+        parser.error("--open-snapshot and --diff cannot be combined with --index, --snapshot, --export or --profile")
+    if args.under and not args.open_snapshot:
+        parser.error("--under needs --open-snapshot")
+    if args.path is not None and not os.path.isdir(args.path):
+        parser.error(f"not a directory: {args.path}")
 
-    while True:
-        choice = input("\nEnter your choice (1 or 2): ")
+    # With everything given on the command line nothing is asked, so the
+    # checker can run from cron or batch jobs; a bar is only shown on a
+    # terminal, where someone watches it
+    saved = args.open_index or args.open_snapshot or (args.diff and " and ".join(args.diff))
+    interactive = args.threshold is None or (args.path is None and not saved)
+    show_progress = not args.no_progress and sys.stderr.isatty()
 
-        if choice == '1':
-            current_directory = os.getcwd()
-            break
-        elif choice == '2':
-            current_directory = input("Enter the directory location: ")
+    if interactive:
+        print("File Size Checker by Rashik- Find large files and folders")
+        print("================================================")
+    if saved:
+        if interactive:
+            print(f"Saved scans: {saved}")
+    elif args.path is not None:
+        current_directory = args.path
+    else:
+        print("Choose the directory to scan:")
+        print("1. Current directory")
+        print("2. Different directory")
 
-            if not os.path.isdir(current_directory):
-                print("Invalid directory. Please enter a valid path.")
-                continue
-            break
-        else:
-            print("Invalid choice. Please enter 1 or 2.")
+        while True:
+            choice = input("\nEnter your choice (1 or 2): ")
+
+            if choice == '1':
+                current_directory = os.getcwd()
+                break
+            elif choice == '2':
+                current_directory = input("Enter the directory location: ")
+
+                if not os.path.isdir(current_directory):
+                    print("Invalid directory. Please enter a valid path.")
+                    continue
+                break
+            else:
+                print("Invalid choice. Please enter 1 or 2.")
 
-    print(f"Current Working Directory: {current_directory}")
+        print(f"Current Working Directory: {current_directory}")
 
     while True:
         try:
-            size_input = input("\nSize of Files to scan (e.g., 5GB, 500MB, 10TB, 1024B): ")
-            
-            # Parse the input to extract number and unit
-            match = re.match(r"^(\d+\.?\d*)([KMGT]?B)$", size_input.strip().upper())
-            if not match:
-                print("Invalid input format. Example formats: 5GB, 500MB, 10TB, 1024B")
-                continue
-                
-            value, unit = match.groups()
-            value = float(value)
-            
-            # Convert to bytes based on unit
-            unit_multipliers = {
-                "B": 1,
-                "KB": 1024,
-                "MB": 1024 ** 2,
-                "GB": 1024 ** 3,
-                "TB": 1024 ** 4
-            }
-            
-            # Handle both KB and K, MB and M, etc.
-            if unit == "B":
-                multiplier = unit_multipliers["B"]
+            if args.threshold is not None:
+                size_threshold = args.threshold
+                export_to_file = False
             else:
-                # Get the full unit name (e.g., "GB" from "G")
-                full_unit = unit if unit in unit_multipliers else unit[0] + "B"
-                multiplier = unit_multipliers.get(full_unit)
-                
-            if not multiplier:
-                print("Invalid unit. Please use B, KB, MB, GB, or TB.")
-                continue
+                size_input = input("\nSize of Files to scan (e.g., 5GB, 500MB, 10TB, 1024B): ")
                 
-            # Ask if user wants to export results
-            export_choice = input("Export results to a text file? (y/n): ").lower()
-            export_to_file = export_choice.startswith('y')
+                try:
+                    size_threshold = parse_size(size_input)
+                except ValueError as e:
+                    print(e)
+                    continue
+                    
+                # Ask if user wants to export results (unless --output says where)
+                export_to_file = False
+                if args.output is None:
+                    export_choice = input("Export results to a text file? (y/n): ").lower()
+                    export_to_file = export_choice.startswith('y')
                 
-            size_threshold = value * multiplier
-            display_results(current_directory, size_threshold, export_to_file)
+            if args.diff:
+                display_diff(args.diff[0], args.diff[1], size_threshold, export_to_file, args.top, args.format,
+                             args.output)
+            elif args.open_snapshot:
+                display_snapshot(args.open_snapshot, size_threshold, export_to_file, args.top, args.under,
+                                 args.format, args.output)
+            elif args.open_index:
+                display_saved_scan(args.open_index, size_threshold, export_to_file, args.top, args.scan_id,
+                                   args.format, args.output)
+            else:
+                display_results(current_directory, size_threshold, export_to_file,
+                                workers=args.workers, backend=args.backend, top_n=args.top,
+                                index_path=args.index, file_floor=args.index_file_floor,
+                                incremental=args.incremental,
+                                profile=ScanProfile(cprofile_path=args.profile_dump) if args.profile else None,
+                                inode_limit=args.inode_limit, allocated=args.allocated,
+                                excludes=args.exclude, includes=args.include, max_depth=args.max_depth,
+                                one_file_system=args.one_file_system,
+                                duplicate_min_size=args.duplicate_min_size if args.duplicates else None,
+                                show_progress=show_progress, output_format=args.format, output_path=args.output,
+                                export_path=args.export,
+                                export_format=args.export_format or (
+                                    "csv" if args.export and args.export.lower().endswith(".csv") else "ndjson"),
+                                snapshot_path=args.snapshot)
             break
         except ValueError as e:
+            if args.threshold is not None:
+                # Nothing to ask again in a scripted run
+                sys.exit(f"Error: {e}")
             print(f"Error parsing input: {e}")
             print("Please enter a valid number with a unit (e.g., 5GB, 500MB).")
         except KeyboardInterrupt:
             print("\nScan cancelled.")
             exit(0)
+        except BrokenPipeError:
+            # Whatever read the report or export (e.g. head) has stopped
+            # reading; end quietly, as other command-line tools do
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            sys.exit(1)
 
@@ -1,16 +1,31 @@
+import bisect
+import multiprocessing
 import os
 import re
 import time
 import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-from tqdm import tqdm
 import subprocess
 import webbrowser
 import platform
 import ctypes
 from PIL import Image, ImageTk  # Add PIL import for image handling
 import sys
+from scanner import ALLOCATED_SIZES_AVAILABLE, BACKENDS, DirTree, FileStore, ProgressChannel, ScanFilter, ScanIndex, ScanProfile, Snapshot, StreamExport, is_snapshot, scan
+
+# How often the progress display is refreshed while scanning
+PROGRESS_POLL_MS = 100
+
+# Number of rows inserted into a result tree per event loop turn
+TREE_CHUNK_SIZE = 500
+
+# Most rows shown per result tree while a scan is still running
+LIVE_RESULTS_LIMIT = 1000
+
+# Files from this size up are kept for the Browse tab; smaller ones are
+# summed up per folder, which keeps the memory of huge trees in check
+BROWSE_MIN_FILE_SIZE = 1024 * 1024
 
 # Function to open file or folder
 def open_file_or_folder(path):
@@ -81,6 +96,24 @@ class FileSizeCheckerApp:
         self.results = []
         self.large_folders = []
         self.large_files = []
+        # Item counts of previous scans, used as progress estimates
+        self.previous_scan_items = {}
+        self.progress_channel = ProgressChannel()
+        # Bumped whenever results are cleared, to stop chunked tree fills
+        self.fill_generation = 0
+        # Latest fill of each tree; re-sorting a tree replaces its fill
+        self.tree_fills = {}
+        # Space allocated on disk per folder and large file, when measured
+        self.allocated = {}
+        # Column each tree is sorted by: tree -> (column, descending)
+        self.sort_orders = {}
+        # Rows streamed into the trees while scanning: tree -> (sizes, item ids)
+        self.live_rows = {}
+        self.live_found_counts = {}
+        # Folder tree of the last scan for the Browse tab, and the path of
+        # every item shown in it: item id -> path
+        self.dir_tree = None
+        self.browse_paths = {}
         
         self.create_widgets()
         
@@ -116,6 +149,7 @@ class FileSizeCheckerApp:
         self.style.configure("TLabel", background=self.bg_color, foreground=self.fg_color, font=("Segoe UI", 10))
         self.style.configure("Header.TLabel", background=self.bg_color, foreground=self.fg_color, font=("Segoe UI", 18, "bold"))
         self.style.configure("Subheader.TLabel", background=self.bg_color, foreground=self.fg_color, font=("Segoe UI", 12))
+        self.style.configure("TCheckbutton", background=self.bg_color, foreground=self.fg_color, font=("Segoe UI", 10))
         
         # Button styles - make them look like Windows 10/11 buttons
         self.style.configure("TButton", 
@@ -306,6 +340,62 @@ class FileSizeCheckerApp:
                                  width=5, state="readonly")
         unit_combo.pack(side=tk.LEFT)
         
+        # Number of threads (or processes) listing directories concurrently
+        workers_label = ttk.Label(size_frame, text="Workers:")
+        workers_label.pack(side=tk.LEFT, padx=(20, 5))
+        
+        self.workers_var = tk.StringVar(value="1")
+        workers_entry = ttk.Entry(size_frame, textvariable=self.workers_var, width=5)
+        workers_entry.pack(side=tk.LEFT)
+        
+        # Scan backend; "auto" uses threads when there are several workers
+        backend_label = ttk.Label(size_frame, text="Backend:")
+        backend_label.pack(side=tk.LEFT, padx=(20, 5))
+        
+        self.backend_var = tk.StringVar(value="auto")
+        backend_combo = ttk.Combobox(size_frame, textvariable=self.backend_var, 
+                                    values=["auto", *BACKENDS], width=10, state="readonly")
+        backend_combo.pack(side=tk.LEFT)
+        
+        # Only keep the N largest results (bounded memory on huge volumes)
+        top_label = ttk.Label(size_frame, text="Show:")
+        top_label.pack(side=tk.LEFT, padx=(20, 5))
+        
+        self.top_var = tk.StringVar(value="All")
+        top_combo = ttk.Combobox(size_frame, textvariable=self.top_var, 
+                                values=["All", "100", "1000", "10000"], width=7)
+        top_combo.pack(side=tk.LEFT)
+        
+        # Parts of the tree to skip (see scanner.ScanFilter)
+        filter_frame = ttk.Frame(left_panel)
+        filter_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        exclude_label = ttk.Label(filter_frame, text="Exclude (; separated):")
+        exclude_label.pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.exclude_var = tk.StringVar()
+        exclude_entry = ttk.Entry(filter_frame, textvariable=self.exclude_var, width=22)
+        exclude_entry.pack(side=tk.LEFT)
+        
+        # Only files matching one of these are counted (folders are still walked)
+        include_label = ttk.Label(filter_frame, text="Include:")
+        include_label.pack(side=tk.LEFT, padx=(20, 5))
+        
+        self.include_var = tk.StringVar()
+        include_entry = ttk.Entry(filter_frame, textvariable=self.include_var, width=18)
+        include_entry.pack(side=tk.LEFT)
+        
+        depth_label = ttk.Label(filter_frame, text="Max depth:")
+        depth_label.pack(side=tk.LEFT, padx=(20, 5))
+        
+        self.max_depth_var = tk.StringVar()
+        depth_entry = ttk.Entry(filter_frame, textvariable=self.max_depth_var, width=5)
+        depth_entry.pack(side=tk.LEFT)
+        
+        self.one_file_system_var = tk.BooleanVar(value=False)
+        one_fs_check = ttk.Checkbutton(filter_frame, text="One file system", variable=self.one_file_system_var)
+        one_fs_check.pack(side=tk.LEFT, padx=(20, 0))
+        
         # Buttons
         btn_frame = ttk.Frame(main_frame)
         btn_frame.pack(fill=tk.X, pady=(0, 20))
@@ -317,7 +407,27 @@ class FileSizeCheckerApp:
         self.stop_btn.pack(side=tk.LEFT, padx=(0, 10))
         
         self.export_btn = ttk.Button(btn_frame, text="Export Results", command=self.export_results, state=tk.DISABLED, width=15)
-        self.export_btn.pack(side=tk.LEFT)
+        self.export_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.open_index_btn = ttk.Button(btn_frame, text="Open Saved Scan", command=self.open_saved_scan, width=17)
+        self.open_index_btn.pack(side=tk.LEFT)
+        
+        # Record timings and counters of the scan for the Diagnostics tab
+        self.profile_var = tk.BooleanVar(value=False)
+        profile_check = ttk.Checkbutton(btn_frame, text="Profile scan", variable=self.profile_var)
+        profile_check.pack(side=tk.LEFT, padx=(20, 0))
+        
+        # Measure the space allocated on disk as well (st_blocks), which
+        # costs a second pass over every folder's files
+        self.allocated_var = tk.BooleanVar(value=False)
+        allocated_check = ttk.Checkbutton(btn_frame, text="Allocated sizes", variable=self.allocated_var,
+                                          state=tk.NORMAL if ALLOCATED_SIZES_AVAILABLE else tk.DISABLED)
+        allocated_check.pack(side=tk.LEFT, padx=(20, 0))
+        
+        # Write every file and folder to a file while scanning
+        self.inventory_var = tk.BooleanVar(value=False)
+        inventory_check = ttk.Checkbutton(btn_frame, text="Save full inventory", variable=self.inventory_var)
+        inventory_check.pack(side=tk.LEFT, padx=(20, 0))
         
         # Progress section
         progress_frame = ttk.Frame(main_frame)
@@ -358,7 +468,21 @@ class FileSizeCheckerApp:
                               background=self.secondary_color, foreground=self.fg_color, anchor=tk.W, padding=5)
         path_header.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
-        # Size header (right column)
+        # Space allocated on disk including subfolders (rightmost column)
+        folder_allocated_header = ttk.Label(folders_header_frame, text="Allocated", font=("Segoe UI", 10, "bold"), 
+                                          background=self.secondary_color, foreground=self.fg_color, 
+                                          width=12, anchor=tk.E, padding=5)
+        folder_allocated_header.pack(side=tk.RIGHT)
+        self.folder_allocated_header = folder_allocated_header
+        
+        # Size directly inside the folder
+        direct_header = ttk.Label(folders_header_frame, text="Direct", font=("Segoe UI", 10, "bold"), 
+                                background=self.secondary_color, foreground=self.fg_color, 
+                                width=12, anchor=tk.E, padding=5)
+        direct_header.pack(side=tk.RIGHT)
+        self.direct_header = direct_header
+        
+        # Total size including subfolders
         size_header = ttk.Label(folders_header_frame, text="Size", font=("Segoe UI", 10, "bold"), 
                               background=self.secondary_color, foreground=self.fg_color, 
                               width=12, anchor=tk.E, padding=5)
@@ -369,10 +493,18 @@ class FileSizeCheckerApp:
         folders_view_frame.pack(fill=tk.BOTH, expand=True)
         
         # Create folders treeview
-        self.folders_tree = ttk.Treeview(folders_view_frame, columns=("size"), show="tree", 
+        self.folders_tree = ttk.Treeview(folders_view_frame, columns=("size", "direct", "allocated"), show="tree", 
                                        style="Treeview", selectmode="browse")
-        self.folders_tree.column("#0", width=700, stretch=True)
+        self.folders_tree.column("#0", width=600, stretch=True)
         self.folders_tree.column("size", width=100, anchor=tk.E, stretch=False)
+        self.folders_tree.column("direct", width=100, anchor=tk.E, stretch=False)
+        self.folders_tree.column("allocated", width=100, anchor=tk.E, stretch=False)
+        
+        # Click a column header to sort by it (again to reverse the order)
+        self.bind_sort_header(path_header, self.folders_tree, "path")
+        self.bind_sort_header(size_header, self.folders_tree, "size")
+        self.bind_sort_header(direct_header, self.folders_tree, "direct")
+        self.bind_sort_header(folder_allocated_header, self.folders_tree, "allocated")
         
         # Create scrollbars
         folders_vsb = ttk.Scrollbar(folders_view_frame, orient="vertical", command=self.folders_tree.yview)
@@ -404,21 +536,34 @@ class FileSizeCheckerApp:
                                    background=self.secondary_color, foreground=self.fg_color, anchor=tk.W, padding=5)
         file_path_header.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
-        # Size header (right column)
+        # Allocated size header (rightmost column)
+        file_allocated_header = ttk.Label(files_header_frame, text="Allocated", font=("Segoe UI", 10, "bold"), 
+                                        background=self.secondary_color, foreground=self.fg_color, 
+                                        width=12, anchor=tk.E, padding=5)
+        file_allocated_header.pack(side=tk.RIGHT)
+        self.file_allocated_header = file_allocated_header
+        
+        # Size header
         file_size_header = ttk.Label(files_header_frame, text="Size", font=("Segoe UI", 10, "bold"), 
                                    background=self.secondary_color, foreground=self.fg_color, 
                                    width=12, anchor=tk.E, padding=5)
         file_size_header.pack(side=tk.RIGHT)
+        self.file_size_header = file_size_header
         
         # Container for treeview and scrollbar
         files_view_frame = ttk.Frame(files_container, style="TFrame")
         files_view_frame.pack(fill=tk.BOTH, expand=True)
         
         # Create files treeview
-        self.files_tree = ttk.Treeview(files_view_frame, columns=("size"), show="tree", 
+        self.files_tree = ttk.Treeview(files_view_frame, columns=("size", "allocated"), show="tree", 
                                      style="Treeview", selectmode="browse")
         self.files_tree.column("#0", width=700, stretch=True)
         self.files_tree.column("size", width=100, anchor=tk.E, stretch=False)
+        self.files_tree.column("allocated", width=100, anchor=tk.E, stretch=False)
+        
+        self.bind_sort_header(file_path_header, self.files_tree, "path")
+        self.bind_sort_header(file_size_header, self.files_tree, "size")
+        self.bind_sort_header(file_allocated_header, self.files_tree, "allocated")
         
         # Create scrollbars
         files_vsb = ttk.Scrollbar(files_view_frame, orient="vertical", command=self.files_tree.yview)
@@ -433,6 +578,9 @@ class FileSizeCheckerApp:
         # Add double-click event to open file
         self.files_tree.bind("<Double-1>", self.on_file_double_click)
         
+        # Allocated columns are only shown for scans that measured them
+        self.show_allocated_columns(False)
+        
         # Errors tab
         self.errors_frame = ttk.Frame(self.notebook, style="TFrame")
         self.notebook.add(self.errors_frame, text="Errors")
@@ -457,12 +605,118 @@ class FileSizeCheckerApp:
         self.errors_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         errors_hsb.pack(fill=tk.X)
         
+        # Browse tab: the folder tree of the last scan, largest first at
+        # every level. Folders are filled in when they are first expanded,
+        # from the tree kept in memory, so no folder is listed again
+        self.browse_frame = ttk.Frame(self.notebook, style="TFrame")
+        self.notebook.add(self.browse_frame, text="Browse")
+        
+        browse_container = ttk.Frame(self.browse_frame, style="TFrame")
+        browse_container.pack(fill=tk.BOTH, expand=True, padx=1, pady=1)
+        
+        browse_header_frame = ttk.Frame(browse_container, style="TFrame")
+        browse_header_frame.pack(fill=tk.X)
+        
+        ttk.Label(browse_header_frame, text="Name", font=("Segoe UI", 10, "bold"), 
+                background=self.secondary_color, foreground=self.fg_color, anchor=tk.W, 
+                padding=5).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # Share of the parent folder (rightmost column)
+        ttk.Label(browse_header_frame, text="Share", font=("Segoe UI", 10, "bold"), 
+                background=self.secondary_color, foreground=self.fg_color, 
+                width=8, anchor=tk.E, padding=5).pack(side=tk.RIGHT)
+        
+        ttk.Label(browse_header_frame, text="Size", font=("Segoe UI", 10, "bold"), 
+                background=self.secondary_color, foreground=self.fg_color, 
+                width=12, anchor=tk.E, padding=5).pack(side=tk.RIGHT)
+        
+        browse_view_frame = ttk.Frame(browse_container, style="TFrame")
+        browse_view_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.browse_tree = ttk.Treeview(browse_view_frame, columns=("size", "share"), show="tree", 
+                                      style="Treeview", selectmode="browse")
+        self.browse_tree.column("#0", width=700, stretch=True)
+        self.browse_tree.column("size", width=100, anchor=tk.E, stretch=False)
+        self.browse_tree.column("share", width=70, anchor=tk.E, stretch=False)
+        
+        browse_vsb = ttk.Scrollbar(browse_view_frame, orient="vertical", command=self.browse_tree.yview)
+        browse_hsb = ttk.Scrollbar(browse_container, orient="horizontal", command=self.browse_tree.xview)
+        self.browse_tree.configure(yscrollcommand=browse_vsb.set, xscrollcommand=browse_hsb.set)
+        
+        browse_vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        self.browse_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        browse_hsb.pack(fill=tk.X)
+        
+        self.browse_tree.bind("<<TreeviewOpen>>", self.on_browse_open)
+        self.browse_tree.bind("<Double-1>", self.on_browse_double_click)
+        
+        # Diagnostics tab, filled by scans run with "Profile scan" ticked
+        self.diagnostics_frame = ttk.Frame(self.notebook, style="TFrame")
+        self.notebook.add(self.diagnostics_frame, text="Diagnostics")
+        
+        self.diagnostics_text = scrolledtext.ScrolledText(self.diagnostics_frame, bg=self.secondary_color,
+                                                          fg=self.fg_color, insertbackground=self.fg_color,
+                                                          font=("Consolas", 10), relief=tk.FLAT, wrap=tk.NONE)
+        self.diagnostics_text.pack(fill=tk.BOTH, expand=True, padx=1, pady=1)
+        self.show_diagnostics(["Tick \"Profile scan\" before starting a scan to see where its time goes."])
+        
         # Status bar
         self.status_var = tk.StringVar(value="Ready")
         status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.FLAT, 
                              background=self.secondary_color, anchor=tk.W, padding=(5, 2))
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
     
+    def show_allocated_columns(self, show):
+        if show:
+            self.folders_tree.configure(displaycolumns=("size", "direct", "allocated"))
+            self.files_tree.configure(displaycolumns=("size", "allocated"))
+            # Packed before the other headers to stay the rightmost column
+            self.folder_allocated_header.pack(side=tk.RIGHT, before=self.direct_header)
+            self.file_allocated_header.pack(side=tk.RIGHT, before=self.file_size_header)
+        else:
+            self.folders_tree.configure(displaycolumns=("size", "direct"))
+            self.files_tree.configure(displaycolumns=("size",))
+            self.folder_allocated_header.pack_forget()
+            self.file_allocated_header.pack_forget()
+    
+    def bind_sort_header(self, header, tree, column):
+        header.config(cursor="hand2")
+        header.bind("<Button-1>", lambda event: self.sort_tree(tree, column))
+    
+    def sort_tree(self, tree, column):
+        # Sizes sort largest first and paths A-Z; clicking the same header
+        # again reverses the order. While scanning, the trees hold the rows
+        # streamed in so far, which only the final results replace
+        if self.scanning:
+            return
+        
+        previous_column, previous_descending = self.sort_orders.get(tree, ("size", True))
+        if column == previous_column:
+            descending = not previous_descending
+        else:
+            descending = column != "path"
+        self.sort_orders[tree] = (column, descending)
+        
+        if column == "path":
+            key = lambda row: row[0].lower()
+        elif column == "allocated":
+            # Rows without an allocated size (not measured) sort last
+            key = lambda row: self.allocated.get(row[0], -1)
+        elif column == "direct":
+            key = lambda row: row[2]
+        else:
+            key = lambda row: row[1]
+        
+        if tree is self.folders_tree:
+            self.large_folders.sort(key=key, reverse=descending)
+            rows, make_row = self.large_folders, self.folder_row
+        else:
+            self.large_files.sort(key=key, reverse=descending)
+            rows, make_row = self.large_files, self.file_row
+        
+        tree.delete(*tree.get_children())
+        self.fill_tree(tree, rows, make_row)
+    
     def on_folder_double_click(self, event):
         selected_items = self.folders_tree.selection()
         if not selected_items:
@@ -510,6 +764,74 @@ class FileSizeCheckerApp:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open file location: {e}")
     
+    def show_dir_tree(self, dir_tree):
+        # Show the top of the scanned tree in the Browse tab; everything
+        # below is inserted by on_browse_open when it is expanded
+        self.dir_tree = dir_tree
+        self.browse_tree.tag_configure("odd_row", background="#2a2a2a")
+        self.browse_tree.tag_configure("smaller", foreground="#888888")
+        root_path = dir_tree.root
+        item_id = self.insert_browse_item("", root_path, dir_tree.total(root_path), dir_tree.total(root_path), True)
+        self.browse_tree.item(item_id, open=True)
+        self.fill_browse_item(item_id)
+    
+    def insert_browse_item(self, parent, path, size, parent_size, is_folder, index=0):
+        # Folders that hold anything get a placeholder child, so that they
+        # show as expandable before their contents are looked up
+        name = path if parent == "" else os.path.basename(path)
+        share = f"{100 * size / parent_size:.1f}%" if parent_size else ""
+        tags = ["odd_row"] if index % 2 == 1 else []
+        item_id = self.browse_tree.insert(parent, tk.END, text=name, values=(self.format_size(size), share),
+                                          tags=tags)
+        self.browse_paths[item_id] = path
+        if is_folder and self.dir_tree.has_children(path):
+            self.browse_tree.insert(item_id, tk.END, text="Loading...")
+        return item_id
+    
+    def fill_browse_item(self, item_id):
+        # Replace the placeholder of a folder with its sub-folders and files,
+        # largest first. Files under BROWSE_MIN_FILE_SIZE were not kept and
+        # are shown as one row
+        tree = self.browse_tree
+        tree.delete(*tree.get_children(item_id))
+        path = self.browse_paths[item_id]
+        total = self.dir_tree.total(path)
+        
+        files = self.dir_tree.files(path)
+        entries = [(child, size, True) for child, size in self.dir_tree.children(path)]
+        entries += [(file, size, False) for file, size in files]
+        entries.sort(key=lambda entry: entry[1], reverse=True)
+        for index, (child, size, is_folder) in enumerate(entries):
+            self.insert_browse_item(item_id, child, size, total, is_folder, index)
+        
+        smaller_size = self.dir_tree.direct(path) - sum(size for _, size in files)
+        if smaller_size > 0:
+            share = f"{100 * smaller_size / total:.1f}%" if total else ""
+            tree.insert(item_id, tk.END, text=f"(files under {self.format_size(BROWSE_MIN_FILE_SIZE)})",
+                        values=(self.format_size(smaller_size), share), tags=("smaller",))
+    
+    def on_browse_open(self, event):
+        item_id = self.browse_tree.focus()
+        children = self.browse_tree.get_children(item_id)
+        # Only folders still holding their placeholder need filling
+        if len(children) == 1 and children[0] not in self.browse_paths:
+            self.fill_browse_item(item_id)
+    
+    def on_browse_double_click(self, event):
+        selected_items = self.browse_tree.selection()
+        if not selected_items or selected_items[0] not in self.browse_paths:
+            return
+        
+        # Double-clicking a folder expands it; a file opens its folder, as in
+        # the Large Files tab
+        path = self.browse_paths[selected_items[0]]
+        if self.browse_tree.get_children(selected_items[0]) or os.path.isdir(path):
+            return
+        try:
+            open_file_or_folder(os.path.dirname(path))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open folder: {e}")
+    
     def browse_directory(self):
         dir_path = filedialog.askdirectory(initialdir=self.dir_var.get())
         if dir_path:
@@ -523,24 +845,71 @@ class FileSizeCheckerApp:
             return
         
         try:
-            size_value = float(self.size_var.get())
-            if size_value <= 0:
-                raise ValueError("Size must be positive")
+            size_threshold = self.read_size_threshold()
+            top_n = self.read_top_n()
+            scan_filter = self.read_scan_filter(dir_path)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        try:
+            workers = int(self.workers_var.get())
+            if workers < 1:
+                raise ValueError("Worker count must be positive")
         except ValueError:
-            messagebox.showerror("Error", "Please enter a valid positive number for the size threshold!")
+            messagebox.showerror("Error", "Please enter a whole number of at least 1 for the workers!")
             return
+        backend = None if self.backend_var.get() == "auto" else self.backend_var.get()
+        profile = ScanProfile() if self.profile_var.get() else None
+        allocated = self.allocated_var.get() and ALLOCATED_SIZES_AVAILABLE
+        
+        export = None
+        if self.inventory_var.get():
+            export = self.open_inventory_export()
+            if export is None:
+                return
         
         # Prepare UI
         self.clear_results()
+        self.show_allocated_columns(allocated)
         
         self.scan_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
         self.export_btn.config(state=tk.DISABLED)
-        
-        self.progress_bar.start()
+        self.open_index_btn.config(state=tk.DISABLED)
+        
+        # Use the item count of the previous scan of this path (if any) as the
+        # progress estimate instead of walking the whole tree up front
+        estimated_items = self.previous_scan_items.get(os.path.abspath(dir_path))
+        self.progress_channel = ProgressChannel(estimated_items)
+        
+        if estimated_items:
+            self.progress_bar.config(mode="determinate", maximum=estimated_items, value=0)
+        else:
+            self.progress_bar.config(mode="indeterminate", value=0)
+            self.progress_bar.start()
+        self.progress_label.config(text="Scanning...")
         self.status_var.set("Scanning...")
         self.scanning = True
         
+        # Start scan in a separate thread
+        self.scan_thread = threading.Thread(
+            target=self.run_scan, 
+            args=(dir_path, size_threshold, workers, top_n, self.progress_channel, backend, profile, scan_filter,
+                  export, allocated),
+            daemon=True
+        )
+        self.scan_thread.start()
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+    
+    def read_size_threshold(self):
+        try:
+            size_value = float(self.size_var.get())
+            if size_value <= 0:
+                raise ValueError("Size must be positive")
+        except ValueError:
+            raise ValueError("Please enter a valid positive number for the size threshold!")
+        
         # Convert size to bytes
         unit = self.unit_var.get()
         unit_multipliers = {
@@ -550,46 +919,162 @@ class FileSizeCheckerApp:
             "GB": 1024 ** 3,
             "TB": 1024 ** 4
         }
-        size_threshold = size_value * unit_multipliers[unit]
+        return size_value * unit_multipliers[unit]
+    
+    def read_top_n(self):
+        # None means all results
+        top_value = self.top_var.get().strip()
+        try:
+            top_n = None if top_value.lower() in ("", "all") else int(top_value)
+            if top_n is not None and top_n < 1:
+                raise ValueError("Result limit must be positive")
+        except ValueError:
+            raise ValueError("Please choose 'All' or a whole number of results to show!")
+        return top_n
+    
+    def open_inventory_export(self):
+        # The inventory is written during the scan, so its file is chosen first
+        export_path = filedialog.asksaveasfilename(
+            defaultextension=".ndjson",
+            filetypes=[("NDJSON files", "*.ndjson"), ("CSV files", "*.csv"), ("All files", "*.*")],
+            initialfile=f"file_inventory_{time.strftime('%Y%m%d-%H%M%S')}"
+        )
+        if not export_path:
+            return None  # User cancelled
         
-        # Start scan in a separate thread
-        self.scan_thread = threading.Thread(
-            target=self.run_scan, 
-            args=(dir_path, size_threshold),
-            daemon=True
+        try:
+            stream = open(export_path, 'w', encoding='utf-8', errors='surrogateescape', newline='')
+        except OSError as e:
+            messagebox.showerror("Error", f"Cannot write the inventory: {e}")
+            return None
+        return StreamExport(stream, "csv" if export_path.lower().endswith(".csv") else "ndjson")
+    
+    def read_scan_filter(self, dir_path):
+        excludes = [pattern.strip() for pattern in self.exclude_var.get().split(";") if pattern.strip()]
+        includes = [pattern.strip() for pattern in self.include_var.get().split(";") if pattern.strip()]
+        depth_value = self.max_depth_var.get().strip()
+        try:
+            max_depth = int(depth_value) if depth_value else None
+            if max_depth is not None and max_depth < 0:
+                raise ValueError("Max depth cannot be negative")
+        except ValueError:
+            raise ValueError("Please leave the max depth empty or enter a whole number of at least 0!")
+        return ScanFilter(dir_path, excludes, includes, max_depth, self.one_file_system_var.get())
+    
+    def open_saved_scan(self):
+        try:
+            size_threshold = self.read_size_threshold()
+            top_n = self.read_top_n()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        index_path = filedialog.askopenfilename(
+            filetypes=[("Saved scans", "*.db *.sqlite *.fss"), ("Scan index", "*.db *.sqlite"),
+                       ("Snapshot", "*.fss"), ("All files", "*.*")]
         )
-        self.scan_thread.start()
+        if not index_path:
+            return  # User cancelled
+        
+        # Saved scans are answered from the index or the memory-mapped
+        # snapshot, no need for a worker thread
+        try:
+            if is_snapshot(index_path):
+                with Snapshot(index_path) as snapshot:
+                    info = snapshot.info
+                    total_size, folder_count, file_count, large_folders, large_files, error_paths = \
+                        snapshot.load_results(size_threshold, top_n)
+            else:
+                with ScanIndex(index_path, read_only=True) as index:
+                    info = index.latest_scan()
+                    if info is None:
+                        messagebox.showinfo("No Results", "The selected index does not contain any scans.")
+                        return
+                    total_size, folder_count, file_count, large_folders, large_files, error_paths = \
+                        index.load_results(info["id"], size_threshold, top_n)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open saved scan: {e}")
+            return
+        
+        self.clear_results()
+        self.dir_var.set(info["root"])
+        self.display_results((total_size, info["duration"] or 0, folder_count, file_count,
+                              large_folders, large_files, error_paths))
+        
+        scanned_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info["started"]))
+        self.progress_label.config(text=f"Loaded saved scan of {info['root']} from {scanned_at}")
+        self.status_var.set("Ready")
+        self.export_btn.config(state=tk.NORMAL)
     
     def clear_results(self):
         # Clear statistics
         for widget in self.stats_frame.winfo_children():
             widget.destroy()
             
-        # Clear folders tree
-        for item in self.folders_tree.get_children():
-            self.folders_tree.delete(item)
-            
-        # Clear files tree
-        for item in self.files_tree.get_children():
-            self.files_tree.delete(item)
-            
-        # Clear errors tree
-        for item in self.errors_tree.get_children():
-            self.errors_tree.delete(item)
+        self.large_folders = []
+        self.large_files = []
+        self.clear_trees()
+        self.clear_browse_tree()
+    
+    def clear_trees(self):
+        # Stop any tree that is still being filled
+        self.fill_generation += 1
+        
+        # Forget the rows streamed in while scanning
+        self.live_rows = {}
+        self.live_found_counts = {self.folders_tree: 0, self.files_tree: 0}
+        
+        # Clear folders, files and errors trees (one delete call each)
+        self.folders_tree.delete(*self.folders_tree.get_children())
+        self.files_tree.delete(*self.files_tree.get_children())
+        self.errors_tree.delete(*self.errors_tree.get_children())
+    
+    def clear_browse_tree(self):
+        self.dir_tree = None
+        self.browse_paths = {}
+        self.browse_tree.delete(*self.browse_tree.get_children())
     
-    def run_scan(self, dir_path, size_threshold):
+    def run_scan(self, dir_path, size_threshold, workers=1, top_n=None, progress=None, backend=None,
+                 profile=None, scan_filter=None, export=None, allocated=False):
         try:
-            scan_results = self.get_scan_results(dir_path, size_threshold)
+            try:
+                result = self.get_scan_results(dir_path, size_threshold, workers, top_n, progress, backend, profile,
+                                               scan_filter, export, allocated)
+            finally:
+                if export is not None:
+                    export.stream.close()
+            scan_results = (result.total_size, result.scan_time, result.folder_count, result.file_count,
+                            result.large_folders, result.large_files, result.error_paths)
+            # Index the folder tree here rather than on the UI thread
+            dir_tree = DirTree.from_result(result) if result.folder_sizes else None
             
-            # Update UI with results
-            self.root.after(0, lambda: self.display_results(scan_results))
+            # Update UI with results (partial ones if the scan was stopped)
+            self.root.after(0, lambda: self.display_results(scan_results, result.unique_size, result.allocated,
+                                                            result.allocated_size))
+            if dir_tree is not None:
+                self.root.after(0, self.show_dir_tree, dir_tree)
+            if profile is not None:
+                self.root.after(0, self.show_profile, profile, result.folder_count + result.file_count)
                 
             # Update UI
-            self.root.after(0, self.scan_completed)
+            self.root.after(0, self.scan_completed, result.cancelled)
         except Exception as e:
             self.root.after(0, lambda: self.display_error(str(e)))
             self.root.after(0, self.scan_failed, str(e))
     
+    def show_profile(self, profile, item_count):
+        # Runs right after display_results, so the time it took to put the
+        # results on screen can be reported as well (chunked tree fills
+        # continue in later event loop turns and are not included)
+        profile.add_time("render", time.perf_counter() - self.render_started)
+        self.show_diagnostics(profile.report_lines(item_count))
+    
+    def show_diagnostics(self, lines):
+        self.diagnostics_text.config(state=tk.NORMAL)
+        self.diagnostics_text.delete("1.0", tk.END)
+        self.diagnostics_text.insert(tk.END, "\n".join(lines))
+        self.diagnostics_text.config(state=tk.DISABLED)
+    
     def display_error(self, error_msg):
         # Clear statistics and add error message
         for widget in self.stats_frame.winfo_children():
@@ -600,8 +1085,13 @@ class FileSizeCheckerApp:
                               foreground=self.error_color)
         error_label.pack(pady=20)
     
-    def display_results(self, scan_results):
+    def display_results(self, scan_results, unique_size=None, allocated=None, allocated_size=None):
+        self.render_started = time.perf_counter()
         total_size, scan_time, folder_count, file_count, self.large_folders, self.large_files, error_paths = scan_results
+        # Saved scans have no allocated sizes
+        self.allocated = allocated or {}
+        self.show_allocated_columns(allocated is not None)
+        self.sort_orders = {}
         
         # Clear existing widgets in stats_frame
         for widget in self.stats_frame.winfo_children():
@@ -634,6 +1124,16 @@ class FileSizeCheckerApp:
                bg=self.secondary_color, fg=self.accent_color, 
                font=("Segoe UI", 18, "bold")).pack(anchor=tk.W, pady=(10, 0))
         
+        # Hard-linked files counted once (only shown when there were any)
+        if unique_size is not None and unique_size != total_size:
+            tk.Label(inner_pad, text=f"{self.format_size(unique_size)} unique", 
+                   bg=self.secondary_color, fg=self.fg_color).pack(anchor=tk.W, pady=(5, 0))
+        
+        # Space allocated on disk, much less than the above for sparse files
+        if allocated_size is not None:
+            tk.Label(inner_pad, text=f"{self.format_size(allocated_size)} allocated", 
+                   bg=self.secondary_color, fg=self.fg_color).pack(anchor=tk.W)
+        
         # Folders card
         folders_card = tk.Frame(stats_canvas, bg=self.secondary_color, bd=0, highlightthickness=0)
         stats_canvas.create_window(card_margin*2 + card_width, card_margin, 
@@ -694,25 +1194,8 @@ class FileSizeCheckerApp:
                bg=self.secondary_color, fg=self.accent_color, 
                font=("Segoe UI", 18, "bold")).pack(anchor=tk.W, pady=(10, 0))
         
-        # Update folders tree
-        row_count = 0
-        for folder, size in self.large_folders:
-            item_id = self.folders_tree.insert("", "end", text=folder, values=(self.format_size(size),))
-            
-            # Add appropriate tag for alternating rows and coloring by size
-            tags = []
-            if row_count % 2 == 1:
-                tags.append("odd_row")
-                
-            if size > 10 * 1024**3:  # > 10GB
-                tags.append("very_large")
-            elif size > 5 * 1024**3:  # > 5GB
-                tags.append("large")
-            else:
-                tags.append("medium")
-                
-            self.folders_tree.item(item_id, tags=tags)
-            row_count += 1
+        # Replace the rows streamed in while scanning with the final results
+        self.clear_trees()
         
         # Configure tree tags
         self.folders_tree.tag_configure("odd_row", background="#2a2a2a")  # Alternating row color
@@ -720,48 +1203,19 @@ class FileSizeCheckerApp:
         self.folders_tree.tag_configure("large", foreground=self.warning_color)
         self.folders_tree.tag_configure("medium", foreground=self.success_color)
         
-        # Update files tree
-        row_count = 0
-        for file, size in self.large_files:
-            # Get just the filename for display
-            file_name = os.path.basename(file)
-            # Use the file path as the item text for opening on double-click
-            item_id = self.files_tree.insert("", "end", text=file, values=(self.format_size(size),))
-            
-            # Add appropriate tag for alternating rows and coloring by size
-            tags = []
-            if row_count % 2 == 1:
-                tags.append("odd_row")
-                
-            if size > 1 * 1024**3:  # > 1GB
-                tags.append("very_large")
-            elif size > 500 * 1024**2:  # > 500MB
-                tags.append("large")
-            else:
-                tags.append("medium")
-                
-            self.files_tree.item(item_id, tags=tags)
-            row_count += 1
-        
-        # Configure tree tags
         self.files_tree.tag_configure("odd_row", background="#2a2a2a")  # Alternating row color
         self.files_tree.tag_configure("very_large", foreground=self.error_color)
         self.files_tree.tag_configure("large", foreground=self.warning_color)
         self.files_tree.tag_configure("medium", foreground=self.success_color)
         
-        # Update errors tree
-        row_count = 0
-        for path, error in error_paths:
-            item_id = self.errors_tree.insert("", "end", text=path, values=(error,))
-            
-            # Add alternating row tag
-            if row_count % 2 == 1:
-                self.errors_tree.item(item_id, tags=("odd_row",))
-            row_count += 1
-            
-        # Configure error tree tags
         self.errors_tree.tag_configure("odd_row", background="#2a2a2a")  # Alternating row color
         
+        # Fill the trees a chunk at a time so the window stays responsive
+        # however many results there are
+        self.fill_tree(self.folders_tree, self.large_folders, self.folder_row)
+        self.fill_tree(self.files_tree, self.large_files, self.file_row)
+        self.fill_tree(self.errors_tree, error_paths, self.error_row)
+        
         # Update tab text to show counts
         self.notebook.tab(1, text=f"Large Folders ({len(self.large_folders)})")
         self.notebook.tab(2, text=f"Large Files ({len(self.large_files)})")
@@ -773,112 +1227,161 @@ class FileSizeCheckerApp:
         elif len(self.large_folders) > 0:
             self.notebook.select(1)  # Folders tab
     
-    def get_scan_results(self, start_path, size_threshold):
-        total_size = 0
-        folder_sizes = {}
-        file_count = 0
-        folder_count = 0
-        large_folders = []
-        large_files = []
-        error_paths = []
-        
-        # Update status
-        self.root.after(0, lambda: self.progress_label.config(text="Counting files and folders..."))
-        
-        # First pass - count files and folders
-        try:
-            for dirpath, dirnames, filenames in os.walk(start_path):
-                if not self.scanning:  # Check if scan was cancelled
-                    return (0, 0, 0, 0, [], [], ["Scan cancelled"])
-                    
-                folder_count += 1
-                file_count += len(filenames)
-                
-                # Update count every 100 folders
-                if folder_count % 100 == 0:
-                    self.root.after(0, lambda c=folder_count, f=file_count: 
-                        self.progress_label.config(text=f"Counting: {c:,} folders, {f:,} files found..."))
-        except PermissionError:
-            error_paths.append((start_path, "Permission denied when accessing some directories. Results may be incomplete."))
-        
-        if not self.scanning:  # Check if scan was cancelled
-            return (0, 0, 0, 0, [], [], ["Scan cancelled"])
-            
-        # Set up tracking variables
-        start_time = time.time()
-        items_processed = 0
-        total_items = folder_count + file_count
-        
-        self.root.after(0, lambda: self.progress_label.config(
-            text=f"Scanning {folder_count:,} folders and {file_count:,} files..."))
-        self.root.after(0, lambda: self.progress_bar.config(mode="determinate", maximum=total_items, value=0))
-        
-        # Second pass - analyze sizes
-        for dirpath, dirnames, filenames in os.walk(start_path):
-            if not self.scanning:  # Check if scan was cancelled
-                return (0, 0, 0, 0, [], [], ["Scan cancelled"])
-                
-            folder_size = 0
-            
-            for f in filenames:
-                if not self.scanning:  # Check if scan was cancelled
-                    return (0, 0, 0, 0, [], [], ["Scan cancelled"])
-                    
-                fp = os.path.join(dirpath, f)
-                try:
-                    if os.path.isfile(fp):
-                        try:
-                            file_size = os.path.getsize(fp)
-                            total_size += file_size
-                            folder_size += file_size
-                            
-                            if file_size > size_threshold:
-                                large_files.append((fp, file_size))
-                        except (OSError, FileNotFoundError):
-                            # Handle files that disappeared during scan
-                            pass
-                except (PermissionError, OSError) as e:
-                    error_paths.append((fp, str(e)))
-                
-                # Update progress
-                items_processed += 1
-                if items_processed % 50 == 0:
-                    self.root.after(0, lambda p=items_processed: self.update_progress(p, total_items))
-            
-            folder_sizes[dirpath] = folder_size
-            
-            if folder_size > size_threshold:
-                large_folders.append((dirpath, folder_size))
-            
-            # Update progress for the folder
-            items_processed += 1
-            if items_processed % 50 == 0:
-                self.root.after(0, lambda p=items_processed: self.update_progress(p, total_items))
+    def fill_tree(self, tree, rows, make_row):
+        """Insert rows into a Treeview in chunks scheduled across event loop turns.
+        
+        make_row(index, row) returns the (text, values, tags) of one item.
+        The first chunk appears immediately; filling stops early if the
+        results are cleared in the meantime.
+        """
+        generation = self.fill_generation
+        # A later fill of the same tree (e.g. after sorting) replaces this one
+        fill = self.tree_fills[tree] = object()
+        
+        def insert_chunk(start):
+            if generation != self.fill_generation or self.tree_fills.get(tree) is not fill:
+                return  # Results were cleared, replaced or re-sorted
+            end = min(start + TREE_CHUNK_SIZE, len(rows))
+            for index in range(start, end):
+                text, values, tags = make_row(index, rows[index])
+                tree.insert("", "end", text=text, values=values, tags=tags)
+            if end < len(rows):
+                # Let Tk process input and redraw before the next chunk
+                self.root.after(1, insert_chunk, end)
+        
+        insert_chunk(0)
+    
+    def folder_row(self, index, row):
+        folder, size, direct_size = row
+        
+        # Add appropriate tag for alternating rows and coloring by size
+        tags = ["odd_row"] if index % 2 == 1 else []
+        if size > 10 * 1024**3:  # > 10GB
+            tags.append("very_large")
+        elif size > 5 * 1024**3:  # > 5GB
+            tags.append("large")
+        else:
+            tags.append("medium")
+        
+        allocated = self.allocated.get(folder)
+        allocated_text = self.format_size(allocated) if allocated is not None else ""
+        return folder, (self.format_size(size), self.format_size(direct_size), allocated_text), tags
+    
+    def file_row(self, index, row):
+        file, size = row
+        
+        # Add appropriate tag for alternating rows and coloring by size
+        tags = ["odd_row"] if index % 2 == 1 else []
+        if size > 1 * 1024**3:  # > 1GB
+            tags.append("very_large")
+        elif size > 500 * 1024**2:  # > 500MB
+            tags.append("large")
+        else:
+            tags.append("medium")
+        
+        allocated = self.allocated.get(file)
+        allocated_text = self.format_size(allocated) if allocated is not None else ""
+        
+        # Use the file path as the item text for opening on double-click
+        return file, (self.format_size(size), allocated_text), tags
+    
+    def error_row(self, index, row):
+        path, error = row
+        return path, (error,), ["odd_row"] if index % 2 == 1 else []
+    
+    def get_scan_results(self, start_path, size_threshold, workers=1, top_n=None, progress=None, backend=None,
+                         profile=None, scan_filter=None, export=None, allocated=False):
+        # Progress is only published to the channel; the UI polls it at a
+        # fixed rate, so this thread never waits on (or floods) Tk
+        if progress is None:
+            progress = ProgressChannel()
+        
+        # Large files and folders are streamed to the UI as they are found;
+        # the scan stops at the next directory once Stop is confirmed. Files
+        # from BROWSE_MIN_FILE_SIZE up are kept for the Browse tab
+        result = scan(start_path, size_threshold, backend, workers, top_n,
+                      file_store=FileStore(BROWSE_MIN_FILE_SIZE), on_progress=progress.update, on_found=progress.publish_found,
+                      should_cancel=lambda: not self.scanning, profile=profile,
+                      allocated=allocated, scan_filter=scan_filter, export=export)
+        progress.finish()
+        
+        # Remember the item count to seed the progress bar of the next scan
+        # (a filtered scan sees fewer items than the next one may)
+        if not result.cancelled and (scan_filter is None or not scan_filter.active):
+            self.previous_scan_items[os.path.abspath(start_path)] = result.folder_count + result.file_count
+        
+        return result
+    
+    def poll_progress(self):
+        # Redraw progress from the shared counters at a fixed frame rate
+        if not self.scanning:
+            return
         
-        # Finalize results
-        scan_time = time.time() - start_time
+        items, scanned_bytes, current_path, finished = self.progress_channel.snapshot()
+        if items and not finished:
+            self.update_progress(items, self.progress_channel.estimated_items, scanned_bytes)
+            self.status_var.set(f"Scanning {current_path}")
         
-        # Sort large folders and files by size (largest first)
-        large_folders.sort(key=lambda x: x[1], reverse=True)
-        large_files.sort(key=lambda x: x[1], reverse=True)
+        found_files, found_folders = self.progress_channel.take_found()
+        if found_files or found_folders:
+            self.show_live_results(found_files, found_folders)
         
-        return (total_size, scan_time, folder_count, file_count, large_folders, large_files, error_paths)
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
     
-    def update_progress(self, current, total):
-        self.progress_bar.config(value=current)
-        percent = int(current / total * 100) if total > 0 else 0
-        self.progress_label.config(text=f"Scanning... {percent}% ({current:,}/{total:,})")
-        self.status_var.set(f"Scanning: {percent}% complete")
+    def show_live_results(self, found_files, found_folders):
+        # Insert results found while scanning at their sorted position. Only
+        # the largest LIVE_RESULTS_LIMIT rows are kept per tree, so the cost
+        # per poll stays bounded; the full lists are shown when the scan ends
+        for file, size in found_files:
+            self.insert_live_row(self.files_tree, size, file, (self.format_size(size),),
+                                 self.file_row(0, (file, size))[2])
+        for folder, direct_size in found_folders:
+            self.insert_live_row(self.folders_tree, direct_size, folder,
+                                 (f"\u2265 {self.format_size(direct_size)}", self.format_size(direct_size)),
+                                 self.folder_row(0, (folder, direct_size, direct_size))[2])
+        
+        self.live_found_counts[self.files_tree] += len(found_files)
+        self.live_found_counts[self.folders_tree] += len(found_folders)
+        self.notebook.tab(1, text=f"Large Folders ({self.live_found_counts[self.folders_tree]}+)")
+        self.notebook.tab(2, text=f"Large Files ({self.live_found_counts[self.files_tree]})")
     
-    def scan_completed(self):
+    def insert_live_row(self, tree, size, text, values, tags):
+        # Negated sizes keep the list ascending while the rows are largest first
+        sizes, item_ids = self.live_rows.setdefault(tree, ([], []))
+        if len(sizes) >= LIVE_RESULTS_LIMIT and -size >= sizes[-1]:
+            return  # Smaller than everything shown
+        
+        index = bisect.bisect_right(sizes, -size)
+        sizes.insert(index, -size)
+        item_ids.insert(index, tree.insert("", index, text=text, values=values, tags=tags))
+        
+        if len(sizes) > LIVE_RESULTS_LIMIT:
+            sizes.pop()
+            tree.delete(item_ids.pop())
+    
+    def update_progress(self, current, total, scanned_bytes=0):
+        if total:
+            # Estimate from a previous scan - never show 100% before we are done
+            percent = min(int(current / total * 100), 99)
+            self.progress_bar.config(value=min(current, total))
+            self.progress_label.config(
+                text=f"Scanning... ~{percent}% ({current:,} items, {self.format_size(scanned_bytes)})")
+            self.status_var.set(f"Scanning: ~{percent}% complete")
+        else:
+            self.progress_label.config(
+                text=f"Scanning... {current:,} items, {self.format_size(scanned_bytes)} found")
+            self.status_var.set(f"Scanning: {current:,} items")
+    
+    def scan_completed(self, cancelled=False):
         self.progress_bar.stop()
-        self.progress_bar.config(value=100)
-        self.progress_label.config(text="Scan completed")
+        self.progress_bar.config(mode="determinate", value=self.progress_bar["maximum"])
+        self.progress_label.config(text="Scan cancelled (partial results)" if cancelled else "Scan completed")
         self.status_var.set("Ready")
         
         self.scan_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self.export_btn.config(state=tk.NORMAL)
+        self.open_index_btn.config(state=tk.NORMAL)
         
         self.scanning = False
     
@@ -889,6 +1392,7 @@ class FileSizeCheckerApp:
         
         self.scan_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
+        self.open_index_btn.config(state=tk.NORMAL)
         
         self.scanning = False
         messagebox.showerror("Scan Failed", f"The scan failed with error:\n{error_msg}")
@@ -939,8 +1443,8 @@ class FileSizeCheckerApp:
             # Write folders
             f.write(f"Large Folders ({len(self.large_folders)}):\n")
             f.write("-" * 80 + "\n")
-            for folder, size in self.large_folders:
-                f.write(f"{folder} | {self.format_size(size)}\n")
+            for folder, size, direct_size in self.large_folders:
+                f.write(f"{folder} | {self.format_size(size)} | direct: {self.format_size(direct_size)}\n")
             
             # Write files
             f.write(f"\nLarge Files ({len(self.large_files)}):\n")
@@ -961,9 +1465,9 @@ class FileSizeCheckerApp:
             
             # Write folders section
             writer.writerow([f"Large Folders ({len(self.large_folders)}):"])
-            writer.writerow(["Path", "Size"])
-            for folder, size in self.large_folders:
-                writer.writerow([folder, self.format_size(size)])
+            writer.writerow(["Path", "Size", "Direct Size"])
+            for folder, size, direct_size in self.large_folders:
+                writer.writerow([folder, self.format_size(size), self.format_size(direct_size)])
             
             writer.writerow([])
             
@@ -1035,13 +1539,15 @@ class FileSizeCheckerApp:
             <tr>
                 <th>Path</th>
                 <th>Size</th>
+                <th>Direct Size</th>
             </tr>
 """)
-            for folder, size in self.large_folders:
+            for folder, size, direct_size in self.large_folders:
                 size_class = "size-very-large" if size > 10 * 1024**3 else "size-large" if size > 5 * 1024**3 else "size-medium"
                 f.write(f"""            <tr>
                 <td>{folder}</td>
                 <td class="{size_class}">{self.format_size(size)}</td>
+                <td>{self.format_size(direct_size)}</td>
             </tr>
 """)
             f.write("        </table>\n")
@@ -1077,6 +1583,9 @@ class FileSizeCheckerApp:
         return f"{size_bytes:.2f} {unit}"
 
 if __name__ == "__main__":
+    # Needed by the processes backend in a frozen Windows executable
+    multiprocessing.freeze_support()
+    
     # Enable DPI awareness for better display on Windows
     try:
         if platform.system() == "Windows":
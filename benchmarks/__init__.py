@@ -0,0 +1,4 @@
+"""Benchmarks of the scan backends on reproducible synthetic trees.
+
+Run from the repository root with ``python -m benchmarks.run --help``.
+"""
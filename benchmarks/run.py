@@ -0,0 +1,151 @@
+"""Time every scan backend on synthetic trees.
+
+Each scan runs in a fresh Python process, so peak RSS is that scan's own and
+caches of one backend do not help the next. Syscalls are counted with
+strace when it is installed (and shown as "-" otherwise); strace slows the
+scan down, so it runs as a separate pass that is not timed.
+
+    python -m benchmarks.run --shapes wide tiny --scale 0.1 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from scanner import BACKENDS, scan
+
+from .trees import SHAPES, build_tree
+
+# Nothing in the synthetic trees is this large, so the results stay tiny
+# and the scan cost is all walking
+SIZE_THRESHOLD = 1024 ** 5
+
+# Children run `-m benchmarks.run` from here, wherever the parent was started
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_child(path, backend, workers):
+    # One scan in this process; the measurements go to stdout as JSON
+    start = time.perf_counter()
+    result = scan(path, SIZE_THRESHOLD, backend, workers)
+    wall = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux. With processes, RUSAGE_CHILDREN gives
+    # the largest worker, which runs next to the (smaller) parent
+    json.dump({
+        "entries": result.folder_count + result.file_count,
+        "wall": wall,
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "worker_rss": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+    }, sys.stdout)
+
+
+def measure(path, backend, workers, strace=None):
+    command = [sys.executable, "-m", "benchmarks.run", "--child", path, "--backend", backend,
+               "--workers", str(workers)]
+    if strace is None:
+        output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=REPO_ROOT).stdout
+        return json.loads(output)
+
+    # -f follows the scan's threads and worker processes; -c only counts
+    with tempfile.NamedTemporaryFile("r", suffix=".strace") as summary:
+        subprocess.run([strace, "-f", "-c", "-o", summary.name] + command,
+                       check=True, capture_output=True, text=True, cwd=REPO_ROOT)
+        return count_syscalls(summary.read())
+
+
+def count_syscalls(summary):
+    # The last line of `strace -c` is the total, e.g.
+    # "100.00    0.012345           1     12345       123 total"
+    match = re.search(r"^\s*[\d.]+\s+[\d.]+\s+\d+\s+(\d+)\s+(?:\d+\s+)?total\s*$", summary, re.MULTILINE)
+    return int(match.group(1)) if match else None
+
+
+def run_benchmarks(shapes, backends, workers, scale, repeat, tree_dir):
+    strace = shutil.which("strace")
+    rows = []
+    for shape in shapes:
+        print(f"Building {shape} tree (scale {scale})...", file=sys.stderr)
+        path = build_tree(shape, os.path.join(tree_dir, f"{shape}-{scale:g}"), scale)
+
+        for backend in backends:
+            # The first run warms the page and dentry caches; the best of
+            # the timed runs is kept, the same way timeit reports
+            measure(path, backend, workers)
+            runs = [measure(path, backend, workers) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run["wall"])
+            rows.append({
+                "shape": shape,
+                "backend": backend,
+                "entries": best["entries"],
+                "wall": best["wall"],
+                "entries_per_sec": best["entries"] / best["wall"] if best["wall"] else 0,
+                "peak_rss": max(run["peak_rss"] for run in runs),
+                "worker_rss": max(run["worker_rss"] for run in runs),
+                "syscalls": measure(path, backend, workers, strace) if strace else None,
+            })
+            print(f"  {backend}: {best['wall']:.3f}s", file=sys.stderr)
+    return rows
+
+
+def print_table(rows):
+    header = f"{'shape':<9} {'backend':<11} {'entries':>9} {'wall (s)':>9} {'entries/s':>11} " \
+             f"{'peak RSS':>10} {'worker RSS':>10} {'syscalls':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        worker_rss = f"{row['worker_rss'] / 1024 ** 2:.1f} MB" if row["worker_rss"] else "-"
+        syscalls = row["syscalls"] if row["syscalls"] is not None else "-"
+        print(f"{row['shape']:<9} {row['backend']:<11} {row['entries']:>9} {row['wall']:>9.3f} "
+              f"{row['entries_per_sec']:>11.0f} {row['peak_rss'] / 1024 ** 2:>7.1f} MB {worker_rss:>10} "
+              f"{syscalls:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scan backends on synthetic directory trees")
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES),
+                        help="tree shapes to scan (default: all)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS),
+                        help="backends to compare (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="threads or processes for the parallel backends (default: number of CPUs)")
+    parser.add_argument("--scale", type=float, default=0.05,
+                        help="size of the trees relative to the full shapes, e.g. 1 for a million tiny "
+                             "files (default: 0.05)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per backend (default: 3)")
+    parser.add_argument("--tree-dir",
+                        help="where to build the trees; kept and reused between runs (default: a "
+                             "temporary directory removed afterwards)")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE as JSON")
+    # Internal: run a single scan and report it (used for every measurement)
+    parser.add_argument("--child", metavar="PATH", help=argparse.SUPPRESS)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.backend, args.workers)
+        return
+    if args.workers < 1 or args.repeat < 1 or args.scale <= 0:
+        parser.error("--workers and --repeat must be at least 1 and --scale positive")
+
+    if args.tree_dir:
+        rows = run_benchmarks(args.shapes, args.backends, args.workers, args.scale, args.repeat, args.tree_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="filesize-bench-") as tree_dir:
+            rows = run_benchmarks(args.shapes, args.backends, args.workers, args.scale, args.repeat, tree_dir)
+
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
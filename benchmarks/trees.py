@@ -0,0 +1,114 @@
+import os
+import random
+
+# Synthetic tree shapes. Counts are for scale 1.0 and are multiplied by the
+# scale given to build_tree(); every shape is generated from a fixed seed,
+# so the same shape and scale always produce the same tree.
+SHAPES = {
+    # A few long chains of nested folders with a couple of files each
+    "deep": {"chains": 20, "depth": 500, "files_per_dir": 2},
+    # One level of folders holding many files each
+    "wide": {"dirs": 2000, "files_per_dir": 250},
+    # Millions of tiny files spread over a balanced tree
+    "tiny": {"files": 1000000, "files_per_dir": 1000},
+    # A handful of huge sparse files (apparent size, almost no disk use)
+    "sparse": {"files": 50, "max_size": 64 * 1024 ** 3},
+    # Ordinary files with as many symlinks to files and folders next to them
+    "symlinks": {"dirs": 500, "files_per_dir": 50, "links_per_dir": 100},
+}
+
+# Written last, so a half-built tree is regenerated instead of reused
+MARKER = ".benchmark-tree-complete"
+
+
+def build_tree(shape, root, scale=1.0, seed=0):
+    """Create the synthetic tree `shape` under root (reused if already complete) and return root"""
+    if os.path.exists(os.path.join(root, MARKER)):
+        return root
+
+    params = SHAPES[shape]
+    rng = random.Random(f"{shape}-{seed}")
+    os.makedirs(root, exist_ok=True)
+    BUILDERS[shape](root, params, scale, rng)
+
+    with open(os.path.join(root, MARKER), "w"):
+        pass
+    return root
+
+
+def _scaled(count, scale):
+    return max(1, int(count * scale))
+
+
+def _write_file(path, size):
+    # Real content, so the file takes up disk blocks like a normal one would
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+def _build_deep(root, params, scale, rng):
+    depth = _scaled(params["depth"], scale ** 0.5)
+    for chain in range(_scaled(params["chains"], scale ** 0.5)):
+        path = os.path.join(root, f"chain{chain}")
+        for level in range(depth):
+            path = os.path.join(path, f"d{level}")
+            os.makedirs(path, exist_ok=True)
+            for i in range(params["files_per_dir"]):
+                _write_file(os.path.join(path, f"f{i}.dat"), rng.randrange(4096))
+
+
+def _build_wide(root, params, scale, rng):
+    for d in range(_scaled(params["dirs"], scale)):
+        path = os.path.join(root, f"dir{d:05d}")
+        os.mkdir(path)
+        for i in range(params["files_per_dir"]):
+            _write_file(os.path.join(path, f"file{i:04d}.dat"), rng.randrange(16384))
+
+
+def _build_tiny(root, params, scale, rng):
+    # 32 top-level folders, each with enough sub-folders for the file count
+    files_per_dir = params["files_per_dir"]
+    dir_count = _scaled(params["files"], scale) // files_per_dir + 1
+    for d in range(dir_count):
+        path = os.path.join(root, f"group{d % 32:02d}", f"dir{d:05d}")
+        os.makedirs(path, exist_ok=True)
+        for i in range(files_per_dir):
+            _write_file(os.path.join(path, f"t{i:04d}"), rng.randrange(64))
+
+
+def _build_sparse(root, params, scale, rng):
+    for i in range(_scaled(params["files"], scale)):
+        with open(os.path.join(root, f"sparse{i:03d}.img"), "wb") as f:
+            f.truncate(rng.randrange(1, params["max_size"]))
+
+
+def _build_symlinks(root, params, scale, rng):
+    dirs = []
+    for d in range(_scaled(params["dirs"], scale)):
+        path = os.path.join(root, f"dir{d:04d}")
+        os.mkdir(path)
+        for i in range(params["files_per_dir"]):
+            _write_file(os.path.join(path, f"file{i:03d}.dat"), rng.randrange(16384))
+        dirs.append(path)
+
+    # Links point at random files and folders anywhere in the tree, some of
+    # them dangling; scanners must neither follow nor count them
+    for path in dirs:
+        for i in range(params["links_per_dir"]):
+            kind = rng.randrange(3)
+            if kind == 0:
+                target = os.path.join(rng.choice(dirs), f"file{rng.randrange(params['files_per_dir']):03d}.dat")
+            elif kind == 1:
+                target = rng.choice(dirs)
+            else:
+                target = os.path.join(path, "missing", str(i))
+            os.symlink(target, os.path.join(path, f"link{i:03d}"))
+
+
+BUILDERS = {
+    "deep": _build_deep,
+    "wide": _build_wide,
+    "tiny": _build_tiny,
+    "sparse": _build_sparse,
+    "symlinks": _build_symlinks,
+}
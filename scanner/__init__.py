@@ -0,0 +1,70 @@
+"""Directory scanning engine shared by the File Size Checker front-ends."""
+
+from .aggregate import ALLOCATED_SIZES_AVAILABLE, CachedDir, ScanTotals, large_folders_by_total, recursive_sizes
+from .core import BACKENDS, ScanResult, resolve_backend, scan
+from .diff import ScanDiff, diff_snapshots
+from .duplicates import DuplicateGroup, Duplicates, find_duplicates
+from .export import EXPORT_COLUMNS, EXPORT_FORMATS, StreamExport
+from .filestore import FileStore
+from .filters import ScanFilter
+from .incremental import incremental_walk
+from .index import ScanIndex
+from .inodes import InodeSet
+from .parallel import parallel_walk
+from .processes import process_scan
+from .profiling import ScanProfile
+from .snapshot import Snapshot, is_snapshot, write_snapshot
+from .tree import DirTree
+from .progress import ProgressChannel
+from .topk import TopK, make_collector
+from .walker import DirListing, scan_directory, walk
+
+__all__ = [
+    "ALLOCATED_SIZES_AVAILABLE",
+    "AsyncScanner",
+    "BACKENDS",
+    "CachedDir",
+    "DirListing",
+    "DirTree",
+    "DuplicateGroup",
+    "Duplicates",
+    "EXPORT_COLUMNS",
+    "EXPORT_FORMATS",
+    "FileStore",
+    "InodeSet",
+    "ProgressChannel",
+    "ScanFilter",
+    "ScanFound",
+    "ScanDiff",
+    "ScanIndex",
+    "ScanProfile",
+    "ScanProgress",
+    "ScanResult",
+    "ScanTotals",
+    "Snapshot",
+    "StreamExport",
+    "TopK",
+    "diff_snapshots",
+    "find_duplicates",
+    "incremental_walk",
+    "is_snapshot",
+    "large_folders_by_total",
+    "make_collector",
+    "parallel_walk",
+    "process_scan",
+    "recursive_sizes",
+    "resolve_backend",
+    "scan",
+    "scan_directory",
+    "walk",
+    "write_snapshot",
+]
+
+
+def __getattr__(name):
+    # The asyncio API is loaded on first use: importing asyncio would add
+    # noticeably to the start-up of every command line run
+    if name in ("AsyncScanner", "ScanFound", "ScanProgress"):
+        from . import async_scan
+        return getattr(async_scan, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
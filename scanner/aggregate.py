@@ -0,0 +1,246 @@
+import os
+from collections import namedtuple
+
+from .inodes import InodeSet
+from .topk import make_collector
+
+# st_blocks is missing on Windows
+ALLOCATED_SIZES_AVAILABLE = hasattr(os.stat_result, "st_blocks")
+
+# A folder that did not change since a previous scan: its sub-directories,
+# direct size and file count as recorded then, the (path, size) pairs of its
+# indexed files and its current stat_result
+CachedDir = namedtuple("CachedDir", ["path", "subdirs", "direct_size", "file_count", "files", "stat"])
+
+
+def recursive_sizes(folder_sizes):
+    """Compute the cumulative size of every folder in one bottom-up pass.
+
+    folder_sizes maps each scanned folder to the size of the files directly in
+    it and must list parents before their children, which holds for every
+    walker in this package (a folder is only listed after its parent). The
+    first key is the scan root. Walking the keys in reverse is therefore a
+    post-order traversal, and each folder adds its total to its parent once.
+    """
+    totals = dict(folder_sizes)
+    if not totals:
+        return totals
+
+    root = next(iter(totals))
+    for path in reversed(list(totals)):
+        if path == root:
+            continue
+        parent = os.path.dirname(path)
+        # Only the root can be spelt differently from its children's dirname
+        # (e.g. a trailing separator), so unknown parents are the root
+        if parent not in totals:
+            parent = root
+        totals[parent] += totals[path]
+
+    return totals
+
+
+def large_folders_by_total(folder_sizes, folder_totals, size_threshold, top_n=None):
+    """(path, cumulative size, direct size) for every folder whose total exceeds the threshold
+
+    With top_n only the top_n largest folders are kept, largest first.
+    """
+    large_folders = make_collector(top_n)
+    for path, total in folder_totals.items():
+        if total > size_threshold:
+            large_folders.append((path, total, folder_sizes[path]))
+    return list(large_folders)
+
+
+class ScanTotals:
+    """Running totals of a scan, fed one DirListing at a time.
+
+    Only compact aggregates are kept (per-directory sizes and the files over
+    the size threshold), so partial totals are cheap to send between
+    processes and to merge. With top_n only that many of the largest files
+    and folders are kept. Pass a FileStore to also record every file, and
+    record_dirs=True to keep each folder's mtime, inode and file count for a
+    scan index. Call finish() after the last listing (or merge) to fill in
+    folder_totals and large_folders.
+
+    total_size is the apparent size of every file path. unique_size counts
+    hard-linked files once per (st_dev, st_ino), tracked in an InodeSet;
+    inode_limit bounds its memory (see InodeSet). Platforms without inode
+    numbers in os.scandir results (Windows) report both as the same.
+    unique_size is None after finish() if any folder came from a previous
+    scan, whose files have no inode numbers to tell links apart.
+
+    With allocated=True the space actually allocated on disk (st_blocks *
+    512, from the same stat result) is summed as well, which is far below
+    the apparent size for sparse and compressed files. allocated_size is
+    its total and allocated maps every folder (cumulative, after finish())
+    and every large file to its allocated size. Like unique_size, the
+    allocated sizes count a hard-linked file once, where it is first seen.
+
+    Besides DirListings, add_listing() accepts the CachedDir entries of an
+    incremental rescan, which carry the totals of an unchanged folder.
+    """
+
+    def __init__(self, size_threshold, top_n=None, file_store=None, record_dirs=False, inode_limit=None,
+                 allocated=False):
+        if allocated and not ALLOCATED_SIZES_AVAILABLE:
+            raise ValueError("Allocated sizes are not available on this platform")
+        self.size_threshold = size_threshold
+        self.top_n = top_n
+        # Optional FileStore recording every file, not just the large ones
+        self.file_store = file_store
+        # path -> (mtime_ns, inode, file count), only kept with record_dirs
+        self.dir_records = {} if record_dirs else None
+        self.total_size = 0
+        self.unique_size = 0
+        # Folders taken over from a previous scan (see _add_cached())
+        self.cached_count = 0
+        self.inodes = InodeSet(inode_limit, track_allocated=allocated)
+        # Only kept with allocated=True: direct allocated size per folder and
+        # allocated size per large file (folders get cumulative in finish())
+        self.allocated_size = 0 if allocated else None
+        self.folder_allocated = {} if allocated else None
+        # Allocated size of hard links counted by two merged partitions
+        self.allocated_twice = 0
+        self.allocated = {} if allocated else None
+        self.folder_count = 0
+        self.file_count = 0
+        self.folder_sizes = {}
+        self.folder_totals = {}
+        self.large_folders = []
+        self.large_files = make_collector(top_n)
+        self.error_paths = []
+
+    def add_listing(self, listing):
+        """Account for one listed directory and return the number of items in it"""
+        if isinstance(listing, CachedDir):
+            return self._add_cached(listing)
+
+        size_threshold = self.size_threshold
+        large_files = self.large_files
+        track_allocated = self.allocated is not None
+        folder_size = 0
+        linked_size = 0
+        linked_allocated = 0
+
+        for fp, st in listing.files:
+            file_size = st.st_size
+            folder_size += file_size
+            if file_size > size_threshold:
+                large_files.append((fp, file_size))
+            # Files with a single link cannot show up again elsewhere
+            if st.st_nlink > 1:
+                file_allocated = st.st_blocks * 512 if track_allocated else 0
+                if not self.inodes.add(st.st_dev, st.st_ino, file_size, file_allocated):
+                    linked_size += file_size
+                    linked_allocated += file_allocated
+
+        self.total_size += folder_size
+        self.unique_size += folder_size - linked_size
+        self.folder_count += 1
+        self.file_count += len(listing.files)
+        self.error_paths.extend(listing.errors)
+        self.folder_sizes[listing.path] = folder_size
+        if self.file_store is not None:
+            self.file_store.add_listing(listing)
+        if self.dir_records is not None:
+            self._record_dir(listing.path, listing.stat, len(listing.files))
+        if track_allocated:
+            self._add_allocated(listing, linked_allocated)
+
+        return len(listing.files) + 1
+
+    def _add_allocated(self, listing, linked_allocated):
+        # A second pass over the same stat results, only paid when asked
+        # for. Links to inodes seen before (linked_allocated) take no more
+        # space, as in du.
+        size_threshold = self.size_threshold
+        folder_allocated = -linked_allocated
+        for fp, st in listing.files:
+            file_allocated = st.st_blocks * 512
+            folder_allocated += file_allocated
+            if st.st_size > size_threshold:
+                self.allocated[fp] = file_allocated
+        self.allocated_size += folder_allocated
+        self.folder_allocated[listing.path] = folder_allocated
+
+    def _add_cached(self, cached):
+        # An unchanged folder: reuse its totals from the previous scan, which
+        # only has the files at or above the index's file floor
+        size_threshold = self.size_threshold
+        for fp, file_size in cached.files:
+            if file_size > size_threshold:
+                self.large_files.append((fp, file_size))
+            if self.file_store is not None:
+                self.file_store.add(fp, file_size)
+
+        # Cached files have no inode numbers, so the unique size is not
+        # known once there are any (see finish())
+        self.total_size += cached.direct_size
+        self.cached_count += 1
+        self.folder_count += 1
+        self.file_count += cached.file_count
+        self.folder_sizes[cached.path] = cached.direct_size
+        if self.dir_records is not None:
+            self._record_dir(cached.path, cached.stat, cached.file_count)
+        if self.allocated is not None:
+            # The index has no allocated sizes; fall back to the apparent ones
+            self.allocated_size += cached.direct_size
+            self.folder_allocated[cached.path] = cached.direct_size
+            for fp, file_size in cached.files:
+                if file_size > size_threshold:
+                    self.allocated[fp] = file_size
+
+        return cached.file_count + 1
+
+    def _record_dir(self, path, dir_stat, file_count):
+        if dir_stat is None:
+            # Not listed successfully; a None mtime forces a re-list next time
+            self.dir_records[path] = (None, None, file_count)
+        else:
+            self.dir_records[path] = (dir_stat.st_mtime_ns, dir_stat.st_ino, file_count)
+
+    def merge(self, other):
+        """Fold the totals of another (disjoint) part of the tree into this one"""
+        self.total_size += other.total_size
+        self.cached_count += other.cached_count
+        # Hard links to the same file from both parts were counted by each
+        counted_twice, allocated_twice = self.inodes.merge(other.inodes)
+        self.unique_size += other.unique_size - counted_twice
+        self.folder_count += other.folder_count
+        self.file_count += other.file_count
+        self.folder_sizes.update(other.folder_sizes)
+        self.large_files.extend(other.large_files)
+        self.error_paths.extend(other.error_paths)
+        if self.file_store is not None and other.file_store is not None:
+            self.file_store.merge(other.file_store)
+        if self.dir_records is not None and other.dir_records is not None:
+            self.dir_records.update(other.dir_records)
+        if self.allocated is not None and other.allocated is not None:
+            # Which folder should lose such links is not known, so they are
+            # taken off the root's cumulative size in finish()
+            self.allocated_size += other.allocated_size - allocated_twice
+            self.allocated_twice += other.allocated_twice + allocated_twice
+            self.folder_allocated.update(other.folder_allocated)
+            self.allocated.update(other.allocated)
+
+    def finish(self):
+        """Compute cumulative folder sizes and the large folders once all listings are in"""
+        self.folder_totals = recursive_sizes(self.folder_sizes)
+        self.large_folders = large_folders_by_total(self.folder_sizes, self.folder_totals,
+                                                    self.size_threshold, self.top_n)
+        self.large_files = list(self.large_files)
+        if self.cached_count:
+            self.unique_size = None
+        if self.allocated is not None:
+            # Keep only the files that made it into the results
+            large_paths = {path for path, size in self.large_files}
+            self.allocated = {path: size for path, size in self.allocated.items() if path in large_paths}
+            folder_allocated = recursive_sizes(self.folder_allocated)
+            if folder_allocated:
+                folder_allocated[next(iter(folder_allocated))] -= self.allocated_twice
+            self.allocated.update(folder_allocated)
+
+    @property
+    def item_count(self):
+        return self.folder_count + self.file_count
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .core import scan
+from .progress import ProgressChannel
+
+# Seconds between the progress events of AsyncScanner.events()
+PROGRESS_INTERVAL = 0.1
+
+# Events of AsyncScanner.events(), besides the ScanResult that ends them:
+# the running totals, and large (path, size) files and folders found since
+# the previous event (a folder's size is its direct size, see scan())
+ScanProgress = namedtuple("ScanProgress", ["items", "scanned_bytes", "current_path"])
+ScanFound = namedtuple("ScanFound", ["files", "folders"])
+
+
+class AsyncScanner:
+    """Run scans from asyncio code without blocking the event loop.
+
+    Each scan runs on a thread of the scanner's own executor, so at most
+    max_scans of them list directories at once; further scans wait for a
+    free thread. Within a scan, the threads backend (the default) lists
+    folders on up to `workers` threads, so one scanner never has more than
+    max_scans * workers threads doing I/O, however many scans are awaited.
+
+    Progress is published through a ProgressChannel and read every
+    PROGRESS_INTERVAL seconds, so a fast scan costs the event loop the same
+    as a slow one. Cancelling the awaiting task (or closing the events()
+    generator) stops the scan at its next directory.
+    """
+
+    def __init__(self, max_scans=2, workers=None, backend="threads"):
+        if max_scans < 1:
+            raise ValueError("max_scans must be at least 1")
+        self.workers = workers
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=max_scans, thread_name_prefix="async-scan")
+        # Stop flags of the scans started and not finished yet
+        self._running = set()
+
+    async def events(self, start_path, size_threshold, interval=PROGRESS_INTERVAL, **options):
+        """Scan start_path, yielding events while it runs and the ScanResult last.
+
+        Yields a ScanProgress whenever the totals changed since the last
+        one, a ScanFound whenever large files or folders were found and,
+        once the scan is done, its ScanResult. options are passed on to
+        scan() (top_n, file_store, scan_filter, ...), except the callbacks,
+        which this uses itself. A scan that fails raises its error here.
+
+        Leaving the loop early stops the scan once the generator is closed,
+        which is immediate with an explicit aclose() (or, on Python 3.10
+        and later, contextlib.aclosing()) and otherwise happens when it is
+        garbage collected.
+        """
+        channel = ProgressChannel()
+        future, stop = self._start(start_path, size_threshold, channel, options)
+        try:
+            last_progress = None
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=interval)
+                found_files, found_folders = channel.take_found()
+                if found_files or found_folders:
+                    yield ScanFound(found_files, found_folders)
+                items, scanned_bytes, current_path, _ = channel.snapshot()
+                progress = ScanProgress(items, scanned_bytes, current_path)
+                if items and progress != last_progress:
+                    last_progress = progress
+                    yield progress
+                if done:
+                    yield future.result()
+                    return
+        finally:
+            self._stop(future, stop)
+
+    async def scan(self, start_path, size_threshold, **options):
+        """The ScanResult of a scan, without events; cancel the task to stop the scan"""
+        future, stop = self._start(start_path, size_threshold, None, options)
+        try:
+            # Shielded, so a cancel reaches the scan through its stop flag
+            # instead of abandoning a running thread
+            return await asyncio.shield(future)
+        finally:
+            self._stop(future, stop)
+
+    def _start(self, start_path, size_threshold, channel, options):
+        stop = threading.Event()
+        if channel is not None:
+            options = dict(options, on_progress=channel.update, on_found=channel.publish_found)
+        self._running.add(stop)
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, partial(scan, start_path, size_threshold, self.backend, self.workers,
+                                    should_cancel=stop.is_set, **options))
+        return future, stop
+
+    def _stop(self, future, stop):
+        # A scan still waiting for a thread is dropped, a running one stops
+        # at its next directory (and its result is discarded)
+        stop.set()
+        future.cancel()
+        self._running.discard(stop)
+
+    def close(self):
+        """Stop all running scans and release the executor (without waiting for it)"""
+        for stop in list(self._running):
+            stop.set()
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,185 @@
+import os
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+
+from .aggregate import ScanTotals
+from .incremental import incremental_walk
+from .parallel import parallel_walk
+from .processes import process_scan
+from .walker import scan_directory, walk
+
+BACKENDS = ("sequential", "threads", "processes")
+
+# Result of scan(). large_folders holds (path, cumulative size, direct size)
+# and large_files (path, size), both largest first. It has the attributes
+# ScanIndex.save_scan() reads, so a result can be saved as it is.
+ScanResult = namedtuple("ScanResult", [
+    "root", "size_threshold", "scan_time", "cancelled",
+    "total_size", "unique_size", "folder_count", "file_count",
+    "folder_sizes", "folder_totals", "large_folders", "large_files", "error_paths",
+    "file_store", "dir_records", "allocated_size", "allocated",
+])
+
+
+def resolve_backend(backend=None, workers=None):
+    """Name of the backend to use; without one, several workers mean threads"""
+    if backend is None:
+        backend = "threads" if workers and workers > 1 else "sequential"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown scan backend: {backend}")
+    return backend
+
+
+def scan(start_path, size_threshold, backend=None, workers=None, top_n=None, file_store=None,
+         record_dirs=False, previous_scan=None, on_progress=None, on_found=None, should_cancel=None,
+         profile=None, inode_limit=None, allocated=False, scan_filter=None, export=None):
+    """Scan start_path and return a ScanResult.
+
+    backend is one of BACKENDS (see resolve_backend() for the default) and
+    workers the number of threads or processes it may use. top_n,
+    file_store, record_dirs, inode_limit and allocated are passed on to
+    ScanTotals (unique_size counts hard-linked files once; allocated sums
+    the space allocated on disk as well). previous_scan is
+    an optional (ScanIndex, scan id) pair: folders that have not changed
+    since that scan are not listed again (sequential backend only; the
+    saved scan must not have been filtered).
+
+    The callbacks are all optional and run on the scanning thread:
+    on_progress(items, scanned_bytes, current_path) after every directory
+    (every partition with processes) with running totals; on_found(files,
+    folders) with newly found large (path, size) files and folders, where a
+    folder's size is its direct size, a lower bound of its total; and
+    should_cancel(), checked between steps, which stops the scan when it
+    returns true. A cancelled scan returns the partial totals with
+    cancelled=True.
+
+    Pass a ScanProfile as profile to record per-phase timings, filesystem
+    call counts and the slowest directories of the scan, and a ScanFilter
+    as scan_filter to skip excluded files and folders without listing them
+    (not with previous_scan, whose saved folders may have been filtered
+    differently). A StreamExport given as export gets every listed file and
+    folder written to it during the scan (not with previous_scan either,
+    which does not list unchanged folders).
+    """
+    backend = resolve_backend(backend, workers)
+    if scan_filter is not None and not scan_filter.active:
+        scan_filter = None
+    if previous_scan is not None and scan_filter is not None:
+        raise ValueError("Incremental scans cannot be filtered")
+    if previous_scan is not None and export is not None:
+        raise ValueError("Incremental scans cannot be exported")
+    if previous_scan is not None and previous_scan[0].scan_info(previous_scan[1])["filtered"]:
+        # Its unchanged folders would leave out whatever its filter skipped
+        raise ValueError("A filtered scan cannot be the base of an incremental scan")
+    if backend == "processes":
+        if previous_scan is not None:
+            raise ValueError("Incremental scans are not supported by the processes backend")
+        steps = _process_steps(start_path, size_threshold, workers, top_n, file_store, record_dirs, on_found,
+                               profile, inode_limit, allocated, scan_filter, export)
+    else:
+        list_directory = scan_directory if profile is None else profile.scan_directory
+        if scan_filter is not None:
+            list_directory = scan_filter.wrap(list_directory, profile)
+        # Several workers list directories concurrently; the listings are
+        # merged into the same totals regardless of the order they arrive in
+        if previous_scan is not None:
+            listings = incremental_walk(start_path, *previous_scan, list_directory=list_directory, profile=profile)
+        elif backend == "threads":
+            listings = parallel_walk(start_path, workers or os.cpu_count() or 1, list_directory)
+        else:
+            listings = walk(start_path, list_directory)
+        totals = ScanTotals(size_threshold, top_n, file_store, record_dirs, inode_limit, allocated)
+        steps = _listing_steps(listings, totals, on_found, profile, export)
+
+    start_time = time.time()
+    clock_start = time.perf_counter()
+    profiler = profile.start_cprofile() if profile is not None else None
+    cancelled = False
+    items = 0
+    try:
+        for totals, step_items, current_path in steps:
+            items += step_items
+            if on_progress is not None:
+                on_progress(items, totals.total_size, current_path)
+            if profile is not None:
+                profile.sample_rate(time.perf_counter() - clock_start, items)
+            if should_cancel is not None and should_cancel():
+                cancelled = True
+                break
+    finally:
+        # Stops the walkers (and cancels pending partitions) on early exit
+        steps.close()
+    if profile is not None:
+        profile.rate_samples.append((time.perf_counter() - clock_start, items))
+
+    # Folders count as large by their cumulative size, which is only known
+    # once the whole tree has been seen. The processes backend finishes the
+    # totals itself unless it was cancelled.
+    if backend != "processes" or cancelled:
+        with _phase(profile, "finish"):
+            totals.finish()
+    with _phase(profile, "sort"):
+        large_folders = sorted(totals.large_folders, key=lambda x: x[1], reverse=True)
+        large_files = sorted(totals.large_files, key=lambda x: x[1], reverse=True)
+
+    if profile is not None:
+        profile.stop_cprofile(profiler)
+        profile.wall_time = time.perf_counter() - clock_start
+
+    return ScanResult(
+        os.fspath(start_path), size_threshold, time.time() - start_time, cancelled,
+        totals.total_size, totals.unique_size, totals.folder_count, totals.file_count,
+        totals.folder_sizes, totals.folder_totals, large_folders, large_files, totals.error_paths,
+        totals.file_store, totals.dir_records, totals.allocated_size, totals.allocated)
+
+
+def _phase(profile, name):
+    return profile.phase(name) if profile is not None else nullcontext()
+
+
+def _listing_steps(listings, totals, on_found, profile, export=None):
+    # Feed every listing into totals (and export), one step per directory
+    size_threshold = totals.size_threshold
+    try:
+        for listing in listings:
+            with _phase(profile, "aggregate"):
+                items = totals.add_listing(listing)
+            if export is not None:
+                with _phase(profile, "export"):
+                    export.add_listing(listing)
+            if on_found is not None:
+                _report_found(listing, totals, size_threshold, on_found)
+            yield totals, items, listing.path
+    finally:
+        close = getattr(listings, "close", None)
+        if close is not None:
+            close()
+
+
+def _report_found(listing, totals, size_threshold, on_found):
+    # Listed files carry stat results, cached ones (incremental) plain sizes
+    files = []
+    for fp, st in listing.files:
+        file_size = st if isinstance(st, int) else st.st_size
+        if file_size > size_threshold:
+            files.append((fp, file_size))
+    direct_size = totals.folder_sizes[listing.path]
+    folders = [(listing.path, direct_size)] if direct_size > size_threshold else []
+    if files or folders:
+        on_found(files, folders)
+
+
+def _process_steps(start_path, size_threshold, workers, top_n, file_store, record_dirs, on_found, profile,
+                   inode_limit, allocated, scan_filter, export):
+    # One step per finished partition; the last one has finish() applied
+    steps = process_scan(start_path, size_threshold, workers, top_n, file_store, record_dirs, profile,
+                         inode_limit, allocated, scan_filter, export)
+    try:
+        for totals, items, found in steps:
+            # Each step comes with the large files of its own partition
+            if on_found is not None and found:
+                on_found(found, [])
+            yield totals, items, start_path
+    finally:
+        steps.close()
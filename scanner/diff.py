@@ -0,0 +1,124 @@
+import os
+from collections import namedtuple
+
+from .topk import make_collector
+
+# Result of diff_snapshots(). growers and shrinkers hold (path, old size,
+# new size) of folders by cumulative size, biggest change first (a new
+# folder has an old size of 0, a deleted one a new size of 0); new_files
+# and deleted_files hold (path, size) of files over the threshold that
+# only one of the scans has, largest first.
+ScanDiff = namedtuple("ScanDiff", [
+    "old_info", "new_info", "size_change", "growers", "shrinkers", "new_files", "deleted_files",
+    "new_folder_count", "deleted_folder_count",
+])
+
+
+def diff_snapshots(old, new, top_n=20, size_threshold=0):
+    """Compare two Snapshots of the same tree and return a ScanDiff.
+
+    Both snapshots keep their folders in depth-first order with the
+    sub-folders of each sorted by name, so the two trees are merge-joined
+    level by level: the sorted children of every pair of matching folders
+    are walked side by side, and a folder only one side has is a whole new
+    or deleted subtree, read as one contiguous range. Each folder is looked
+    at once and full paths are only built for the rows returned, so two
+    scans of tens of millions of entries diff in one pass.
+
+    Folders are matched by their path below each snapshot's root, so the
+    roots themselves may differ (e.g. a volume mounted elsewhere); paths
+    are reported as in the snapshot they come from. Only files recorded in
+    both snapshots (see their file floors) can be compared. top_n=None
+    keeps every change.
+    """
+    growers = make_collector(top_n)
+    shrinkers = make_collector(top_n)
+    new_files = make_collector(top_n)
+    deleted_files = make_collector(top_n)
+    counts = {"new": 0, "deleted": 0}
+
+    # Entries carry (snapshot, index) instead of a path until the end
+    pairs = [(0, 0)]
+    while pairs:
+        old_index, new_index = pairs.pop()
+        old_size = old.dir_size[old_index]
+        new_size = new.dir_size[new_index]
+        if new_size > old_size:
+            growers.append(((old_index, new_index), new_size - old_size))
+        elif new_size < old_size:
+            shrinkers.append(((old_index, new_index), old_size - new_size))
+        _diff_files(old, new, old_index, new_index, size_threshold, new_files, deleted_files)
+
+        old_children = _named_children(old, old_index)
+        new_children = _named_children(new, new_index)
+        i = j = 0
+        while i < len(old_children) or j < len(new_children):
+            if j == len(new_children) or (i < len(old_children) and old_children[i][0] < new_children[j][0]):
+                counts["deleted"] += _one_side(old, old_children[i][1], size_threshold, shrinkers, deleted_files,
+                                               lambda index: (index, None))
+                i += 1
+            elif i == len(old_children) or new_children[j][0] < old_children[i][0]:
+                counts["new"] += _one_side(new, new_children[j][1], size_threshold, growers, new_files,
+                                           lambda index: (None, index))
+                j += 1
+            else:
+                pairs.append((old_children[i][1], new_children[j][1]))
+                i += 1
+                j += 1
+
+    def folder_rows(entries):
+        rows = []
+        for (old_index, new_index), change in sorted(entries, key=lambda entry: entry[1], reverse=True):
+            path = new.dir_path(new_index) if new_index is not None else old.dir_path(old_index)
+            rows.append((path,
+                         old.dir_size[old_index] if old_index is not None else 0,
+                         new.dir_size[new_index] if new_index is not None else 0))
+        return rows
+
+    def file_rows(snapshot, entries):
+        return [(snapshot.file_path(index), size)
+                for index, size in sorted(entries, key=lambda entry: entry[1], reverse=True)]
+
+    return ScanDiff(old.info, new.info, new.info["total_size"] - old.info["total_size"],
+                    folder_rows(growers), folder_rows(shrinkers),
+                    file_rows(new, new_files), file_rows(old, deleted_files),
+                    counts["new"], counts["deleted"])
+
+
+def _named_children(snapshot, index):
+    # (sort key, index) of the sub-folders, in the order they were written
+    # (by path components, which is what the key compares)
+    return [(snapshot.string(snapshot.dir_name[child]).split(os.sep), child)
+            for child in snapshot.children(index)]
+
+
+def _diff_files(old, new, old_index, new_index, size_threshold, new_files, deleted_files):
+    # Large files of one folder whose name the other side's folder lacks.
+    # Names are only decoded for folders that have a large file at all.
+    old_range = range(old.dir_files[old_index], old.dir_files[old_index + 1])
+    new_range = range(new.dir_files[new_index], new.dir_files[new_index + 1])
+    for snapshot, files, other, other_range, found in ((new, new_range, old, old_range, new_files),
+                                                      (old, old_range, new, new_range, deleted_files)):
+        sizes = snapshot.file_size
+        large = [i for i in files if sizes[i] > size_threshold]
+        if not large:
+            continue
+        other_names = {other.string(other.file_name[i]) for i in other_range}
+        for i in large:
+            if snapshot.string(snapshot.file_name[i]) not in other_names:
+                found.append((i, sizes[i]))
+
+
+def _one_side(snapshot, index, size_threshold, folders, files, key):
+    # A subtree only one snapshot has: every folder in it changed by its
+    # whole size, and every large file in it is new (or deleted)
+    end = snapshot.dir_end[index]
+    for i in range(index, end):
+        size = snapshot.dir_size[i]
+        if size:
+            folders.append((key(i), size))
+    sizes = snapshot.file_size
+    for i in range(snapshot.dir_files[index], snapshot.dir_files[end]):
+        if sizes[i] > size_threshold:
+            files.append((i, sizes[i]))
+    return end - index
@@ -0,0 +1,186 @@
+import hashlib
+import mmap
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Bytes hashed at each end of a file in the partial-hash stage
+PARTIAL_BLOCK = 64 * 1024
+
+# Bytes hashed at a time by a full hash; cancelling waits for at most one
+FULL_HASH_CHUNK = 16 * 1024 ** 2
+
+# Files with identical contents: size is the size of each, paths are
+# sorted and wasted is what deleting all but one copy would free
+DuplicateGroup = namedtuple("DuplicateGroup", ["size", "paths", "wasted"])
+
+# Result of find_duplicates(). groups are largest waste first; candidates
+# is the number of files that shared their size with another one and
+# bytes_read what hashing them read; error_paths holds (path, error) for
+# files that could not be read.
+Duplicates = namedtuple("Duplicates", [
+    "groups", "wasted_size", "candidates", "bytes_read", "error_paths", "cancelled",
+])
+
+
+def find_duplicates(files, min_size=1, workers=None, on_progress=None, should_cancel=None):
+    """Find the files with identical contents among (path, size) pairs.
+
+    files can be a FileStore, ScanResult.large_files or any iterable of
+    (path, size). Candidates are narrowed down in stages, so that as few
+    bytes as possible are read:
+
+    1. files are grouped by size; a file whose size no other file has
+       cannot have a copy and is never opened (nor are files under
+       min_size, and empty files are never reported),
+    2. files of the same size are hashed over their first and last
+       PARTIAL_BLOCK bytes, which tells most of them apart,
+    3. files still sharing that hash are hashed in full, memory-mapped (or
+       read in FULL_HASH_CHUNK buffers where a file cannot be mapped).
+
+    Hard links to one inode are the same file rather than copies, so only
+    one of their paths is kept, and files whose size changed since the
+    scan are left out. Hashing runs on `workers` threads: hashlib releases
+    the GIL on large buffers, so reads and hashes of several files overlap.
+
+    on_progress(files_hashed, bytes_read) and should_cancel() are called on
+    the calling thread after every hashed file. A cancelled search returns
+    the groups confirmed until then with cancelled=True.
+    """
+    if workers is None:
+        workers = min(32, (os.cpu_count() or 1) + 4)
+
+    by_size = {}
+    for path, size in files:
+        if size >= max(min_size, 1):
+            by_size.setdefault(size, []).append(path)
+    # Largest first: they free the most, and a cancelled search has them
+    candidates = sorted(((size, paths) for size, paths in by_size.items() if len(paths) > 1), reverse=True)
+
+    search = _Search(on_progress, should_cancel)
+    groups = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for size, paths in candidates:
+            paths = search.unique_files(pool, size, paths)
+            for same_start in search.split(pool, _partial_hash, size, paths):
+                # Files of up to two blocks were read whole by the partial hash
+                if size <= 2 * PARTIAL_BLOCK:
+                    groups.append(DuplicateGroup(size, sorted(same_start), size * (len(same_start) - 1)))
+                    continue
+                for same in search.split(pool, _full_hash, size, same_start):
+                    groups.append(DuplicateGroup(size, sorted(same), size * (len(same) - 1)))
+            if search.stopped:
+                break
+
+    groups.sort(key=lambda group: group.wasted, reverse=True)
+    return Duplicates(groups, sum(group.wasted for group in groups),
+                      sum(len(paths) for size, paths in candidates), search.bytes_read, search.error_paths,
+                      search.stopped)
+
+
+class _Search:
+    # Counters of one find_duplicates() call and the stages run on its pool
+
+    def __init__(self, on_progress, should_cancel):
+        self.on_progress = on_progress
+        self.should_cancel = should_cancel
+        self.files_hashed = 0
+        self.bytes_read = 0
+        self.error_paths = []
+        # Set on the calling thread, read by the workers between chunks
+        self.stopped = False
+
+    def unique_files(self, pool, size, paths):
+        # One path per inode, and only files that still have the scanned size
+        if self.stopped:
+            return []
+        seen = set()
+        unique = []
+        for path, st in zip(paths, pool.map(_lstat, paths)):
+            if isinstance(st, str):
+                self.error_paths.append((path, st))
+            elif st.st_size == size and (st.st_dev, st.st_ino) not in seen:
+                seen.add((st.st_dev, st.st_ino))
+                unique.append(path)
+        return unique
+
+    def split(self, pool, hash_file, size, paths):
+        """Groups of two or more paths that hash_file() hashes the same"""
+        if len(paths) < 2 or self.stopped:
+            return []
+        by_digest = {}
+        for path, (digest, bytes_read, error) in zip(paths, pool.map(lambda path: hash_file(path, size, self),
+                                                                     paths)):
+            self.bytes_read += bytes_read
+            if error is not None:
+                self.error_paths.append((path, error))
+            elif digest is not None:
+                by_digest.setdefault(digest, []).append(path)
+            self.files_hashed += 1
+            if self.on_progress is not None:
+                self.on_progress(self.files_hashed, self.bytes_read)
+            if self.should_cancel is not None and not self.stopped and self.should_cancel():
+                self.stopped = True
+        # Hashes cut short by a cancel cannot confirm anything
+        if self.stopped:
+            return []
+        return [same for same in by_digest.values() if len(same) > 1]
+
+
+def _lstat(path):
+    try:
+        return os.lstat(path)
+    except OSError as e:
+        return str(e)
+
+
+def _partial_hash(path, size, search):
+    # (digest, bytes read, error) of the first and last PARTIAL_BLOCK bytes
+    if search.stopped:
+        return None, 0, None
+    try:
+        with open(path, "rb") as f:
+            data = f.read(PARTIAL_BLOCK)
+            if size > PARTIAL_BLOCK:
+                f.seek(max(size - PARTIAL_BLOCK, PARTIAL_BLOCK))
+                data += f.read(PARTIAL_BLOCK)
+    except OSError as e:
+        return None, 0, str(e)
+    return hashlib.blake2b(data).digest(), len(data), None
+
+
+def _full_hash(path, size, search):
+    # (digest, bytes read, error) of the whole file; no digest if cancelled
+    digest = hashlib.blake2b()
+    bytes_read = 0
+    try:
+        with open(path, "rb") as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError, OverflowError):
+                # Not mappable (special file systems, 32-bit address space)
+                mapped = None
+
+            if mapped is not None:
+                with mapped, memoryview(mapped) as view:
+                    for start in range(0, len(view), FULL_HASH_CHUNK):
+                        if search.stopped:
+                            return None, bytes_read, None
+                        chunk = view[start:start + FULL_HASH_CHUNK]
+                        digest.update(chunk)
+                        bytes_read += len(chunk)
+                        chunk.release()
+            else:
+                buffer = bytearray(FULL_HASH_CHUNK)
+                with memoryview(buffer) as view:
+                    while not search.stopped:
+                        count = f.readinto(buffer)
+                        if not count:
+                            break
+                        digest.update(view[:count])
+                        bytes_read += count
+                if search.stopped:
+                    return None, bytes_read, None
+    except OSError as e:
+        return None, bytes_read, str(e)
+    return digest.digest(), bytes_read, None
@@ -0,0 +1,111 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+
+from .aggregate import ALLOCATED_SIZES_AVAILABLE
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+# Columns of a CSV export; NDJSON rows have the same keys
+EXPORT_COLUMNS = ("type", "path", "size", "allocated", "mtime", "error")
+
+
+class StreamExport:
+    """Write every listed folder and file to a text stream during a scan.
+
+    Pass one to scanner.scan(export=...) to get a full inventory without
+    keeping it in memory: each DirListing is written out as soon as it has
+    been listed, so memory stays the same however many files there are,
+    and the stream can be a pipe into other tools. Rows are, in NDJSON
+    (one JSON object per line) or CSV with the EXPORT_COLUMNS header:
+
+    - "file": size and allocated (st_blocks * 512, empty where the platform
+      has no block counts) in bytes, mtime in whole seconds since the epoch,
+    - "dir": the same for the files directly inside the folder (cumulative
+      sizes are only known once the whole tree has been seen),
+    - "error": a path that could not be listed or stat'ed and the error.
+
+    Rows come in the order folders are listed, which with several threads
+    or processes is not a tree order. The stream is not closed here.
+    """
+
+    def __init__(self, stream, format="ndjson", header=True):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+        self.stream = stream
+        self.format = format
+        self.rows = 0
+        if format == "csv":
+            self._csv = csv.writer(stream)
+            if header:
+                self._csv.writerow(EXPORT_COLUMNS)
+
+    def add_listing(self, listing):
+        """Write the rows of one DirListing"""
+        rows = []
+        direct_size = 0
+        direct_allocated = 0
+        for fp, st in listing.files:
+            allocated = st.st_blocks * 512 if ALLOCATED_SIZES_AVAILABLE else None
+            direct_size += st.st_size
+            if allocated is not None:
+                direct_allocated += allocated
+            rows.append(("file", fp, st.st_size, allocated, int(st.st_mtime), None))
+
+        dir_stat = listing.stat
+        rows.append(("dir", listing.path, direct_size, direct_allocated if ALLOCATED_SIZES_AVAILABLE else None,
+                     int(dir_stat.st_mtime) if dir_stat is not None else None, None))
+        for path, error in listing.errors:
+            rows.append(("error", path, None, None, None, error))
+        self.write_rows(rows)
+
+    def write_rows(self, rows):
+        # Rows are EXPORT_COLUMNS tuples; None is written as null or an empty field
+        if self.format == "csv":
+            self._csv.writerows(rows)
+        else:
+            # Formatted by hand: json.dumps() of a dict per row is several
+            # times slower, and only the strings need escaping
+            dumps = json.dumps
+            self.stream.write("".join(
+                f'{{"type":"{kind}","path":{dumps(path)},"size":{_json_number(size)},'
+                f'"allocated":{_json_number(allocated)},"mtime":{_json_number(mtime)},'
+                f'"error":{dumps(error)}}}\n'
+                for kind, path, size, allocated, mtime, error in rows))
+        self.rows += len(rows)
+
+    def spool(self):
+        """A StreamExport of the same format on a temporary file, for a worker process.
+
+        Its rows are added to this export with append_spool() once the
+        worker is done.
+        """
+        # surrogateescape round-trips paths that are not valid UTF-8
+        spool = tempfile.NamedTemporaryFile("w", encoding="utf-8", errors="surrogateescape", newline="",
+                                            suffix=f".{self.format}", prefix="filesize-export-", delete=False)
+        return StreamExport(spool, self.format, header=False)
+
+    def append_spool(self, path, rows):
+        """Copy the rows a worker wrote with a spool() export here and delete its file"""
+        try:
+            with open(path, encoding="utf-8", errors="surrogateescape", newline="") as f:
+                shutil.copyfileobj(f, self.stream)
+        finally:
+            os.remove(path)
+        self.rows += rows
+
+    def __getstate__(self):
+        # Only the format travels to worker processes, which make their own
+        # spool; streams cannot be pickled
+        return {"format": self.format}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.stream = None
+        self.rows = 0
+
+
+def _json_number(value):
+    return "null" if value is None else value
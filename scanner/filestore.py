@@ -0,0 +1,84 @@
+import os
+from array import array
+
+
+class FileStore:
+    """Compact opt-in record of every scanned file's path and size.
+
+    Instead of a dict of full path strings, each directory path is stored
+    once in a table and every file keeps just its (shared) name, the index of
+    its directory and its size, the latter two in typed arrays. On large
+    shares this is several times smaller than {path: size}.
+
+    Files smaller than min_size are not recorded, which keeps the store small
+    when only sizeable files are of interest.
+    """
+
+    def __init__(self, min_size=0):
+        self.min_size = min_size
+        self._dirs = []
+        self._names = []
+        self._dir_ids = array("i")
+        self._sizes = array("q")
+        # Identical file names (index.js, __init__.py, ...) share one string
+        self._name_pool = {}
+
+    def add_listing(self, listing):
+        """Record the files of one DirListing"""
+        min_size = self.min_size
+        dir_id = None
+        name_pool = self._name_pool
+        basename = os.path.basename
+
+        for fp, st in listing.files:
+            size = st.st_size
+            if size < min_size:
+                continue
+            if dir_id is None:
+                dir_id = len(self._dirs)
+                self._dirs.append(listing.path)
+            name = basename(fp)
+            self._names.append(name_pool.setdefault(name, name))
+            self._dir_ids.append(dir_id)
+            self._sizes.append(size)
+
+    def add(self, path, size):
+        """Record a single file"""
+        if size < self.min_size:
+            return
+        dirpath, name = os.path.split(path)
+        # Consecutive files of the same directory share its table entry
+        if not self._dirs or self._dirs[-1] != dirpath:
+            self._dirs.append(dirpath)
+        self._names.append(self._name_pool.setdefault(name, name))
+        self._dir_ids.append(len(self._dirs) - 1)
+        self._sizes.append(size)
+
+    def merge(self, other):
+        """Append all files of another store"""
+        offset = len(self._dirs)
+        self._dirs.extend(other._dirs)
+        for name in other._names:
+            self._names.append(self._name_pool.setdefault(name, name))
+        self._dir_ids.extend(dir_id + offset for dir_id in other._dir_ids)
+        self._sizes.extend(other._sizes)
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def __iter__(self):
+        """Yield (path, size) for every recorded file"""
+        dirs = self._dirs
+        join = os.path.join
+        for name, dir_id, size in zip(self._names, self._dir_ids, self._sizes):
+            yield join(dirs[dir_id], name), size
+
+    def __getstate__(self):
+        # The name pool is only needed while adding; rebuild it on unpickle
+        state = self.__dict__.copy()
+        state["_name_pool"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._name_pool = {}
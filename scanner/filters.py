@@ -0,0 +1,117 @@
+import fnmatch
+import os
+import re
+
+
+class ScanFilter:
+    """Decide which parts of a tree a scan skips, before they are listed.
+
+    - excludes: glob patterns for files and folders to leave out. A pattern
+      containing a path separator is matched against the full path,
+      anything else against the entry's name (e.g. "node_modules", "*.tmp",
+      "/proc").
+    - includes: if given, only files whose name (or path, as above)
+      matches one of these are counted. Folders are still walked.
+    - max_depth: folders deeper than this below the root are not listed
+      (0 lists only the root itself).
+    - one_file_system: do not cross into folders on another device than
+      the root (mount points, bind mounts), like du -x. Costs one lstat per
+      folder.
+
+    prune() is applied to each listing as soon as it is made, so excluded
+    folders are never handed to a walker and cost no I/O at all. Excluded
+    files are dropped from the listing and count nowhere.
+    """
+
+    def __init__(self, root, excludes=(), includes=(), max_depth=None, one_file_system=False):
+        if max_depth is not None and max_depth < 0:
+            raise ValueError("max_depth cannot be negative")
+        self.root = os.fspath(root)
+        self.excludes = tuple(excludes)
+        self.includes = tuple(includes)
+        self.max_depth = max_depth
+        self.one_file_system = one_file_system
+        self.root_dev = os.lstat(self.root).st_dev if one_file_system else None
+        self._compile()
+
+    def _compile(self):
+        # One regex per pattern kind keeps matching to a single call per entry
+        self._exclude_names, self._exclude_paths = _compile(self.excludes)
+        self._include_names, self._include_paths = _compile(self.includes)
+        # A folder's depth is its number of separators past the root's
+        self._root_seps = self.root.rstrip(os.sep).count(os.sep)
+
+    def __getstate__(self):
+        # Sent to worker processes; compiled patterns are rebuilt there
+        state = self.__dict__.copy()
+        for name in ("_exclude_names", "_exclude_paths", "_include_names", "_include_paths"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    @property
+    def active(self):
+        """False if this filter lets everything through"""
+        return bool(self.excludes or self.includes or self.max_depth is not None or self.one_file_system)
+
+    def _depth(self, path):
+        return path.count(os.sep) - self._root_seps
+
+    def _excluded(self, path):
+        return _matches(path, self._exclude_names, self._exclude_paths)
+
+    def prune(self, listing, profile=None):
+        """The listing without the folders and files this filter skips.
+
+        The lstat calls of the one_file_system check are counted in a
+        ScanProfile given as profile.
+        """
+        subdirs = listing.subdirs
+        if subdirs and self.max_depth is not None and self._depth(subdirs[0]) > self.max_depth:
+            subdirs = []
+        if subdirs and self.excludes:
+            subdirs = [path for path in subdirs if not self._excluded(path)]
+        if subdirs and self.one_file_system:
+            if profile is not None:
+                profile.count("lstat", len(subdirs))
+            subdirs = [path for path in subdirs if self._same_device(path)]
+
+        files = listing.files
+        if files and self.excludes:
+            files = [entry for entry in files if not self._excluded(entry[0])]
+        if files and self.includes:
+            files = [entry for entry in files if _matches(entry[0], self._include_names, self._include_paths)]
+
+        if subdirs is listing.subdirs and files is listing.files:
+            return listing
+        return listing._replace(subdirs=subdirs, files=files)
+
+    def _same_device(self, path):
+        try:
+            return os.lstat(path).st_dev == self.root_dev
+        except OSError:
+            # Let the listing report the error
+            return True
+
+    def wrap(self, list_directory, profile=None):
+        """A list_directory for the walkers that prunes every listing it makes (see prune())"""
+        if not self.active:
+            return list_directory
+        return lambda path: self.prune(list_directory(path), profile)
+
+
+def _compile(patterns):
+    # Split into name and full-path patterns, each joined into one regex
+    names = [fnmatch.translate(p) for p in patterns if os.sep not in p and "/" not in p]
+    paths = [fnmatch.translate(p.replace("/", os.sep)) for p in patterns if os.sep in p or "/" in p]
+    return (re.compile("|".join(names)) if names else None,
+            re.compile("|".join(paths)) if paths else None)
+
+
+def _matches(path, names, paths):
+    if names is not None and names.match(os.path.basename(path)):
+        return True
+    return paths is not None and paths.match(path) is not None
@@ -0,0 +1,44 @@
+import os
+
+from .aggregate import CachedDir
+from .walker import scan_directory
+
+
+def incremental_walk(top, index, scan_id, list_directory=scan_directory, profile=None):
+    """Walk the tree below top, re-listing only folders changed since a saved scan.
+
+    Every folder is stat'ed (one cheap call); if its mtime and inode match
+    the saved scan `scan_id` in the ScanIndex, a CachedDir carrying the saved
+    direct size, file count, indexed files and sub-folders is yielded instead
+    of listing it again. Changed folders yield a fresh DirListing. Feed both
+    to ScanTotals.add_listing().
+
+    A folder's mtime only changes when entries are created, removed or
+    renamed in it, so files that grow in place (logs, databases) keep their
+    saved size until their folder changes; run a full scan now and then.
+    Folder paths must be spelt as in the saved scan (use absolute paths).
+    list_directory replaces scan_directory as in walk(); the extra lstat
+    of every folder is counted in a ScanProfile given as profile.
+    """
+    stack = [os.fspath(top)]
+    while stack:
+        path = stack.pop()
+        if profile is not None:
+            profile.count("lstat")
+        try:
+            dir_stat = os.lstat(path)
+        except OSError:
+            dir_stat = None
+
+        cached = index.cached_dir(scan_id, path) if dir_stat is not None else None
+        if (cached is not None and cached[1] is not None
+                and cached[1] == dir_stat.st_mtime_ns and cached[2] == dir_stat.st_ino):
+            dir_id, mtime_ns, inode, direct_size, file_count = cached
+            listing = CachedDir(path, index.child_dirs(scan_id, dir_id), direct_size, file_count,
+                                index.dir_files(scan_id, dir_id), dir_stat)
+        else:
+            listing = list_directory(path)
+
+        # Reverse so that sub-directories are visited in listing order
+        stack.extend(reversed(listing.subdirs))
+        yield listing
@@ -0,0 +1,243 @@
+import os
+import pathlib
+import sqlite3
+import time
+
+from .aggregate import recursive_sizes
+
+# Bump when the schema changes, and upgrade older files in _migrate()
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    root TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL,
+    total_size INTEGER NOT NULL,
+    folder_count INTEGER NOT NULL,
+    file_count INTEGER NOT NULL,
+    size_threshold INTEGER,
+    file_floor INTEGER,
+    filtered INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    scan_id INTEGER NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    id INTEGER NOT NULL,
+    parent_id INTEGER,
+    path TEXT NOT NULL,
+    direct_size INTEGER NOT NULL,
+    total_size INTEGER NOT NULL,
+    mtime_ns INTEGER,
+    inode INTEGER,
+    file_count INTEGER,
+    PRIMARY KEY (scan_id, id)
+);
+CREATE INDEX IF NOT EXISTS dirs_by_total ON dirs (scan_id, total_size DESC);
+CREATE INDEX IF NOT EXISTS dirs_by_parent ON dirs (scan_id, parent_id);
+CREATE INDEX IF NOT EXISTS dirs_by_path ON dirs (scan_id, path);
+CREATE TABLE IF NOT EXISTS files (
+    scan_id INTEGER NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    dir_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_by_size ON files (scan_id, size DESC);
+CREATE INDEX IF NOT EXISTS files_by_dir ON files (scan_id, dir_id);
+CREATE TABLE IF NOT EXISTS errors (
+    scan_id INTEGER NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+"""
+
+
+class ScanIndex:
+    """On-disk SQLite index of previous scans.
+
+    Every saved scan keeps its directory tree with direct and cumulative
+    sizes, the files at or above a size floor, the errors and some metadata.
+    Large folders/files for any threshold are then answered from indexes in
+    milliseconds instead of re-walking the volume. One index file can hold
+    many scans (e.g. one per night).
+    """
+
+    def __init__(self, db_path, read_only=False):
+        # read_only opens an existing index for viewing only: a missing file
+        # is an error instead of a new empty index
+        self.db_path = db_path
+        if read_only:
+            if not os.path.isfile(db_path):
+                raise FileNotFoundError(f"{db_path} does not exist")
+            uri = pathlib.Path(os.path.abspath(db_path)).as_uri()
+            self.conn = sqlite3.connect(f"{uri}?mode=ro", uri=True)
+        else:
+            self.conn = sqlite3.connect(db_path)
+        try:
+            self.conn.execute("PRAGMA foreign_keys = ON")
+            self._migrate(read_only)
+        except Exception:
+            self.conn.close()
+            raise
+
+    def _migrate(self, read_only=False):
+        # Raises sqlite3.DatabaseError if the file is not a database at all
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"{self.db_path} was written by a newer version (schema {version})")
+        if read_only:
+            if version != SCHEMA_VERSION:
+                raise ValueError(f"{self.db_path} is not a scan index")
+            return
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def save_scan(self, root, totals, scan_time=None, started=None, scan_filter=None):
+        """Store one finished scan and return its id.
+
+        totals is the finished ScanTotals (or the ScanResult) of the scan. Files are taken from
+        its file_store, whose min_size is recorded as the floor below which
+        files are not in the index. Folder mtimes and inodes (needed for
+        incremental rescans) are stored if it was created with record_dirs.
+        Pass the scan's ScanFilter, if it had one: a filtered scan is marked
+        as such, since its folders are missing what the filter skipped.
+        """
+        if started is None:
+            started = time.time() - (scan_time or 0)
+        file_store = totals.file_store
+        file_floor = file_store.min_size if file_store is not None else None
+        filtered = scan_filter is not None and scan_filter.active
+
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO scans (root, started, duration, total_size, folder_count, file_count,"
+                " size_threshold, file_floor, filtered) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(root), started, scan_time, totals.total_size, totals.folder_count,
+                 totals.file_count, totals.size_threshold, file_floor, int(filtered)))
+            scan_id = cursor.lastrowid
+
+            dir_ids = {}
+            self.conn.executemany(
+                "INSERT INTO dirs (scan_id, id, parent_id, path, direct_size, total_size, mtime_ns, inode,"
+                " file_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._dir_rows(scan_id, totals, dir_ids))
+
+            if file_store is not None:
+                self.conn.executemany(
+                    "INSERT INTO files (scan_id, dir_id, path, size) VALUES (?, ?, ?, ?)",
+                    ((scan_id, dir_ids.get(os.path.dirname(path), 0), path, size) for path, size in file_store))
+
+            self.conn.executemany(
+                "INSERT INTO errors (scan_id, path, message) VALUES (?, ?, ?)",
+                ((scan_id, path, message) for path, message in totals.error_paths))
+
+        return scan_id
+
+    @staticmethod
+    def _dir_rows(scan_id, totals, dir_ids):
+        folder_totals = totals.folder_totals or recursive_sizes(totals.folder_sizes)
+        dir_records = totals.dir_records or {}
+        no_record = (None, None, None)
+
+        # Parents come before children, so a folder's parent already has an
+        # id. Only the root (id 0) has no parent; as in recursive_sizes(), any
+        # other folder whose dirname is unknown hangs off the root
+        for dir_id, (path, direct_size) in enumerate(totals.folder_sizes.items()):
+            parent_id = None if dir_id == 0 else dir_ids.get(os.path.dirname(path), 0)
+            dir_ids[path] = dir_id
+            mtime_ns, inode, file_count = dir_records.get(path, no_record)
+            yield (scan_id, dir_id, parent_id, path, direct_size, folder_totals[path],
+                   mtime_ns, inode, file_count)
+
+    def _scans(self, where="", params=()):
+        cursor = self.conn.execute(f"SELECT * FROM scans {where} ORDER BY started DESC, id DESC", params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def list_scans(self, root=None, unfiltered=False):
+        """Metadata of the saved scans (optionally of one root), newest first.
+
+        With unfiltered, scans made with a ScanFilter are left out; only the
+        others saw the whole tree and can be the base of an incremental scan.
+        """
+        conditions = []
+        params = []
+        if root is not None:
+            conditions.append("root = ?")
+            params.append(os.path.abspath(root))
+        if unfiltered:
+            conditions.append("NOT filtered")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._scans(where, params)
+
+    def latest_scan(self, root=None, unfiltered=False):
+        """Metadata of the most recent scan (see list_scans()), or None"""
+        scans = self.list_scans(root, unfiltered)
+        return scans[0] if scans else None
+
+    def scan_info(self, scan_id):
+        """Metadata of one saved scan"""
+        scans = self._scans("WHERE id = ?", (scan_id,))
+        if not scans:
+            raise KeyError(f"No scan with id {scan_id} in {self.db_path}")
+        return scans[0]
+
+    def large_folders(self, scan_id, size_threshold, top_n=None):
+        """(path, cumulative size, direct size) of folders over the threshold, largest first"""
+        return self.conn.execute(
+            "SELECT path, total_size, direct_size FROM dirs WHERE scan_id = ? AND total_size > ?"
+            " ORDER BY total_size DESC LIMIT ?",
+            (scan_id, size_threshold, top_n or -1)).fetchall()
+
+    def large_files(self, scan_id, size_threshold, top_n=None):
+        """(path, size) of indexed files over the threshold, largest first"""
+        return self.conn.execute(
+            "SELECT path, size FROM files WHERE scan_id = ? AND size > ? ORDER BY size DESC LIMIT ?",
+            (scan_id, size_threshold, top_n or -1)).fetchall()
+
+    def errors(self, scan_id):
+        return self.conn.execute(
+            "SELECT path, message FROM errors WHERE scan_id = ? ORDER BY rowid", (scan_id,)).fetchall()
+
+    def load_results(self, scan_id, size_threshold, top_n=None):
+        """Results of a saved scan in the shape the front-ends display.
+
+        Returns (total_size, folder_count, file_count, large_folders,
+        large_files, error_paths). Files below the scan's file floor were
+        never indexed, so large_files is incomplete for thresholds under it.
+        """
+        info = self.scan_info(scan_id)
+        return (info["total_size"], info["folder_count"], info["file_count"],
+                self.large_folders(scan_id, size_threshold, top_n),
+                self.large_files(scan_id, size_threshold, top_n),
+                self.errors(scan_id))
+
+    def cached_dir(self, scan_id, path):
+        """(id, mtime_ns, inode, direct_size, file_count) of a folder in a saved scan, or None"""
+        return self.conn.execute(
+            "SELECT id, mtime_ns, inode, direct_size, file_count FROM dirs WHERE scan_id = ? AND path = ?",
+            (scan_id, path)).fetchone()
+
+    def child_dirs(self, scan_id, dir_id):
+        """Paths of the sub-folders of a folder in a saved scan"""
+        return [path for (path,) in self.conn.execute(
+            "SELECT path FROM dirs WHERE scan_id = ? AND parent_id = ? ORDER BY id", (scan_id, dir_id))]
+
+    def dir_files(self, scan_id, dir_id):
+        """(path, size) of the indexed files directly in a folder of a saved scan"""
+        return self.conn.execute(
+            "SELECT path, size FROM files WHERE scan_id = ? AND dir_id = ?", (scan_id, dir_id)).fetchall()
+
+    def delete_scan(self, scan_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM scans WHERE id = ?", (scan_id,))
@@ -0,0 +1,131 @@
+import hashlib
+
+# Bytes per inode that an exact InodeSet is budgeted at (dict entry plus
+# the key and size ints); a bounded set's Bloom filter gets the same budget
+BYTES_PER_INODE = 100
+
+# Number of bit positions set per inode in the Bloom filter
+BLOOM_HASHES = 7
+
+
+class InodeSet:
+    """The (st_dev, st_ino) pairs of the hard-linked files seen in a scan.
+
+    Only files with more than one link need tracking: a file with
+    st_nlink == 1 cannot be reached through another path. Each inode is
+    stored as one int key (device and inode number packed together) mapped
+    to its size, so the sets of two scan partitions can be merged and the
+    sizes counted by both taken off again. With track_allocated, each
+    inode's allocated size is kept as well, for the same purpose.
+
+    With max_entries, the set switches to a Bloom filter of about the same
+    memory once it holds that many inodes. Memory then stays fixed, but a
+    false positive occasionally takes a new file for an already seen one
+    (so unique sizes may come out slightly low), and once two partitions'
+    sets are both filters, links shared between them are counted twice.
+    """
+
+    def __init__(self, max_entries=None, track_allocated=False):
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._sizes = {}
+        self._allocated = {} if track_allocated else None
+        self._bloom = None
+        # Inodes put into the filter (only used once bounded)
+        self._count = 0
+
+    @staticmethod
+    def _key(dev, ino):
+        return (dev << 64) | ino
+
+    def add(self, dev, ino, size, allocated=0):
+        """Record one hard-linked file; returns False if its inode was seen before"""
+        key = self._key(dev, ino)
+        if self._bloom is not None:
+            return self._bloom_add(key)
+        if key in self._sizes:
+            return False
+        self._sizes[key] = size
+        if self._allocated is not None:
+            self._allocated[key] = allocated
+        if self.max_entries is not None and len(self._sizes) >= self.max_entries:
+            self._switch_to_bloom()
+        return True
+
+    def _switch_to_bloom(self):
+        # Bit array of the byte budget of max_entries exact entries
+        self._bloom = bytearray(self.max_entries * BYTES_PER_INODE)
+        for key in self._sizes:
+            self._bloom_add(key)
+        self._sizes = {}
+        if self._allocated is not None:
+            self._allocated = {}
+
+    def _bloom_add(self, key):
+        # Bit positions by double hashing one blake2b digest, which (unlike
+        # hash()) mixes the packed keys well and is the same in every worker
+        # process, so filters built by different workers can be OR-ed
+        bloom = self._bloom
+        bits = len(bloom) * 8
+        digest = hashlib.blake2b(key.to_bytes(16, "little"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        new = False
+        for i in range(BLOOM_HASHES):
+            bit = (h1 + i * h2) % bits
+            mask = 1 << (bit & 7)
+            if not bloom[bit >> 3] & mask:
+                bloom[bit >> 3] |= mask
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def merge(self, other):
+        """Add the inodes of another partition (with the same max_entries).
+
+        Returns (size, allocated size) of the inodes both had counted, so
+        they can be taken off the combined totals (the allocated size is 0
+        without track_allocated). Once both are bounded this is always
+        (0, 0): two filters can be combined but not compared.
+        """
+        other_allocated = other._allocated or {}
+        if self._bloom is None and other._bloom is None:
+            counted_twice = allocated_twice = 0
+            for key, size in other._sizes.items():
+                if key in self._sizes:
+                    counted_twice += size
+                    allocated_twice += other_allocated.get(key, 0)
+                else:
+                    self._sizes[key] = size
+                    if self._allocated is not None:
+                        self._allocated[key] = other_allocated.get(key, 0)
+            if self.max_entries is not None and len(self._sizes) >= self.max_entries:
+                self._switch_to_bloom()
+            return counted_twice, allocated_twice
+
+        if self._bloom is None:
+            self._switch_to_bloom()
+        if other._bloom is None:
+            counted_twice = allocated_twice = 0
+            for key, size in other._sizes.items():
+                if not self._bloom_add(key):
+                    counted_twice += size
+                    allocated_twice += other_allocated.get(key, 0)
+            return counted_twice, allocated_twice
+
+        # Both filters have the same size: OR them in one go
+        merged = int.from_bytes(self._bloom, "little") | int.from_bytes(other._bloom, "little")
+        self._bloom = bytearray(merged.to_bytes(len(self._bloom), "little"))
+        self._count += other._count
+        return 0, 0
+
+    @property
+    def bounded(self):
+        """True once the set has switched to its Bloom filter"""
+        return self._bloom is not None
+
+    def __len__(self):
+        # Approximate once bounded (overlapping merges are counted twice)
+        return len(self._sizes) if self._bloom is None else self._count
@@ -0,0 +1,38 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .walker import scan_directory
+
+
+def parallel_walk(top, workers=4, list_directory=scan_directory):
+    """Walk the tree below top with a pool of threads listing directories.
+
+    Every listed directory feeds its sub-directories back into the work
+    queue, so up to `workers` scandir/stat calls are in flight at once. This
+    pays off on network filesystems and fast SSD/NVMe arrays where a single
+    thread leaves most of the I/O parallelism unused.
+
+    Yields the same DirListing objects as walk(), but in completion order
+    rather than depth-first order. Closing the generator early (e.g. when a
+    scan is cancelled) waits only for the listings already in flight.
+    list_directory replaces scan_directory as in walk().
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    # Keep a few directories queued per thread; everything else waits as a
+    # plain path in the backlog, which is far cheaper than a pending future
+    max_in_flight = workers * 4
+    backlog = deque([top])
+    in_flight = set()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scanner") as pool:
+        while backlog or in_flight:
+            while backlog and len(in_flight) < max_in_flight:
+                in_flight.add(pool.submit(list_directory, backlog.popleft()))
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                listing = future.result()
+                backlog.extend(listing.subdirs)
+                yield listing
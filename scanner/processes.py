@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+from .aggregate import ScanTotals
+from .filestore import FileStore
+from .profiling import ScanProfile
+from .walker import scan_directory, walk
+
+# Set in every worker process by the pool initializer; once the scan is
+# cancelled, workers stop at their next directory
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _stopped():
+    return _stop_event is not None and _stop_event.is_set()
+
+
+def _scan_subtree(path, size_threshold, top_n, file_store_min_size, record_dirs, inode_limit, allocated,
+                  scan_filter, profiled, export):
+    # Runs in a worker process: walk one partition and hand back only the
+    # compact aggregates (plus a compact FileStore if files are recorded, and
+    # the worker's own ScanProfile if the scan is profiled). Exported rows
+    # go to a spool file, whose path and row count are handed back instead.
+    if file_store_min_size is None:
+        file_store = None
+    else:
+        file_store = FileStore(file_store_min_size)
+    totals = ScanTotals(size_threshold, top_n, file_store, record_dirs, inode_limit, allocated)
+    spool = export.spool() if export is not None else None
+    try:
+        if not profiled:
+            profile = None
+            for listing in walk(path, _lister(scan_directory, scan_filter)):
+                if _stopped():
+                    break
+                totals.add_listing(listing)
+                if spool is not None:
+                    spool.add_listing(listing)
+        else:
+            profile = ScanProfile()
+            for listing in walk(path, _lister(profile.scan_directory, scan_filter, profile)):
+                if _stopped():
+                    break
+                with profile.phase("aggregate"):
+                    totals.add_listing(listing)
+                if spool is not None:
+                    with profile.phase("export"):
+                        spool.add_listing(listing)
+    except BaseException:
+        if spool is not None:
+            spool.stream.close()
+            os.remove(spool.stream.name)
+        raise
+
+    if spool is None:
+        return totals, profile, None
+    spool.stream.close()
+    return totals, profile, (spool.stream.name, spool.rows)
+
+
+def _remove_spool(future):
+    # Done callback of a partition whose rows are not wanted (any more)
+    if not future.cancelled() and future.exception() is None:
+        os.remove(future.result()[2][0])
+
+
+def _lister(list_directory, scan_filter, profile=None):
+    return list_directory if scan_filter is None else scan_filter.wrap(list_directory, profile)
+
+
+def process_scan(start_path, size_threshold, workers=None, top_n=None, file_store=None, record_dirs=False,
+                 profile=None, inode_limit=None, allocated=False, scan_filter=None, export=None):
+    """Scan start_path with its top-level sub-directories spread over processes.
+
+    Each sub-directory of start_path is walked by a worker process, which
+    returns partial ScanTotals that are merged here, so the per-entry
+    bookkeeping no longer competes for a single GIL. The files directly in
+    start_path are handled by the calling process.
+
+    This is a generator: it yields (totals, items, large_files) after
+    start_path itself and after every finished partition, so callers can
+    report progress; large_files are the (path, size) files over the
+    threshold of that step alone. The final (totals, 0, []) is the complete
+    result, with finish() already called.
+    `workers` defaults to the number of CPUs. If a FileStore is given, each
+    worker fills its own and they are merged into it. Likewise, workers
+    profile their partitions into a ScanProfile given as profile, and prune
+    them with a ScanFilter given as scan_filter. With a StreamExport as
+    export, workers write their rows to spool files, which are copied into
+    it as their partitions finish.
+    """
+    start_path = os.fspath(start_path)
+    totals = ScanTotals(size_threshold, top_n, file_store, record_dirs, inode_limit, allocated)
+    top = _lister(scan_directory if profile is None else profile.scan_directory, scan_filter, profile)(start_path)
+    items = totals.add_listing(top)
+    if export is not None:
+        export.add_listing(top)
+    yield totals, items, [(fp, st.st_size) for fp, st in top.files if st.st_size > size_threshold]
+
+    if top.subdirs:
+        futures = []
+        copied = set()
+        finished = False
+        stop_event = multiprocessing.Event()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stop_event,))
+        try:
+            # One task per sub-directory lets idle workers pick up the next
+            # partition instead of being stuck with a fixed share of the tree
+            min_size = None if file_store is None else file_store.min_size
+            futures = [pool.submit(_scan_subtree, path, size_threshold, top_n, min_size, record_dirs,
+                                   inode_limit, allocated, scan_filter, profile is not None, export)
+                       for path in top.subdirs]
+            for future in as_completed(futures):
+                partial, partial_profile, spooled = future.result()
+                copied.add(future)
+                # The partition's own large files, before merge() mixes them in
+                found = list(partial.large_files)
+                totals.merge(partial)
+                if partial_profile is not None:
+                    profile.merge(partial_profile)
+                if spooled is not None:
+                    with profile.phase("export") if profile is not None else nullcontext():
+                        export.append_spool(*spooled)
+                yield totals, partial.item_count, found
+            finished = True
+        finally:
+            if finished:
+                pool.shutdown()
+            else:
+                # Cancelled or failed: drop the partitions not started yet,
+                # stop the running ones at their next directory and return
+                # without waiting for them
+                stop_event.set()
+                for future in futures:
+                    future.cancel()
+                pool.shutdown(wait=False)
+                if export is not None:
+                    # Spool files of partitions that finish (or finished)
+                    # without being copied
+                    for future in futures:
+                        if future not in copied:
+                            future.add_done_callback(_remove_spool)
+
+    # Cumulative folder sizes need the whole tree, so they come last
+    with profile.phase("finish") if profile is not None else nullcontext():
+        totals.finish()
+    yield totals, 0, []
@@ -0,0 +1,176 @@
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .topk import TopK
+from .walker import DirListing
+
+# Order of the phases in reports; front-ends may add their own after these
+PHASES = ("list", "stat", "aggregate", "export", "finish", "sort")
+
+# Seconds between two entries/sec samples
+RATE_INTERVAL = 0.5
+
+
+class ScanProfile:
+    """Timings and counters of one scan, for finding out where the time goes.
+
+    Pass one to scanner.scan(profile=...). Directories are then listed by
+    scan_directory() below, which times the scandir loop ("list") apart from
+    the per-file stat calls ("stat") and counts the calls that hit the
+    filesystem. Directories taking longest to list are kept, and the rate
+    of entries/sec is sampled every RATE_INTERVAL seconds. scan() times its
+    own phases; front-ends time theirs (e.g. "render") with phase().
+
+    With several threads or processes, list and stat are summed over all of
+    them and can exceed the wall time. With cprofile_path the scanning
+    thread runs under cProfile and its stats are written there (worker
+    threads and processes are not covered).
+    """
+
+    def __init__(self, slowest=20, cprofile_path=None):
+        self.phases = {}
+        self.syscalls = {"lstat": 0, "scandir": 0, "stat": 0}
+        self.slowest_dirs = TopK(slowest)
+        self.rate_samples = []
+        self.cprofile_path = cprofile_path
+        self.wall_time = 0.0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Worker processes send their profile back; locks cannot be pickled
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block of code as (part of) the phase `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def scan_directory(self, path):
+        """walker.scan_directory() with the scandir loop and stat calls timed apart.
+
+        Kept separate so that unprofiled scans do not pay for the clock
+        reads; both must list a directory the same way.
+        """
+        clock = time.perf_counter
+        subdirs = []
+        files = []
+        errors = []
+        stat_time = 0.0
+        stat_calls = 0
+
+        start = clock()
+        try:
+            dir_stat = os.lstat(path)
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            stat_start = clock()
+                            stat_calls += 1
+                            files.append((entry.path, entry.stat(follow_symlinks=False)))
+                            stat_time += clock() - stat_start
+                    except OSError as e:
+                        errors.append((entry.path, str(e)))
+        except OSError as e:
+            errors.append((path, str(e)))
+            dir_stat = None
+        elapsed = clock() - start
+
+        with self._lock:
+            self.phases["list"] = self.phases.get("list", 0.0) + elapsed - stat_time
+            self.phases["stat"] = self.phases.get("stat", 0.0) + stat_time
+            self.syscalls["lstat"] += 1
+            self.syscalls["scandir"] += 1
+            self.syscalls["stat"] += stat_calls
+            self.slowest_dirs.append((path, elapsed))
+
+        return DirListing(path, subdirs, files, errors, dir_stat)
+
+    def count(self, syscall, calls=1):
+        """Count filesystem calls made outside scan_directory() (e.g. by filters)"""
+        with self._lock:
+            self.syscalls[syscall] = self.syscalls.get(syscall, 0) + calls
+
+    def sample_rate(self, elapsed, items):
+        # Called by scan() after every step; keeps one sample per interval
+        if not self.rate_samples or elapsed - self.rate_samples[-1][0] >= RATE_INTERVAL:
+            self.rate_samples.append((elapsed, items))
+
+    def merge(self, other):
+        """Add the timings and counters of a worker's profile to this one"""
+        for name, seconds in other.phases.items():
+            self.add_time(name, seconds)
+        with self._lock:
+            for name, count in other.syscalls.items():
+                self.syscalls[name] = self.syscalls.get(name, 0) + count
+            self.slowest_dirs.extend(other.slowest_dirs)
+
+    def start_cprofile(self):
+        if self.cprofile_path is None:
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop_cprofile(self, profiler):
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(self.cprofile_path)
+
+    def rates(self):
+        """(elapsed seconds, entries/sec since the previous sample) over the scan"""
+        rates = []
+        previous_time, previous_items = 0.0, 0
+        for elapsed, items in self.rate_samples:
+            if elapsed > previous_time:
+                rates.append((elapsed, (items - previous_items) / (elapsed - previous_time)))
+            previous_time, previous_items = elapsed, items
+        return rates
+
+    def report_lines(self, item_count=None):
+        """The profile as lines of text, as shown by the CLI and the GUI"""
+        lines = [f"Scan wall time: {self.wall_time:.3f} s"]
+        if item_count is not None and self.wall_time:
+            lines.append(f"Entries: {item_count} ({item_count / self.wall_time:,.0f} per second)")
+
+        lines.append("Phases (list and stat are summed over workers):")
+        names = [name for name in PHASES if name in self.phases]
+        names += [name for name in self.phases if name not in PHASES]
+        for name in names:
+            lines.append(f"  {name:<10} {self.phases[name]:9.3f} s")
+
+        lines.append("Filesystem calls: " + ", ".join(f"{name} {count}" for name, count in self.syscalls.items()))
+
+        if self.slowest_dirs:
+            lines.append("Slowest directories to list:")
+            for path, seconds in self.slowest_dirs:
+                lines.append(f"  {seconds * 1000:9.2f} ms  {path}")
+
+        rates = self.rates()
+        if rates:
+            lines.append("Entries per second over time:")
+            for elapsed, rate in rates:
+                lines.append(f"  {elapsed:7.1f} s  {rate:12,.0f}")
+
+        if self.cprofile_path is not None:
+            lines.append(f"cProfile stats written to {self.cprofile_path} (open with python -m pstats)")
+        return lines
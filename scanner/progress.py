@@ -0,0 +1,54 @@
+import threading
+
+
+class ProgressChannel:
+    """Progress counters shared between a scanning thread and a UI.
+
+    The scanner overwrites the latest totals with update(), which never
+    blocks on the UI; the UI reads them with snapshot() at whatever rate it
+    redraws. The cost of reporting progress is thus independent of how fast
+    the scan runs.
+
+    Large files and folders found along the way can be published too; the UI
+    collects everything published since its last visit with take_found().
+    """
+
+    def __init__(self, estimated_items=None):
+        self.estimated_items = estimated_items
+        self._lock = threading.Lock()
+        self._items = 0
+        self._scanned_bytes = 0
+        self._current_path = None
+        self._finished = False
+        self._found_files = []
+        self._found_folders = []
+
+    def update(self, items, scanned_bytes, current_path=None):
+        """Publish the running totals (called by the scanning thread)"""
+        with self._lock:
+            self._items = items
+            self._scanned_bytes = scanned_bytes
+            self._current_path = current_path
+
+    def publish_found(self, large_files=(), large_folders=()):
+        """Queue newly found large (path, size) files and folders for the UI"""
+        with self._lock:
+            self._found_files.extend(large_files)
+            self._found_folders.extend(large_folders)
+
+    def take_found(self):
+        """(files, folders) published since the last call"""
+        with self._lock:
+            found = self._found_files, self._found_folders
+            self._found_files = []
+            self._found_folders = []
+        return found
+
+    def finish(self):
+        with self._lock:
+            self._finished = True
+
+    def snapshot(self):
+        """(items, scanned bytes, current path, finished) as last published"""
+        with self._lock:
+            return self._items, self._scanned_bytes, self._current_path, self._finished
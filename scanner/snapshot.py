@@ -0,0 +1,349 @@
+import heapq
+import json
+import mmap
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_right
+
+from .aggregate import recursive_sizes
+
+MAGIC = b"FSCSNAP\0"
+
+# Bump when the layout changes; other versions are refused when opened
+SNAPSHOT_VERSION = 1
+
+# The columns after the header, in file order: (name, array typecode).
+# Folders are stored in depth-first (pre)order, so the folders under one
+# form the contiguous range up to its dir_end, and files are grouped by
+# folder in the same order, so the files under one run from
+# dir_files[index] to dir_files[dir_end].
+COLUMNS = (
+    ("dir_parent", "q"),    # index of the parent folder, -1 for the root
+    ("dir_name", "I"),      # string of the folder name (the full path for the root)
+    ("dir_size", "Q"),      # cumulative size
+    ("dir_direct", "Q"),    # size of the files directly inside
+    ("dir_end", "Q"),       # index past the last folder under this one
+    ("dir_files", "Q"),     # index of the first file directly inside (one extra entry at the end)
+    ("file_name", "I"),     # string of the file name
+    ("file_size", "Q"),
+    ("string_offsets", "Q"),  # start of each string in string_data (one extra entry at the end)
+    ("string_data", "B"),   # UTF-8 (surrogateescape) names, each stored once
+)
+
+
+def write_snapshot(snapshot_path, result, started=None):
+    """Write a ScanResult as a snapshot file for Snapshot to open.
+
+    Every folder is stored with its cumulative and direct size, and every
+    file in result.file_store (none without one; only those at or above its
+    min_size, which is recorded as the file floor). Names are path
+    components kept once in a string table, so the file is a fraction of
+    the size of a text export and needs no parsing to be read back.
+    """
+    if started is None:
+        started = time.time() - (result.scan_time or 0)
+    root = os.path.abspath(result.root)
+    folder_totals = result.folder_totals or recursive_sizes(result.folder_sizes)
+
+    strings = []
+    string_ids = {}
+
+    def string_id(name):
+        if name not in string_ids:
+            string_ids[name] = len(strings)
+            strings.append(name)
+        return string_ids[name]
+
+    # Sorting paths by their components gives depth-first order. A folder
+    # hangs off the nearest folder above it that was listed (normally its
+    # parent) and is named by the components below that one.
+    scan_root = os.fspath(result.root)
+    paths = sorted(result.folder_sizes, key=lambda path: _components(scan_root, path))
+    columns = {name: array(typecode) for name, typecode in COLUMNS}
+    dir_ids = {}
+    stack = []
+    for index, path in enumerate(paths):
+        components = _components(scan_root, path)
+        while stack and components[:len(stack[-1][1])] != stack[-1][1]:
+            columns["dir_end"][stack.pop()[0]] = index
+        if stack:
+            parent, parent_components = stack[-1]
+            name = os.sep.join(components[len(parent_components):])
+        else:
+            parent, name = -1, os.path.abspath(path)
+        stack.append((index, components))
+        dir_ids[path] = index
+        columns["dir_parent"].append(parent)
+        columns["dir_name"].append(string_id(name))
+        columns["dir_size"].append(folder_totals.get(path, 0))
+        columns["dir_direct"].append(result.folder_sizes[path])
+        columns["dir_end"].append(0)
+    for index, components in stack:
+        columns["dir_end"][index] = len(paths)
+
+    _add_files(columns, result.file_store, dir_ids, string_id, len(paths))
+
+    data = bytearray()
+    for name in strings:
+        columns["string_offsets"].append(len(data))
+        data += name.encode("utf-8", "surrogateescape")
+    columns["string_offsets"].append(len(data))
+    columns["string_data"] = array("B", data)
+
+    info = {
+        "root": root,
+        "started": started,
+        "duration": result.scan_time,
+        "total_size": result.total_size,
+        "folder_count": result.folder_count,
+        "file_count": result.file_count,
+        "size_threshold": result.size_threshold,
+        "file_floor": result.file_store.min_size if result.file_store is not None else None,
+        "errors": result.error_paths,
+        "byteorder": sys.byteorder,
+        "lengths": {name: len(column) for name, column in columns.items()},
+    }
+    header = json.dumps(info).encode("utf-8")
+
+    try:
+        with open(snapshot_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(SNAPSHOT_VERSION.to_bytes(4, "little"))
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            for name, typecode in COLUMNS:
+                # Every column starts at a multiple of 8, so it can be cast in place
+                f.write(b"\0" * (-f.tell() % 8))
+                columns[name].tofile(f)
+    except OSError:
+        # No half-written snapshot is left behind (e.g. on a full disk)
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+        raise
+
+
+def _components(root, path):
+    relative = path[len(root):].strip(os.sep)
+    return relative.split(os.sep) if relative else []
+
+
+def _add_files(columns, file_store, dir_ids, string_id, dir_count):
+    # Counting sort of the files by folder index, straight from the
+    # FileStore's columns
+    dir_files = columns["dir_files"]
+    if file_store is None:
+        dir_files.extend([0] * (dir_count + 1))
+        return
+
+    store_dirs = [dir_ids.get(path, -1) for path in file_store._dirs]
+    counts = [0] * dir_count
+    for store_dir in file_store._dir_ids:
+        index = store_dirs[store_dir]
+        if index >= 0:
+            counts[index] += 1
+
+    position = 0
+    for count in counts:
+        dir_files.append(position)
+        position += count
+    dir_files.append(position)
+
+    names = array("I", bytes(4 * position))
+    sizes = array("Q", bytes(8 * position))
+    next_slot = array("Q", dir_files[:-1])
+    for name, store_dir, size in zip(file_store._names, file_store._dir_ids, file_store._sizes):
+        index = store_dirs[store_dir]
+        if index >= 0:
+            slot = next_slot[index]
+            next_slot[index] = slot + 1
+            names[slot] = string_id(name)
+            sizes[slot] = size
+    columns["file_name"] = names
+    columns["file_size"] = sizes
+
+
+class Snapshot:
+    """A snapshot file written by write_snapshot(), memory-mapped for queries.
+
+    Opening one reads only the small JSON header; every column is a
+    memoryview straight onto the mapped file, so queries such as the
+    largest folders under a path look at the entries in that subtree only
+    and create Python objects just for the rows they return. Paths are
+    absolute, as recorded under info["root"].
+    """
+
+    def __init__(self, snapshot_path):
+        self.snapshot_path = snapshot_path
+        with open(snapshot_path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        data = self._map
+        if data[:8] != MAGIC:
+            raise ValueError(f"{self.snapshot_path} is not a snapshot file")
+        version = int.from_bytes(data[8:12], "little")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"{self.snapshot_path} has snapshot version {version}, expected {SNAPSHOT_VERSION}")
+        header_length = int.from_bytes(data[12:16], "little")
+        try:
+            self.info = json.loads(data[16:16 + header_length].decode("utf-8"))
+            lengths = [self.info["lengths"][name] for name, typecode in COLUMNS]
+        except (ValueError, KeyError, TypeError):
+            # Cut off inside the header (or damaged there)
+            raise ValueError(f"{self.snapshot_path} is truncated") from None
+        if self.info.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{self.snapshot_path} was written on a {self.info.get('byteorder')}-endian machine")
+
+        offset = 16 + header_length
+        whole = memoryview(data)
+        self._views.append(whole)
+        for (name, typecode), count in zip(COLUMNS, lengths):
+            offset += -offset % 8
+            length = count * array(typecode).itemsize
+            if offset + length > len(data):
+                raise ValueError(f"{self.snapshot_path} is truncated")
+            view = whole[offset:offset + length].cast(typecode)
+            self._views.append(view)
+            setattr(self, name, view)
+            offset += length
+
+    def close(self):
+        # Views onto the map must be released before it can be closed
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """Number of folders"""
+        return len(self.dir_parent)
+
+    def string(self, string_id):
+        offsets = self.string_offsets
+        return bytes(self.string_data[offsets[string_id]:offsets[string_id + 1]]).decode("utf-8", "surrogateescape")
+
+    def dir_path(self, index):
+        names = []
+        while index >= 0:
+            names.append(self.string(self.dir_name[index]))
+            index = self.dir_parent[index]
+        return os.path.join(*reversed(names))
+
+    def file_path(self, file_index):
+        # The folder whose file range holds file_index
+        index = bisect_right(self.dir_files, file_index) - 1
+        return os.path.join(self.dir_path(index), self.string(self.file_name[file_index]))
+
+    def find_dir(self, path):
+        """Index of the folder at path; raises KeyError if it is not in the snapshot"""
+        root = self.info["root"]
+        path = os.path.abspath(path)
+        if path != root and not path.startswith(root.rstrip(os.sep) + os.sep):
+            raise KeyError(f"{path} is not under {root}")
+        components = _components(root, path)
+
+        # Walk down from the root, skipping over the subtrees of siblings
+        index = 0
+        depth = 0
+        while depth < len(components):
+            child = index + 1
+            while child < self.dir_end[index]:
+                name = self.string(self.dir_name[child]).split(os.sep)
+                if components[depth:depth + len(name)] == name:
+                    break
+                child = self.dir_end[child]
+            else:
+                raise KeyError(f"{path} is not in the snapshot")
+            index = child
+            depth += len(name)
+        return index
+
+    def children(self, index):
+        """Indexes of the folders directly in a folder"""
+        children = []
+        child = index + 1
+        while child < self.dir_end[index]:
+            children.append(child)
+            child = self.dir_end[child]
+        return children
+
+    def files(self, index):
+        """(path, size) of the recorded files directly in a folder"""
+        path = self.dir_path(index)
+        return [(os.path.join(path, self.string(self.file_name[i])), self.file_size[i])
+                for i in range(self.dir_files[index], self.dir_files[index + 1])]
+
+    def _subtree(self, under):
+        index = 0 if under is None else self.find_dir(under)
+        return index, self.dir_end[index]
+
+    def top_dirs(self, top_n=100, under=None, size_threshold=-1):
+        """(path, cumulative size, direct size) of the largest folders under a path, largest first.
+
+        under defaults to the root and is included itself; only folders
+        over size_threshold count, and top_n=None returns all of them.
+        """
+        start, end = self._subtree(under)
+        sizes = self.dir_size
+        indexes = (i for i in range(start, end) if sizes[i] > size_threshold)
+        if top_n is None:
+            indexes = sorted(indexes, key=sizes.__getitem__, reverse=True)
+        else:
+            indexes = heapq.nlargest(top_n, indexes, key=sizes.__getitem__)
+        return [(self.dir_path(i), sizes[i], self.dir_direct[i]) for i in indexes]
+
+    def top_files(self, top_n=100, under=None, size_threshold=-1):
+        """(path, size) of the largest recorded files under a path, largest first (see top_dirs())"""
+        start, end = self._subtree(under)
+        sizes = self.file_size
+        indexes = (i for i in range(self.dir_files[start], self.dir_files[end]) if sizes[i] > size_threshold)
+        if top_n is None:
+            indexes = sorted(indexes, key=sizes.__getitem__, reverse=True)
+        else:
+            indexes = heapq.nlargest(top_n, indexes, key=sizes.__getitem__)
+        return [(self.file_path(i), sizes[i]) for i in indexes]
+
+    def load_results(self, size_threshold, top_n=None, under=None):
+        """Results in the shape the front-ends display, like ScanIndex.load_results().
+
+        With under, folders and files are limited to that subtree and the
+        totals are its own (its file count then only covers recorded files).
+        """
+        info = self.info
+        if under is None:
+            total_size, folder_count, file_count = info["total_size"], info["folder_count"], info["file_count"]
+            errors = [tuple(error) for error in info["errors"]]
+        else:
+            start, end = self._subtree(under)
+            total_size = self.dir_size[start]
+            folder_count = end - start
+            file_count = self.dir_files[end] - self.dir_files[start]
+            prefix = self.dir_path(start).rstrip(os.sep) + os.sep
+            errors = [tuple(error) for error in info["errors"] if error[0].startswith(prefix)]
+        return (total_size, folder_count, file_count,
+                self.top_dirs(top_n, under, size_threshold),
+                self.top_files(top_n, under, size_threshold),
+                errors)
+
+
+def is_snapshot(path):
+    """True if the file at path starts like a snapshot (as opposed to, e.g., a ScanIndex)"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
@@ -0,0 +1,45 @@
+import heapq
+
+
+class TopK:
+    """Keep only the `limit` largest (path, size, ...) entries seen so far.
+
+    A drop-in for the plain lists the scanners append large entries to: the
+    entries live in a size-ordered min-heap, so memory stays O(limit) and
+    iterating yields them largest first after an O(limit log limit) sort.
+    """
+
+    def __init__(self, limit):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self._heap = []
+        # Heap items are (size, sequence number, entry): entries of the same
+        # size are told apart by the number and never compared themselves,
+        # as they need not be comparable (e.g. None and int in their keys)
+        self._count = 0
+
+    def append(self, entry):
+        heap = self._heap
+        if len(heap) < self.limit:
+            self._count += 1
+            heapq.heappush(heap, (entry[1], self._count, entry))
+        elif entry[1] > heap[0][0]:
+            # Smaller than everything kept is the common case, and costs nothing
+            self._count += 1
+            heapq.heapreplace(heap, (entry[1], self._count, entry))
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __iter__(self):
+        return (entry for size, count, entry in sorted(self._heap, reverse=True))
+
+
+def make_collector(top_n=None):
+    """A list for unlimited results, or a TopK when only the top_n largest are wanted"""
+    return TopK(top_n) if top_n else []
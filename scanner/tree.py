@@ -0,0 +1,78 @@
+import os
+from bisect import bisect_left, bisect_right
+
+from .aggregate import recursive_sizes
+
+
+class DirTree:
+    """The folder tree of a finished scan, for browsing it level by level.
+
+    Built from the sizes a scan already keeps (ScanResult.folder_sizes and
+    folder_totals) plus its FileStore, if it had one, so nothing is listed
+    again: children() and files() only look at the entries directly in
+    the folder asked for. Folders are absolute or relative as the scan's
+    root was given, like the rest of the result.
+
+    Only files recorded in the store appear in files(); the rest of a
+    folder's direct size is in files under the store's min_size.
+    """
+
+    def __init__(self, root, folder_sizes, folder_totals=None, file_store=None):
+        self.root = next(iter(folder_sizes), os.fspath(root))
+        self.folder_sizes = folder_sizes
+        self.folder_totals = folder_totals or recursive_sizes(folder_sizes)
+        self.file_store = file_store
+
+        # Sub-folders of every folder. Like recursive_sizes(), a folder
+        # whose parent was not listed hangs off the root.
+        self._children = {}
+        for path in folder_sizes:
+            if path == self.root:
+                continue
+            parent = os.path.dirname(path)
+            if parent not in folder_sizes:
+                parent = self.root
+            self._children.setdefault(parent, []).append(path)
+
+        # Table entries of every folder in the store; a folder has more than
+        # one if its files were added in several runs
+        self._store_dirs = {}
+        if file_store is not None:
+            for dir_id, path in enumerate(file_store._dirs):
+                self._store_dirs.setdefault(path, []).append(dir_id)
+
+    @classmethod
+    def from_result(cls, result):
+        """The DirTree of a ScanResult"""
+        return cls(result.root, result.folder_sizes, result.folder_totals, result.file_store)
+
+    def total(self, path):
+        """Cumulative size of a folder"""
+        return self.folder_totals[path]
+
+    def direct(self, path):
+        """Size of the files directly in a folder"""
+        return self.folder_sizes[path]
+
+    def has_children(self, path):
+        """True if the folder has sub-folders or recorded files to show"""
+        return path in self._children or path in self._store_dirs
+
+    def children(self, path):
+        """(path, cumulative size) of the sub-folders of a folder, largest first"""
+        totals = self.folder_totals
+        return sorted(((child, totals[child]) for child in self._children.get(path, ())),
+                      key=lambda entry: entry[1], reverse=True)
+
+    def files(self, path):
+        """(path, size) of the recorded files directly in a folder, largest first"""
+        store = self.file_store
+        files = []
+        for dir_id in self._store_dirs.get(path, ()):
+            # Store entries are appended folder by folder, so the dir ids
+            # never decrease and each folder's files are one slice
+            start = bisect_left(store._dir_ids, dir_id)
+            end = bisect_right(store._dir_ids, dir_id, start)
+            files.extend((os.path.join(path, store._names[i]), store._sizes[i]) for i in range(start, end))
+        files.sort(key=lambda entry: entry[1], reverse=True)
+        return files
@@ -0,0 +1,57 @@
+import os
+from collections import namedtuple
+
+# One listed directory: sub-directory paths, (path, stat_result) pairs for the
+# regular files in it, (path, error message) pairs for anything that failed
+# and the directory's own stat_result (None if it could not be listed)
+DirListing = namedtuple("DirListing", ["path", "subdirs", "files", "errors", "stat"])
+
+
+def scan_directory(path):
+    """List a single directory with os.scandir.
+
+    File type comes from the cached dirent data, so every regular file costs
+    at most one stat call (none for the directory entries themselves on most
+    platforms). Symlinks are never followed, so linked files and folders are
+    not counted twice.
+
+    The directory itself is stat'ed before it is listed, so its mtime can
+    later tell whether entries were added or removed since this listing.
+    """
+    subdirs = []
+    files = []
+    errors = []
+
+    try:
+        dir_stat = os.lstat(path)
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files.append((entry.path, entry.stat(follow_symlinks=False)))
+                except OSError as e:
+                    # Entry vanished or cannot be stat'ed
+                    errors.append((entry.path, str(e)))
+    except OSError as e:
+        # Directory itself cannot be listed (permissions, removed, ...)
+        errors.append((path, str(e)))
+        dir_stat = None
+
+    return DirListing(path, subdirs, files, errors, dir_stat)
+
+
+def walk(top, list_directory=scan_directory):
+    """Walk the tree below top, yielding a DirListing per directory.
+
+    Directories are visited top-down in the same depth-first order os.walk
+    uses, with one scandir call per directory. list_directory replaces
+    scan_directory, e.g. with ScanProfile.scan_directory.
+    """
+    stack = [os.fspath(top)]
+    while stack:
+        listing = list_directory(stack.pop())
+        # Reverse so that sub-directories are visited in listing order
+        stack.extend(reversed(listing.subdirs))
+        yield listing
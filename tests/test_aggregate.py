@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from scanner import BACKENDS, ScanTotals, recursive_sizes, scan, walk
+
+
+def make_tree(root):
+    # root: 100, a: 200 + b: 300, c: 400 (with an empty folder e)
+    files = {"top.bin": 100, "a/one.bin": 200, "a/b/two.bin": 300, "c/three.bin": 400}
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "c" / "e").mkdir(parents=True)
+    for name, size in files.items():
+        (root / name).write_bytes(b"x" * size)
+    return {os.path.join(str(root), *name.split("/")): size for name, size in files.items()}
+
+
+def test_recursive_sizes():
+    folder_sizes = {"/r": 1, "/r/a": 2, "/r/a/b": 4, "/r/c": 8, "/r/a/b/d": 16}
+    assert recursive_sizes(folder_sizes) == {"/r": 31, "/r/a": 22, "/r/a/b": 20, "/r/c": 8, "/r/a/b/d": 16}
+    assert recursive_sizes({}) == {}
+
+
+def test_recursive_sizes_root_with_trailing_separator():
+    # Children of a root spelt "/r/" hang off it although their dirname is "/r"
+    assert recursive_sizes({"/r/": 1, "/r/a": 2, "/r/a/b": 4}) == {"/r/": 7, "/r/a": 6, "/r/a/b": 4}
+
+
+def test_finish_totals(tmp_path):
+    root = tmp_path / "tree"
+    make_tree(root)
+    totals = ScanTotals(250)
+    for listing in walk(str(root)):
+        totals.add_listing(listing)
+    totals.finish()
+
+    def rel(path):
+        return os.path.relpath(path, root)
+
+    assert {rel(path): size for path, size in totals.folder_sizes.items()} == {
+        ".": 100, "a": 200, os.path.join("a", "b"): 300, "c": 400, os.path.join("c", "e"): 0}
+    assert {rel(path): size for path, size in totals.folder_totals.items()} == {
+        ".": 1000, "a": 500, os.path.join("a", "b"): 300, "c": 400, os.path.join("c", "e"): 0}
+    assert totals.folder_totals[str(root)] == totals.total_size == 1000
+    assert totals.folder_count == 5
+    assert totals.file_count == 4
+    assert sorted((rel(path), total, direct) for path, total, direct in totals.large_folders) == [
+        (".", 1000, 100), ("a", 500, 200), (os.path.join("a", "b"), 300, 300), ("c", 400, 400)]
+    assert sorted((rel(path), size) for path, size in totals.large_files) == [
+        (os.path.join("a", "b", "two.bin"), 300), (os.path.join("c", "three.bin"), 400)]
+
+
+@pytest.mark.parametrize("top_n", [None, 2])
+def test_backends_agree(tmp_path, top_n):
+    root = tmp_path / "tree"
+    files = make_tree(root)
+    # Enough folders for the processes backend to split the tree, all of
+    # different sizes so that the order of the large lists is fixed
+    for i in range(6):
+        folder = root / f"d{i}" / "sub"
+        folder.mkdir(parents=True)
+        for path, size in ((folder / "f.bin", 1000 + i), (folder.parent / "g.bin", 100 + i)):
+            path.write_bytes(b"x" * size)
+            files[str(path)] = size
+
+    results = {backend: scan(str(root), 250, backend, 2, top_n=top_n) for backend in BACKENDS}
+    expected = results["sequential"]
+    assert expected.total_size == sum(files.values())
+    assert expected.folder_count == 17
+    assert expected.file_count == len(files)
+    for backend, result in results.items():
+        assert not result.cancelled, backend
+        assert (result.total_size, result.unique_size, result.folder_count, result.file_count) == (
+            expected.total_size, expected.unique_size, expected.folder_count, expected.file_count), backend
+        assert result.folder_sizes == expected.folder_sizes, backend
+        assert result.folder_totals == expected.folder_totals, backend
+        assert result.large_folders == expected.large_folders, backend
+        assert result.large_files == expected.large_files, backend
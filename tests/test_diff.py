@@ -0,0 +1,27 @@
+import os
+
+from scanner import FileStore, Snapshot, diff_snapshots, scan, write_snapshot
+
+
+def snapshot_of(root, snapshot_path):
+    write_snapshot(snapshot_path, scan(root, 0, file_store=FileStore()))
+    return Snapshot(snapshot_path)
+
+
+def test_diff_new_folder_with_same_growth_as_root(tmp_path):
+    # The root grows by exactly the size of the new folder, so the growers
+    # hold two changes of the same size with differently shaped keys
+    root = tmp_path / "tree"
+    (root / "a").mkdir(parents=True)
+    (root / "a" / "old.bin").write_bytes(b"x" * 1000)
+    with snapshot_of(root, tmp_path / "old.fss") as old:
+        (root / "n").mkdir()
+        (root / "n" / "new.bin").write_bytes(b"x" * 5000)
+        with snapshot_of(root, tmp_path / "new.fss") as new:
+            diff = diff_snapshots(old, new, top_n=20, size_threshold=0)
+
+    assert diff.size_change == 5000
+    assert sorted((os.path.basename(path), old_size, new_size) for path, old_size, new_size in diff.growers) == [
+        ("n", 0, 5000), ("tree", 1000, 6000)]
+    assert [(os.path.basename(path), size) for path, size in diff.new_files] == [("new.bin", 5000)]
+    assert diff.new_folder_count == 1
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from scanner import FileStore, find_duplicates, scan
+from scanner.duplicates import PARTIAL_BLOCK
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path), len(data)
+
+
+def test_unique_sizes_are_never_read(tmp_path):
+    files = [write(tmp_path / "a", b"x" * 10), write(tmp_path / "b", b"x" * 20), write(tmp_path / "empty1", b""),
+             write(tmp_path / "empty2", b"")]
+    duplicates = find_duplicates(files)
+    assert duplicates.groups == []
+    assert duplicates.candidates == 0
+    assert duplicates.bytes_read == 0
+
+
+def test_small_files_are_settled_by_the_partial_hash(tmp_path):
+    size = 1000
+    files = [write(tmp_path / "copy1", b"a" * size), write(tmp_path / "copy2", b"a" * size),
+             write(tmp_path / "other", b"b" * size)]
+    duplicates = find_duplicates(files)
+    assert [(group.size, group.paths, group.wasted) for group in duplicates.groups] == [
+        (size, [str(tmp_path / "copy1"), str(tmp_path / "copy2")], size)]
+    assert duplicates.wasted_size == size
+    assert duplicates.candidates == 3
+    # Read once each, whole, by the partial hash
+    assert duplicates.bytes_read == 3 * size
+
+
+def test_large_files_need_the_full_hash(tmp_path):
+    size = 4 * PARTIAL_BLOCK
+    same = b"s" * PARTIAL_BLOCK
+    middle = b"m" * (2 * PARTIAL_BLOCK)
+    files = [
+        write(tmp_path / "copy1", same + middle + same),
+        write(tmp_path / "copy2", same + middle + same),
+        # Same start and end, different middle: only the full hash tells it apart
+        write(tmp_path / "middle", same + b"n" * (2 * PARTIAL_BLOCK) + same),
+        # Different start: dropped after the partial hash
+        write(tmp_path / "start", b"t" * PARTIAL_BLOCK + middle + same),
+    ]
+    duplicates = find_duplicates(files)
+    assert [group.paths for group in duplicates.groups] == [[str(tmp_path / "copy1"), str(tmp_path / "copy2")]]
+    assert duplicates.wasted_size == size
+    assert duplicates.bytes_read == 4 * 2 * PARTIAL_BLOCK + 3 * size
+
+
+def test_min_size_and_changed_files(tmp_path):
+    files = [write(tmp_path / "small1", b"x" * 10), write(tmp_path / "small2", b"x" * 10),
+             write(tmp_path / "grown1", b"y" * 50), write(tmp_path / "grown2", b"y" * 50)]
+    (tmp_path / "grown2").write_bytes(b"y" * 60)
+    duplicates = find_duplicates(files, min_size=20)
+    assert duplicates.groups == []
+    assert duplicates.candidates == 2
+
+
+@pytest.mark.skipif(not hasattr(os, "link") or os.name == "nt", reason="needs hard links with inode numbers")
+def test_hard_links_are_not_copies(tmp_path):
+    (tmp_path / "file").write_bytes(b"x" * 100)
+    os.link(tmp_path / "file", tmp_path / "link")
+    (tmp_path / "copy").write_bytes(b"x" * 100)
+
+    result = scan(str(tmp_path), 0, file_store=FileStore())
+    duplicates = find_duplicates(result.file_store)
+    assert len(duplicates.groups) == 1
+    assert len(duplicates.groups[0].paths) == 2
+    assert str(tmp_path / "copy") in duplicates.groups[0].paths
+    assert duplicates.wasted_size == 100
+
+
+def test_cancel(tmp_path):
+    files = [write(tmp_path / f"copy{i}", b"x" * 100) for i in range(4)]
+    duplicates = find_duplicates(files, should_cancel=lambda: True)
+    assert duplicates.cancelled
+    assert duplicates.groups == []
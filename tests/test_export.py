@@ -0,0 +1,94 @@
+import csv
+import glob
+import io
+import json
+import os
+import tempfile
+
+import pytest
+
+from scanner import ALLOCATED_SIZES_AVAILABLE, BACKENDS, EXPORT_COLUMNS, StreamExport, scan
+
+
+def make_tree(root):
+    (root / "a").mkdir(parents=True)
+    (root / "b").mkdir()
+    (root / "top.bin").write_bytes(b"x" * 10)
+    (root / "a" / "one.bin").write_bytes(b"x" * 200)
+    (root / "b" / "two.bin").write_bytes(b"x" * 3000)
+
+
+def spool_files():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), "filesize-export-*")))
+
+
+def test_ndjson_rows(tmp_path):
+    make_tree(tmp_path)
+    stream = io.StringIO()
+    export = StreamExport(stream)
+    result = scan(str(tmp_path), 0, export=export)
+
+    rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert export.rows == len(rows) == 6
+    assert all(list(row) == list(EXPORT_COLUMNS) for row in rows)
+    files = {row["path"]: row for row in rows if row["type"] == "file"}
+    dirs = {row["path"]: row for row in rows if row["type"] == "dir"}
+    assert {path: row["size"] for path, row in files.items()} == {
+        str(tmp_path / "top.bin"): 10, str(tmp_path / "a" / "one.bin"): 200, str(tmp_path / "b" / "two.bin"): 3000}
+    # Folders carry their direct size
+    assert {path: row["size"] for path, row in dirs.items()} == result.folder_sizes
+    row = files[str(tmp_path / "b" / "two.bin")]
+    assert row["mtime"] == int(os.lstat(tmp_path / "b" / "two.bin").st_mtime)
+    assert row["error"] is None
+    if ALLOCATED_SIZES_AVAILABLE:
+        assert row["allocated"] == os.lstat(tmp_path / "b" / "two.bin").st_blocks * 512
+    else:
+        assert row["allocated"] is None
+
+
+def test_csv_rows(tmp_path):
+    make_tree(tmp_path)
+    stream = io.StringIO(newline="")
+    export = StreamExport(stream, "csv")
+    scan(str(tmp_path), 0, export=export)
+
+    rows = list(csv.reader(io.StringIO(stream.getvalue(), newline="")))
+    assert rows[0] == list(EXPORT_COLUMNS)
+    assert len(rows) == export.rows + 1 == 7
+    by_path = {row[1]: row for row in rows[1:]}
+    assert by_path[str(tmp_path / "a" / "one.bin")][:3] == ["file", str(tmp_path / "a" / "one.bin"), "200"]
+    assert by_path[str(tmp_path / "a")][:3] == ["dir", str(tmp_path / "a"), "200"]
+    # None is an empty field
+    assert all(row[5] == "" for row in rows[1:])
+
+
+def test_error_rows():
+    stream = io.StringIO()
+    export = StreamExport(stream)
+    export.write_rows([("error", "/gone", None, None, None, "No such file or directory")])
+    assert json.loads(stream.getvalue()) == {
+        "type": "error", "path": "/gone", "size": None, "allocated": None, "mtime": None,
+        "error": "No such file or directory"}
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        StreamExport(io.StringIO(), "xml")
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_backends_export_the_same_rows(tmp_path, format):
+    make_tree(tmp_path / "tree")
+    before = spool_files()
+    exported = {}
+    for backend in BACKENDS:
+        stream = io.StringIO(newline="")
+        export = StreamExport(stream, format, header=False)
+        scan(str(tmp_path / "tree"), 0, backend, 2, export=export)
+        lines = stream.getvalue().splitlines()
+        assert export.rows == len(lines), backend
+        exported[backend] = sorted(lines)
+
+    assert exported["threads"] == exported["processes"] == exported["sequential"]
+    # The processes backend appended its workers' spool files and removed them
+    assert spool_files() == before
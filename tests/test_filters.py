@@ -0,0 +1,97 @@
+import os
+import pickle
+
+import pytest
+
+from scanner import DirListing, ScanFilter, ScanProfile, scan, scan_directory, walk
+
+
+def make_tree(root):
+    for folder in ("src/node_modules/pkg", "src/lib", "build", "docs"):
+        (root / folder).mkdir(parents=True)
+    files = {"README.md": 10, "src/main.py": 20, "src/main.tmp": 30, "src/node_modules/pkg/index.js": 40,
+             "src/lib/util.py": 50, "build/out.bin": 60, "docs/guide.md": 70}
+    for name, size in files.items():
+        (root / name).write_bytes(b"x" * size)
+
+
+def scanned(root, scan_filter):
+    """(folders, files) relative to root that a filtered scan lists"""
+    folders, files = [], []
+    for listing in walk(str(root), scan_filter.wrap(scan_directory)):
+        folders.append(os.path.relpath(listing.path, root).replace(os.sep, "/"))
+        files.extend(os.path.relpath(entry[0], root).replace(os.sep, "/") for entry in listing.files)
+    return sorted(folders), sorted(files)
+
+
+def test_inactive_filter(tmp_path):
+    scan_filter = ScanFilter(str(tmp_path))
+    assert not scan_filter.active
+    list_directory = object()
+    assert scan_filter.wrap(list_directory) is list_directory
+
+
+def test_name_patterns(tmp_path):
+    make_tree(tmp_path)
+    folders, files = scanned(tmp_path, ScanFilter(str(tmp_path), excludes=["node_modules", "*.tmp"]))
+    assert folders == [".", "build", "docs", "src", "src/lib"]
+    assert files == ["README.md", "build/out.bin", "docs/guide.md", "src/lib/util.py", "src/main.py"]
+
+
+def test_path_patterns(tmp_path):
+    make_tree(tmp_path)
+    # A pattern with a separator matches full paths only, so "lib" elsewhere
+    # and files named like the folder are unaffected
+    folders, files = scanned(tmp_path, ScanFilter(str(tmp_path), excludes=[str(tmp_path / "src" / "lib"), "/x/build"]))
+    assert folders == [".", "build", "docs", "src", "src/node_modules", "src/node_modules/pkg"]
+    assert "build/out.bin" in files
+    assert "src/lib/util.py" not in files
+
+
+def test_includes_keep_walking_folders(tmp_path):
+    make_tree(tmp_path)
+    folders, files = scanned(tmp_path, ScanFilter(str(tmp_path), excludes=["build"], includes=["*.py", "*.md"]))
+    assert folders == [".", "docs", "src", "src/lib", "src/node_modules", "src/node_modules/pkg"]
+    assert files == ["README.md", "docs/guide.md", "src/lib/util.py", "src/main.py"]
+
+
+@pytest.mark.parametrize("max_depth, expected", [
+    (0, ["."]),
+    (1, [".", "build", "docs", "src"]),
+    (2, [".", "build", "docs", "src", "src/lib", "src/node_modules"]),
+])
+def test_max_depth(tmp_path, max_depth, expected):
+    make_tree(tmp_path)
+    folders, files = scanned(tmp_path, ScanFilter(str(tmp_path), max_depth=max_depth))
+    assert folders == expected
+    # Files of the deepest folders listed are still counted
+    if max_depth == 0:
+        assert files == ["README.md"]
+
+
+def test_negative_max_depth(tmp_path):
+    with pytest.raises(ValueError):
+        ScanFilter(str(tmp_path), max_depth=-1)
+
+
+def test_one_file_system(tmp_path):
+    make_tree(tmp_path)
+    scan_filter = ScanFilter(str(tmp_path), one_file_system=True)
+    listing = DirListing(str(tmp_path), [str(tmp_path / name) for name in ("build", "docs", "src")], [], [], None)
+    profile = ScanProfile()
+    assert scan_filter.prune(listing, profile).subdirs == listing.subdirs
+    assert profile.syscalls["lstat"] == 3
+
+    # Folders on another device than the root are left out
+    scan_filter.root_dev = os.lstat(str(tmp_path)).st_dev + 1
+    assert scan_filter.prune(listing).subdirs == []
+
+
+def test_filtered_scan_and_pickling(tmp_path):
+    make_tree(tmp_path)
+    scan_filter = pickle.loads(pickle.dumps(ScanFilter(str(tmp_path), excludes=["node_modules"], includes=["*.py"])))
+    for backend in ("sequential", "threads", "processes"):
+        result = scan(str(tmp_path), 0, backend, 2, scan_filter=scan_filter)
+        assert result.total_size == 20 + 50, backend
+        assert result.file_count == 2, backend
+        assert str(tmp_path / "src" / "node_modules") not in result.folder_sizes, backend
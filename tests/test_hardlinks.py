@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from scanner import ALLOCATED_SIZES_AVAILABLE, BACKENDS, InodeSet, scan
+
+needs_links = pytest.mark.skipif(not hasattr(os, "link") or os.name == "nt",
+                                 reason="needs hard links with inode numbers")
+needs_allocated = pytest.mark.skipif(not ALLOCATED_SIZES_AVAILABLE, reason="no st_blocks on this platform")
+
+
+def allocated(path):
+    return os.lstat(path).st_blocks * 512
+
+
+def test_inode_set_add_and_merge():
+    first = InodeSet(track_allocated=True)
+    assert first.add(1, 10, 100, 4096)
+    assert not first.add(1, 10, 100, 4096)
+    # Same inode number on another device is another file
+    assert first.add(2, 10, 300, 8192)
+
+    second = InodeSet(track_allocated=True)
+    second.add(1, 10, 100, 4096)
+    second.add(1, 11, 500, 0)
+    assert first.merge(second) == (100, 4096)
+    assert len(first) == 3
+    assert not first.add(1, 11, 500, 0)
+
+
+def test_bounded_inode_set():
+    inodes = InodeSet(max_entries=2)
+    assert inodes.add(1, 1, 10)
+    assert not inodes.bounded
+    assert inodes.add(1, 2, 10)
+    assert inodes.bounded
+    assert not inodes.add(1, 1, 10)
+    assert inodes.add(1, 3, 10)
+    with pytest.raises(ValueError):
+        InodeSet(max_entries=0)
+
+
+@needs_links
+def test_links_in_one_folder(tmp_path):
+    (tmp_path / "file.bin").write_bytes(b"x" * 5000)
+    os.link(tmp_path / "file.bin", tmp_path / "link.bin")
+    (tmp_path / "other.bin").write_bytes(b"x" * 100)
+
+    result = scan(str(tmp_path), 0, allocated=ALLOCATED_SIZES_AVAILABLE)
+    assert result.total_size == 10100
+    assert result.unique_size == 5100
+    if ALLOCATED_SIZES_AVAILABLE:
+        expected = allocated(tmp_path / "file.bin") + allocated(tmp_path / "other.bin")
+        assert result.allocated_size == result.allocated[str(tmp_path)] == expected
+
+
+@needs_links
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_links_across_partitions(tmp_path, backend):
+    # Each top-level folder is a partition of the processes backend, so the
+    # links are only found to be the same file when the partitions merge
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+    (tmp_path / "a" / "file.bin").write_bytes(b"x" * 5000)
+    os.link(tmp_path / "a" / "file.bin", tmp_path / "b" / "link.bin")
+    os.link(tmp_path / "a" / "file.bin", tmp_path / "c" / "link.bin")
+    (tmp_path / "c" / "other.bin").write_bytes(b"x" * 100)
+
+    result = scan(str(tmp_path), 0, backend, 3, allocated=ALLOCATED_SIZES_AVAILABLE)
+    assert result.total_size == 15100
+    assert result.unique_size == 5100
+    if ALLOCATED_SIZES_AVAILABLE:
+        expected = allocated(tmp_path / "a" / "file.bin") + allocated(tmp_path / "c" / "other.bin")
+        assert result.allocated_size == result.allocated[str(tmp_path)] == expected
+
+
+@needs_allocated
+def test_sparse_file(tmp_path):
+    sparse = tmp_path / "sparse.bin"
+    with open(sparse, "wb") as f:
+        f.seek(10 * 1024 ** 2)
+        f.write(b"x")
+    if allocated(sparse) >= os.lstat(sparse).st_size:
+        pytest.skip("the filesystem does not support sparse files")
+
+    result = scan(str(tmp_path), 0, allocated=True)
+    assert result.large_files == [(str(sparse), 10 * 1024 ** 2 + 1)]
+    assert result.allocated[str(sparse)] == allocated(sparse) < result.total_size
+    assert result.allocated_size == result.allocated[str(tmp_path)] == allocated(sparse)
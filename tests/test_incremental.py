@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from scanner import CachedDir, DirListing, FileStore, ScanFilter, ScanIndex, incremental_walk, scan
+
+
+def make_tree(root):
+    for folder in ("a", "a/b", "c"):
+        (root / folder).mkdir(parents=True)
+    for name, size in {"top.bin": 100, "a/one.bin": 200, "a/b/two.bin": 300, "c/three.bin": 400}.items():
+        (root / name).write_bytes(b"x" * size)
+
+
+def save_full_scan(index, root, scan_filter=None):
+    result = scan(str(root), 0, file_store=FileStore(0), record_dirs=True, scan_filter=scan_filter)
+    return index.save_scan(str(root), result, result.scan_time, scan_filter=scan_filter)
+
+
+def bump_mtime(path):
+    # New or removed entries change the folder's mtime, but not necessarily
+    # by a visible amount on coarse clocks, so set one that surely differs
+    stat = os.lstat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture
+def index(tmp_path):
+    with ScanIndex(str(tmp_path / "index.db")) as index:
+        yield index
+
+
+def test_only_changed_folders_are_listed(tmp_path, index):
+    root = tmp_path / "tree"
+    make_tree(root)
+    scan_id = save_full_scan(index, root)
+    (root / "a" / "new.bin").write_bytes(b"x" * 5000)
+    bump_mtime(root / "a")
+
+    listings = {os.path.relpath(listing.path, root): listing
+                for listing in incremental_walk(str(root), index, scan_id)}
+    assert sorted(listings) == [".", "a", os.path.join("a", "b"), "c"]
+    assert isinstance(listings["a"], DirListing)
+    for path in (".", os.path.join("a", "b"), "c"):
+        assert isinstance(listings[path], CachedDir), path
+    assert listings["c"].direct_size == 400
+    assert listings["c"].files == [(str(root / "c" / "three.bin"), 400)]
+
+
+def test_totals_match_full_rescan(tmp_path, index):
+    root = tmp_path / "tree"
+    make_tree(root)
+    scan_id = save_full_scan(index, root)
+    (root / "a" / "b" / "new.bin").write_bytes(b"x" * 5000)
+    (root / "c" / "three.bin").unlink()
+    (root / "c" / "d").mkdir()
+    (root / "c" / "d" / "four.bin").write_bytes(b"x" * 700)
+    bump_mtime(root / "a" / "b")
+    bump_mtime(root / "c")
+
+    full = scan(str(root), 250, file_store=FileStore(0))
+    rescan = scan(str(root), 250, file_store=FileStore(0), previous_scan=(index, scan_id))
+    assert rescan.total_size == full.total_size == 100 + 200 + 300 + 5000 + 700
+    assert (rescan.folder_count, rescan.file_count) == (full.folder_count, full.file_count)
+    assert rescan.folder_sizes == full.folder_sizes
+    assert rescan.folder_totals == full.folder_totals
+    assert rescan.large_folders == full.large_folders
+    assert rescan.large_files == full.large_files
+    assert sorted(rescan.file_store) == sorted(full.file_store)
+
+
+def test_unique_size_unknown(tmp_path, index):
+    root = tmp_path / "tree"
+    make_tree(root)
+    scan_id = save_full_scan(index, root)
+
+    rescan = scan(str(root), 0, previous_scan=(index, scan_id))
+    assert rescan.total_size == 1000
+    assert rescan.unique_size is None
+
+
+def test_filtered_scan_is_not_a_base(tmp_path, index):
+    root = tmp_path / "tree"
+    make_tree(root)
+    full_id = save_full_scan(index, root)
+    filtered_id = save_full_scan(index, root, ScanFilter(str(root), excludes=["c"]))
+
+    assert index.latest_scan(str(root))["id"] == filtered_id
+    assert index.latest_scan(str(root), unfiltered=True)["id"] == full_id
+    with pytest.raises(ValueError):
+        scan(str(root), 0, previous_scan=(index, filtered_id))
@@ -0,0 +1,92 @@
+import os
+import sys
+
+import pytest
+
+from scanner import FileStore, Snapshot, is_snapshot, scan, write_snapshot
+
+
+def make_tree(root):
+    # Empty folders before, between and after the ones with files, so that
+    # files must be matched to the right folder among equal dir_files
+    for folder in ("a/empty", "a/b/c", "d", "e/f", "z"):
+        (root / folder).mkdir(parents=True)
+    files = {"top.bin": 10, "a/one.bin": 200, "a/b/c/deep.bin": 3000, "a/b/c/deeper.bin": 40, "e/f/five.bin": 500}
+    for name, size in files.items():
+        (root / name).write_bytes(b"x" * size)
+    return {os.path.join(str(root), *name.split("/")): size for name, size in files.items()}
+
+
+def write_and_open(root, snapshot_path):
+    result = scan(str(root), 0, file_store=FileStore())
+    write_snapshot(str(snapshot_path), result)
+    return result, Snapshot(str(snapshot_path))
+
+
+def test_round_trip(tmp_path):
+    root = tmp_path / "tree"
+    files = make_tree(root)
+    result, snapshot = write_and_open(root, tmp_path / "scan.fss")
+    with snapshot:
+        assert is_snapshot(str(tmp_path / "scan.fss"))
+        assert snapshot.info["root"] == str(root)
+        assert snapshot.info["total_size"] == result.total_size == sum(files.values())
+        assert len(snapshot) == result.folder_count == 9
+
+        # Every folder and file comes back with its path and size
+        assert {snapshot.dir_path(i): (snapshot.dir_size[i], snapshot.dir_direct[i])
+                for i in range(len(snapshot))} == {
+            path: (result.folder_totals[path], size) for path, size in result.folder_sizes.items()}
+        assert {snapshot.file_path(i): snapshot.file_size[i] for i in range(len(snapshot.file_size))} == files
+        assert sorted(snapshot.top_files(None)) == sorted(files.items())
+
+
+def test_find_dir_and_subtree_queries(tmp_path):
+    root = tmp_path / "tree"
+    make_tree(root)
+    with write_and_open(root, tmp_path / "scan.fss")[1] as snapshot:
+        assert snapshot.find_dir(str(root)) == 0
+        a = snapshot.find_dir(str(root / "a"))
+        assert snapshot.dir_path(a) == str(root / "a")
+        assert snapshot.dir_path(snapshot.find_dir(str(root / "a" / "b" / "c"))) == str(root / "a" / "b" / "c")
+        assert sorted(snapshot.dir_path(i) for i in snapshot.children(a)) == [
+            str(root / "a" / "b"), str(root / "a" / "empty")]
+        assert snapshot.files(a) == [(str(root / "a" / "one.bin"), 200)]
+        with pytest.raises(KeyError):
+            snapshot.find_dir(str(root / "missing"))
+        with pytest.raises(KeyError):
+            snapshot.find_dir(str(tmp_path))
+
+        assert snapshot.top_dirs(2, under=str(root / "a")) == [
+            (str(root / "a"), 3240, 200), (str(root / "a" / "b"), 3040, 0)]
+        assert snapshot.top_dirs(None, under=str(root / "e"), size_threshold=0) == [
+            (str(root / "e"), 500, 0), (str(root / "e" / "f"), 500, 500)]
+        assert snapshot.top_files(2, under=str(root / "a")) == [
+            (str(root / "a" / "b" / "c" / "deep.bin"), 3000), (str(root / "a" / "one.bin"), 200)]
+        assert snapshot.top_files(under=str(root / "d")) == []
+
+
+@pytest.mark.skipif(sys.platform in ("win32", "darwin"), reason="needs a filesystem that accepts any bytes in names")
+def test_non_utf8_names(tmp_path):
+    root = tmp_path / "tree"
+    name = os.fsdecode(b"caf\xe9")
+    (root / name).mkdir(parents=True)
+    (root / name / (name + ".bin")).write_bytes(b"x" * 100)
+    with write_and_open(root, tmp_path / "scan.fss")[1] as snapshot:
+        index = snapshot.find_dir(str(root / name))
+        assert snapshot.dir_path(index) == str(root / name)
+        assert snapshot.top_files(1) == [(str(root / name / (name + ".bin")), 100)]
+
+
+def test_truncated_file(tmp_path):
+    root = tmp_path / "tree"
+    make_tree(root)
+    snapshot_path = tmp_path / "scan.fss"
+    write_and_open(root, snapshot_path)[1].close()
+    data = snapshot_path.read_bytes()
+
+    # Cut off in the columns, and inside the JSON header
+    for length in (len(data) - 8, 40):
+        snapshot_path.write_bytes(data[:length])
+        with pytest.raises(ValueError, match="truncated"):
+            Snapshot(str(snapshot_path))
@@ -0,0 +1,33 @@
+import pytest
+
+from scanner import TopK, make_collector
+
+
+def test_keeps_the_largest():
+    top = TopK(3)
+    top.extend((f"f{size}", size) for size in (5, 1, 9, 3, 7, 2, 8))
+    assert len(top) == 3
+    assert list(top) == [("f9", 9), ("f8", 8), ("f7", 7)]
+
+
+def test_fewer_entries_than_limit():
+    top = TopK(10)
+    top.extend([("a", 1), ("b", 2)])
+    assert list(top) == [("b", 2), ("a", 1)]
+
+
+def test_ties_with_incomparable_entries():
+    # Entries of equal size are never compared, even when they cannot be
+    top = TopK(2)
+    top.extend([(None, 5, 1), ("path", 5, None), (3, 5, "x"), ("small", 1)])
+    assert len(top) == 2
+    assert [entry[1] for entry in top] == [5, 5]
+    # A tie with the smallest kept entry does not replace it
+    assert sorted(top, key=repr) == sorted([(None, 5, 1), ("path", 5, None)], key=repr)
+
+
+def test_make_collector():
+    assert make_collector() == []
+    assert isinstance(make_collector(5), TopK)
+    with pytest.raises(ValueError):
+        TopK(0)